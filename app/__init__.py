@@ -1,12 +1,20 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+from config.server_config import ServerConfig
+
+# Make blocking socket I/O (pymongo, requests) cooperative before anything imports it
+if ServerConfig.ASYNC_MODE == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
 from flask import Flask
 from flask_socketio import SocketIO
 
 from .database.database_init import ChatServiceDatabase
 from .database.chat_groups import ChatGroups
 from .database.chat_messages import ChatMessages
+from .database.chat_memberships import ChatMemberships
 
 from .services.chat_groups_services import ChatGroupsService
 from .services.chat_messages_services import ChatMessagesService
@@ -20,6 +28,8 @@ from .events.register_static_routes_events import register_static_routes
 
 from .xmpp.user_management_xmpp import UserManagementXMPP
 
+from .utils.pubsub import message_queue_options
+
 # Create a global SocketIO instance
 socketio = SocketIO(cors_allowed_origins="*")
 
@@ -31,7 +41,12 @@ def create_app():
     app.config.from_object('config.service_config.ServiceConfig')  # Adjust as required
 
     # Initialize SocketIO with the app instance
-    socketio.init_app(app)
+    # Room emits are shared across replicas through SOCKETIO_MESSAGE_QUEUE (if set)
+    socketio.init_app(
+        app,
+        async_mode=ServerConfig.ASYNC_MODE,
+        **message_queue_options(ServerConfig.SOCKETIO_MESSAGE_QUEUE, ServerConfig.SOCKETIO_CHANNEL)
+    )
 
     # Initialize database connection
     db = ChatServiceDatabase()
@@ -42,14 +57,16 @@ def create_app():
 
     # Instantiate ChatGroupsService
     chat_groups_dal = ChatGroups(db)
-    chat_groups_service = ChatGroupsService(chat_groups_dal, xmpp_user_management)
+    chat_memberships_dal = ChatMemberships(db)
+    chat_groups_service = ChatGroupsService(chat_groups_dal, chat_memberships_dal, xmpp_user_management)
 
     # Instantiate ChatMessagesService
     chat_messages_dal = ChatMessages(db)
-    chat_messages_service = ChatMessagesService(chat_messages_dal)
+    chat_messages_dal.seed_message_counts()
+    chat_messages_service = ChatMessagesService(chat_messages_dal, chat_memberships_dal=chat_memberships_dal)
 
     # Instantiate UserService
-    user_service = UserService(chat_groups_dal)
+    user_service = UserService(chat_groups_dal, chat_memberships_dal)
 
     # Register event handlers
     app.config['chat_groups_service'] = chat_groups_service
@@ -1,12 +1,15 @@
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
+from pymongo import ReturnDocument
 from datetime import datetime, UTC
 
-from .database_init import ChatServiceDatabase
+from .database_init import ChatServiceDatabase, field_projection
 
+from ..utils.metrics import instrument_dal
 from .logger import database_logger
 
 
+@instrument_dal
 class ChatGroups:
     def __init__(self, db: ChatServiceDatabase):
         # Access the "chat_groups" collection from the database
@@ -20,23 +23,45 @@ class ChatGroups:
         }
         result = self.chat_groups.insert_one(chat_group)
         database_logger.info(f"Created chat group '{group_name}' with ID {result.inserted_id}.")
-        return {"_id": str(result.inserted_id)}
+        return {"_id": str(result.inserted_id), "groupName": group_name, "createdAt": chat_group["createdAt"]}
 
-    def get_chat_group(self, chat_id: str) -> dict | None:
-        """Retrieve a chat group by ID."""
+    def get_chat_group(self, chat_id: str, fields: tuple[str, ...] | None = None) -> dict | None:
+        """Retrieve a chat group by ID, with only `fields` (and _id) when given."""
         try:
             obj_id = ObjectId(chat_id)
         except InvalidId:
             database_logger.warning(f"Invalid ObjectId: {chat_id}")
             return None
 
-        group = self.chat_groups.find_one({"_id": obj_id})
+        group = self.chat_groups.find_one({"_id": obj_id}, field_projection(fields))
         if group:
             database_logger.info(f"Retrieved chat group with ID {chat_id}.")
         else:
             database_logger.info(f"No chat group found with ID {chat_id}.")
         return group
-    
+
+    def get_chat_groups(self, chat_ids: list[str], fields: tuple[str, ...] = ("groupName", "createdAt")) -> list[dict | None]:
+        """
+        Retrieve several chat groups by ID in one query.
+
+        Only `fields` (plus _id) are fetched. The result is aligned with `chat_ids`:
+        None stands for an invalid ID or a group that does not exist.
+        """
+        obj_ids = {}
+        for chat_id in chat_ids:
+            try:
+                obj_ids[chat_id] = ObjectId(chat_id)
+            except (InvalidId, TypeError):
+                database_logger.warning(f"Invalid ObjectId: {chat_id}")
+
+        groups_by_id = {}
+        if obj_ids:
+            cursor = self.chat_groups.find({"_id": {"$in": list(set(obj_ids.values()))}}, field_projection(fields))
+            groups_by_id = {group["_id"]: group for group in cursor}
+
+        database_logger.info(f"Retrieved {len(groups_by_id)} of {len(chat_ids)} requested chat groups.")
+        return [groups_by_id.get(obj_ids.get(chat_id)) for chat_id in chat_ids]
+
     def get_all_chat_group_ids(self) -> list[str]:
         """Retrieve the _id of all chat groups from the database."""
         groups = self.chat_groups.find({}, {"_id": 1}).sort("createdAt", -1)
@@ -60,6 +85,25 @@ class ChatGroups:
             database_logger.info(f"No changes made or group not found for ID {chat_id}.")
             return False
 
+    def find_and_update_chat_group_name(self, chat_id: str, group_name: str) -> dict | None:
+        """Update a chat group's name and return the updated document in the same round trip."""
+        try:
+            obj_id = ObjectId(chat_id)
+        except InvalidId:
+            database_logger.warning(f"Invalid ObjectId for update: {chat_id}")
+            return None
+
+        chat_group = self.chat_groups.find_one_and_update(
+            {"_id": obj_id},
+            {"$set": {"groupName": group_name}},
+            return_document=ReturnDocument.AFTER
+        )
+        if chat_group:
+            database_logger.info(f"Updated chat group {chat_id} name to '{group_name}'.")
+        else:
+            database_logger.info(f"No chat group found for ID {chat_id}.")
+        return chat_group
+
     def delete_chat_group(self, chat_id: str) -> int:
         """Delete a chat group."""
         try:
@@ -0,0 +1,219 @@
+from datetime import datetime, UTC
+
+from pymongo import UpdateMany, UpdateOne
+
+from .database_init import ChatServiceDatabase
+
+from ..utils.metrics import instrument_dal
+from .logger import database_logger
+
+
+# Characters of the last message kept in a chat list entry
+SNIPPET_LENGTH = 100
+
+
+def message_preview(message: dict) -> dict:
+    """Last-message preview stored in chat list entries."""
+    return {
+        "messageId": str(message["_id"]),
+        "senderId": message["sender_id"],
+        "snippet": message["content"][:SNIPPET_LENGTH],
+        "sentAt": message["sentAt"],
+    }
+
+
+@instrument_dal
+class ChatMemberships:
+    """
+    User -> chat group membership index (one document per user and chat).
+
+    Each membership doubles as the user's chat list entry: it carries the group
+    name, a preview of the last message, lastActivityAt and the user's unread
+    count, so a chat list page is one indexed query on (user_id, lastActivityAt).
+    """
+
+    def __init__(self, db: ChatServiceDatabase):
+        # Access the "chat_memberships" collection from the database
+        self.chat_memberships = db.get_database()["chat_memberships"]
+
+    def _upsert(self, pairs: list[tuple[str, str]], chat_fields: dict | None = None) -> int:
+        """
+        Upsert (user_id, chat_id) memberships in one round trip and return how many were new.
+
+        New memberships start with `chat_fields` (group name, last message, last activity),
+        copied by default from another member's entry of the same chat.
+        """
+        if not pairs:
+            return 0
+
+        joined_at = datetime.now(UTC).replace(tzinfo=None, microsecond=0)
+        fields_by_chat = {}
+        for _, chat_id in pairs:
+            if chat_id not in fields_by_chat:
+                fields_by_chat[chat_id] = chat_fields if chat_fields is not None else self._chat_fields(chat_id)
+
+        operations = []
+        for user_id, chat_id in pairs:
+            document = {"user_id": user_id, "chat_id": chat_id, "joinedAt": joined_at, "lastActivityAt": joined_at, "unreadCount": 0}
+            document.update(fields_by_chat[chat_id])
+            operations.append(UpdateOne({"user_id": user_id, "chat_id": chat_id}, {"$setOnInsert": document}, upsert=True))
+        result = self.chat_memberships.bulk_write(operations, ordered=False)
+        return result.upserted_count
+
+    def _chat_fields(self, chat_id: str) -> dict:
+        """Chat-level chat list fields (group name, last message) from any existing member's entry."""
+        entry = self.chat_memberships.find_one(
+            {"chat_id": chat_id}, {"_id": 0, "groupName": 1, "lastMessage": 1, "lastActivityAt": 1}
+        )
+        return entry or {}
+
+    def add_members(self, chat_id: str, user_ids: list[str], group_name: str | None = None) -> int:
+        """
+        Add users to a chat's membership index. Existing memberships are left untouched.
+
+        `group_name` seeds the chat list entries of a new chat; users joining an existing
+        chat get the name and last message from the other members' entries.
+        """
+        chat_fields = {"groupName": group_name} if group_name is not None else None
+        added = self._upsert([(user_id, chat_id) for user_id in user_ids], chat_fields)
+        database_logger.info(f"Indexed {added} new member(s) for chat '{chat_id}'.")
+        return added
+
+    def remove_members(self, chat_id: str, user_ids: list[str]) -> int:
+        """Remove users from a chat's membership index."""
+        if not user_ids:
+            return 0
+
+        result = self.chat_memberships.delete_many({"chat_id": chat_id, "user_id": {"$in": user_ids}})
+        database_logger.info(f"Removed {result.deleted_count} member(s) from chat '{chat_id}' index.")
+        return result.deleted_count
+
+    def remove_chat(self, chat_id: str) -> int:
+        """Remove every membership of a chat (e.g. when the chat is deleted)."""
+        result = self.chat_memberships.delete_many({"chat_id": chat_id})
+        database_logger.info(f"Removed {result.deleted_count} membership(s) of deleted chat '{chat_id}'.")
+        return result.deleted_count
+
+    def get_chat_member_ids(self, chat_id: str) -> list[str]:
+        """Retrieve the IDs of every member of a chat (the local copy of its ejabberd affiliations)."""
+        user_ids = [
+            membership["user_id"]
+            for membership in self.chat_memberships.find({"chat_id": chat_id}, {"_id": 0, "user_id": 1})
+        ]
+        database_logger.info(f"Fetched {len(user_ids)} member(s) of chat '{chat_id}'.")
+        return user_ids
+
+    def get_user_chat_list(self, user_id: str, skip: int, limit: int) -> tuple[list[dict], int]:
+        """Retrieve a page of the user's chat list entries, most recent activity first, and the total."""
+        cursor = (
+            self.chat_memberships.find(
+                {"user_id": user_id},
+                {"_id": 0, "chat_id": 1, "groupName": 1, "lastMessage": 1, "lastActivityAt": 1, "unreadCount": 1},
+            )
+            .sort("lastActivityAt", -1)
+            .skip(skip)
+            .limit(limit)
+        )
+        entries = list(cursor)
+        total = self.chat_memberships.count_documents({"user_id": user_id})
+        database_logger.info(f"Fetched {len(entries)} chat list entries for user '{user_id}' with skip={skip}, limit={limit}. Total: {total}.")
+        return entries, total
+
+    def set_group_name(self, chat_id: str, group_name: str) -> int:
+        """Rename a chat in every member's chat list entry."""
+        result = self.chat_memberships.update_many({"chat_id": chat_id}, {"$set": {"groupName": group_name}})
+        database_logger.info(f"Renamed chat '{chat_id}' in {result.modified_count} chat list entries.")
+        return result.modified_count
+
+    def record_messages(self, chat_id: str, messages: list[dict]) -> None:
+        """
+        Reflect newly stored messages of a chat in its members' chat list entries.
+
+        Every member but the sender gets their unread count raised, and the last message
+        preview and lastActivityAt move forward (never backwards, for racing sends).
+        """
+        if not messages:
+            return
+
+        sent_by = {}
+        for message in messages:
+            sent_by[message["sender_id"]] = sent_by.get(message["sender_id"], 0) + 1
+        last = max(messages, key=lambda message: (message["sentAt"], message["_id"]))
+
+        operations = [
+            UpdateMany({"chat_id": chat_id, "user_id": {"$ne": sender_id}}, {"$inc": {"unreadCount": count}})
+            for sender_id, count in sent_by.items()
+        ]
+        operations.append(UpdateMany(
+            {"chat_id": chat_id, "$or": [{"lastMessage": None}, {"lastMessage.sentAt": {"$lte": last["sentAt"]}}]},
+            {"$set": {"lastMessage": message_preview(last), "lastActivityAt": last["sentAt"]}},
+        ))
+        self.chat_memberships.bulk_write(operations, ordered=False)
+        database_logger.debug(f"Recorded {len(messages)} message(s) in chat list entries of chat '{chat_id}'.")
+
+    def update_last_message(self, chat_id: str, message: dict) -> int:
+        """Refresh the preview of an edited message where it is the chat's last message."""
+        result = self.chat_memberships.update_many(
+            {"chat_id": chat_id, "lastMessage.messageId": str(message["_id"])},
+            {"$set": {"lastMessage.snippet": message["content"][:SNIPPET_LENGTH]}},
+        )
+        return result.modified_count
+
+    def record_deleted_message(self, chat_id: str, message: dict, new_last_message: dict | None) -> None:
+        """
+        Reflect a deleted message in its chat's list entries.
+
+        Members who had not read it yet (and had joined by the time it was sent) get one
+        unread message less, and where it was the last message the preview falls back to
+        `new_last_message` (or is cleared). Timestamps are stored to the second: a message
+        sent in the second of a read counts as unread, one sent in the second of a join
+        as not counted.
+        """
+        operations = [
+            UpdateMany(
+                {
+                    "chat_id": chat_id,
+                    "user_id": {"$ne": message["sender_id"]},
+                    "unreadCount": {"$gt": 0},
+                    "joinedAt": {"$lt": message["sentAt"]},
+                    "$or": [{"lastReadAt": None}, {"lastReadAt": {"$lte": message["sentAt"]}}],
+                },
+                {"$inc": {"unreadCount": -1}},
+            ),
+            UpdateMany(
+                {"chat_id": chat_id, "lastMessage.messageId": str(message["_id"])},
+                {"$set": {"lastMessage": message_preview(new_last_message) if new_last_message else None}},
+            ),
+        ]
+        self.chat_memberships.bulk_write(operations, ordered=False)
+
+    def is_last_message(self, chat_id: str, message_id: str) -> bool:
+        """Check whether a message is the last message shown in its chat's list entries."""
+        entry = self.chat_memberships.find_one({"chat_id": chat_id, "lastMessage.messageId": message_id}, {"_id": 1})
+        return entry is not None
+
+    def mark_read(self, chat_id: str, user_id: str) -> bool:
+        """Reset a user's unread count for a chat."""
+        result = self.chat_memberships.update_one(
+            {"chat_id": chat_id, "user_id": user_id},
+            {"$set": {"unreadCount": 0, "lastReadAt": datetime.now(UTC).replace(tzinfo=None, microsecond=0)}},
+        )
+        return result.matched_count > 0
+
+    def get_all_user_chat_ids(self, user_id: str) -> list[str]:
+        """Retrieve the IDs of every chat the user belongs to."""
+        chat_ids = [
+            membership["chat_id"]
+            for membership in self.chat_memberships.find({"user_id": user_id}, {"_id": 0, "chat_id": 1})
+        ]
+        database_logger.info(f"Fetched all {len(chat_ids)} chat IDs for user '{user_id}'.")
+        return chat_ids
+
+    def replace_user_chats(self, user_id: str, chat_ids: list[str]) -> dict:
+        """Make the user's indexed memberships match exactly the given chat IDs."""
+        removed = self.chat_memberships.delete_many({"user_id": user_id, "chat_id": {"$nin": chat_ids}}).deleted_count
+
+        added = self._upsert([(user_id, chat_id) for chat_id in chat_ids])
+
+        database_logger.info(f"Reconciled memberships for user '{user_id}': {added} added, {removed} removed.")
+        return {"added": added, "removed": removed}
@@ -1,51 +1,236 @@
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
-from datetime import datetime, UTC
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from datetime import datetime, timedelta, UTC
 
-from .database_init import ChatServiceDatabase
+from .database_init import ChatServiceDatabase, field_projection
 
-from .logger import database_logger
+from ..utils.metrics import instrument_dal
+from .logger import database_logger, database_sample_logger
 
+# Fields of a message sent to clients in history pages (besides _id)
+HISTORY_FIELDS = ("sender_id", "content", "sentAt")
+
+@instrument_dal
 class ChatMessages:
     def __init__(self, db: ChatServiceDatabase):
         # Access the "chat_messages" collection from the database
         self.chat_messages = db.get_database()["chat_messages"]
+        # Per-chat message counters ({"_id": chat_id, "count": n}), so totals never need count_documents
+        self.message_counts = db.get_database()["chat_message_counts"]
+
+    def _increment_counts(self, increments: dict[str, int]) -> None:
+        """
+        Atomically add to the message counters of several chats in one round trip.
 
-    def insert_message(self, chat_id: str, sender_id: str, content: str) -> dict:
-        """Store a message in the database."""
+        A chat without a counter starts at zero: once `seed_message_counts` has run,
+        every chat that already held messages has one.
+        """
+        operations = [
+            UpdateOne({"_id": chat_id}, {"$inc": {"count": amount}}, upsert=True)
+            for chat_id, amount in increments.items() if amount
+        ]
+        if operations:
+            self.message_counts.bulk_write(operations, ordered=False)
+
+    def insert_message(self, chat_id: str, sender_id: str, content: str, xmpp_status: str | None = None) -> dict:
+        """Store a message in the database. `xmpp_status` marks a message still waiting for XMPP relay."""
         message_data = {
             "chat_id": chat_id,
             "sender_id": sender_id,
             "content": content,
             "sentAt": datetime.now(UTC).replace(tzinfo=None, microsecond=0)
         }
+        if xmpp_status:
+            message_data["xmppStatus"] = xmpp_status
         result = self.chat_messages.insert_one(message_data)
-        database_logger.info(f"Inserted message from sender '{sender_id}' into chat '{chat_id}' with ID {result.inserted_id}.")
-        return {"messageId": str(result.inserted_id)}
+        self._increment_counts({chat_id: 1})
+        database_sample_logger.info("Inserted message from sender '%s' into chat '%s' with ID %s.", sender_id, chat_id, result.inserted_id)
+        return {"messageId": str(result.inserted_id), "message": message_data}
+
+    def insert_messages(self, messages: list[dict], ordered: bool = False, xmpp_status: str | None = None) -> list[dict]:
+        """
+        Store several messages with one insert_many round trip.
+
+        `messages` holds {"chat_id", "sender_id", "content"} dicts. IDs are assigned
+        client-side, so the result lists, in input order, either {"messageId", "message"}
+        or {"error"} per item. With `ordered` the insert stops at the first failure and
+        the remaining items are reported as not inserted; unordered inserts keep going.
+        """
+        if not messages:
+            return []
+
+        sent_at = datetime.now(UTC).replace(tzinfo=None, microsecond=0)
+        documents = []
+        for message in messages:
+            document = {
+                "_id": ObjectId(),
+                "chat_id": message["chat_id"],
+                "sender_id": message["sender_id"],
+                "content": message["content"],
+                "sentAt": sent_at,
+            }
+            if xmpp_status:
+                document["xmppStatus"] = xmpp_status
+            documents.append(document)
+
+        errors = {}
+        try:
+            self.chat_messages.insert_many(documents, ordered=ordered)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                errors[write_error["index"]] = write_error.get("errmsg", "Write error")
+            if ordered and errors:
+                # An ordered insert stops at the first failure
+                first_failure = min(errors)
+                for index in range(first_failure + 1, len(documents)):
+                    errors.setdefault(index, "Not inserted: an earlier message in the ordered batch failed")
 
-    def fetch_message(self, message_id: str) -> dict | None:
-        """Retrieve a message by ID."""
+        results = [
+            {"error": errors[index]} if index in errors else {"messageId": str(document["_id"]), "message": document}
+            for index, document in enumerate(documents)
+        ]
+        increments = {}
+        for index, document in enumerate(documents):
+            if index not in errors:
+                increments[document["chat_id"]] = increments.get(document["chat_id"], 0) + 1
+        self._increment_counts(increments)
+
+        database_sample_logger.info("Inserted %s of %s messages in one batch (ordered=%s).", len(documents) - len(errors), len(documents), ordered)
+        if errors:
+            database_logger.warning(f"Batch insert failed for {len(errors)} of {len(documents)} messages.")
+        return results
+
+    def fetch_message(self, message_id: str, fields: tuple[str, ...] | None = None) -> dict | None:
+        """Retrieve a message by ID, with only `fields` (and _id) when given."""
         try:
             obj_id = ObjectId(message_id)
         except InvalidId:
             database_logger.warning(f"Invalid ObjectId for message fetch: {message_id}")
             return None
 
-        message = self.chat_messages.find_one({"_id": obj_id})
+        message = self.chat_messages.find_one({"_id": obj_id}, field_projection(fields))
         if message:
-            database_logger.info(f"Fetched message with ID {message_id}.")
+            database_sample_logger.info("Fetched message with ID %s.", message_id)
         else:
-            database_logger.info(f"No message found with ID {message_id}.")
+            database_sample_logger.info("No message found with ID %s.", message_id)
         return message
 
-    def fetch_messages(self, chat_id: str, skip: int, limit: int, sort_by="sentAt", sort_order=-1) -> list | None:
-        """Retrieve paginated messages for a chat group."""
-        cursor = self.chat_messages.find({"chat_id": chat_id}).sort(sort_by, sort_order).skip(skip).limit(limit)
+    def fetch_messages(self, chat_id: str, skip: int, limit: int, sort_by="sentAt", sort_order=-1, fields: tuple[str, ...] | None = None) -> list | None:
+        """
+        Retrieve paginated messages for a chat group, with only `fields` (and _id) when given.
+
+        Ties on `sort_by` are broken by _id, the (sentAt, _id) order cursor pages and the
+        recent-messages cache use, so no message is repeated or skipped across pages.
+        """
+        cursor = (
+            self.chat_messages.find({"chat_id": chat_id}, field_projection(fields))
+            .sort([(sort_by, sort_order), ("_id", sort_order)])
+            .skip(skip)
+            .limit(limit)
+        )
         messages = list(cursor)
-        total_messages = self.chat_messages.count_documents({"chat_id": chat_id})
-        database_logger.info(f"Fetched {len(messages)} messages for chat '{chat_id}' with skip={skip}, limit={limit}. Total messages: {total_messages}.")
+        total_messages = self.count_messages(chat_id)
+        database_sample_logger.info("Fetched %s messages for chat '%s' with skip=%s, limit=%s. Total messages: %s.", len(messages), chat_id, skip, limit, total_messages)
         return messages, total_messages
 
+    def fetch_messages_by_cursor(
+        self, chat_id: str, limit: int, before: str | None = None, after: str | None = None, fields: tuple[str, ...] | None = None
+    ) -> tuple[list, bool]:
+        """
+        Retrieve a page of messages for a chat group using keyset pagination on (sentAt, _id).
+
+        `before` returns messages older than the cursor message and `after` returns messages
+        newer than it. Without a cursor the newest messages are returned. Messages are always
+        returned newest first, together with a flag telling whether more messages exist
+        beyond the page in the direction of travel. `fields` limits the returned
+        messages to those fields (and _id).
+        """
+        cursor_id = before or after
+        query = {"chat_id": chat_id}
+
+        if cursor_id:
+            try:
+                cursor_obj_id = ObjectId(cursor_id)
+            except InvalidId:
+                database_logger.warning(f"Invalid ObjectId for message cursor: {cursor_id}")
+                raise ValueError(f"Invalid cursor: {cursor_id}")
+
+            anchor = self.chat_messages.find_one({"_id": cursor_obj_id, "chat_id": chat_id}, {"sentAt": 1})
+            if not anchor:
+                raise ValueError(f"Cursor message {cursor_id} not found in chat {chat_id}")
+
+            op = "$lt" if before else "$gt"
+            query["$or"] = [
+                {"sentAt": {op: anchor["sentAt"]}},
+                {"sentAt": anchor["sentAt"], "_id": {op: cursor_obj_id}},
+            ]
+
+        order = 1 if after else -1
+        cursor = self.chat_messages.find(query, field_projection(fields)).sort([("sentAt", order), ("_id", order)]).limit(limit + 1)
+        messages = list(cursor)
+
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        if after:
+            messages.reverse()
+
+        database_sample_logger.info("Fetched %s messages for chat '%s' with before=%s, after=%s, limit=%s. More: %s.", len(messages), chat_id, before, after, limit, has_more)
+        return messages, has_more
+
+    def count_messages(self, chat_id: str) -> int:
+        """Return the message count of a chat group from its counter (one indexed point read)."""
+        counter = self.message_counts.find_one({"_id": chat_id}, {"count": 1})
+        # No counter: nothing was stored in the chat since the counters were seeded
+        total_messages = max(0, counter["count"]) if counter else 0
+        database_sample_logger.info("Counted %s messages for chat '%s'.", total_messages, chat_id)
+        return total_messages
+
+    def seed_message_counts(self) -> dict | None:
+        """
+        Build the message counters from the stored messages if none exist yet.
+
+        Run at startup, before messages are stored or counted, so chats holding messages
+        from before the counters never start counting at zero. Returns the recount
+        summary, or None when there was nothing to seed.
+        """
+        if self.message_counts.find_one({}, {"_id": 1}) is not None:
+            return None
+        if self.chat_messages.find_one({}, {"_id": 1}) is None:
+            return None
+        database_logger.info("No message counters found, building them from the stored messages.")
+        return self.recount_messages()
+
+    def recount_messages(self, chat_ids: list[str] | None = None) -> dict:
+        """
+        Rebuild message counters from the messages themselves (all chats, or only `chat_ids`).
+
+        Counters of chats without messages are reset to zero. Returns how many counters
+        were checked and how many had drifted.
+        """
+        match = {"chat_id": {"$in": chat_ids}} if chat_ids is not None else {}
+        actual = {
+            group["_id"]: group["count"]
+            for group in self.chat_messages.aggregate([
+                {"$match": match},
+                {"$group": {"_id": "$chat_id", "count": {"$sum": 1}}},
+            ])
+        }
+        counter_filter = {"_id": {"$in": chat_ids}} if chat_ids is not None else {}
+        stored = {counter["_id"]: counter.get("count", 0) for counter in self.message_counts.find(counter_filter)}
+
+        operations = [
+            UpdateOne({"_id": chat_id}, {"$set": {"count": actual.get(chat_id, 0)}}, upsert=True)
+            for chat_id in set(actual) | set(stored)
+            if stored.get(chat_id) != actual.get(chat_id, 0)
+        ]
+        if operations:
+            self.message_counts.bulk_write(operations, ordered=False)
+
+        database_logger.info(f"Recounted messages of {len(set(actual) | set(stored))} chats, fixed {len(operations)} counters.")
+        return {"chats": len(set(actual) | set(stored)), "fixed": len(operations)}
+
     def update_message(self, message_id: str, new_content: str) -> bool:
         """Update a message's content."""
         try:
@@ -59,24 +244,98 @@ class ChatMessages:
             {"$set": {"content": new_content, "editedAt": datetime.now(UTC).replace(tzinfo=None, microsecond=0)}}
         )
         if result.modified_count > 0:
-            database_logger.info(f"Updated content of message ID {message_id}.")
+            database_sample_logger.info("Updated content of message ID %s.", message_id)
             return True
         else:
-            database_logger.info(f"No message updated for ID {message_id}.")
+            database_sample_logger.info("No message updated for ID %s.", message_id)
             return False
 
+    def find_and_update_message(self, message_id: str, new_content: str, chat_id: str | None = None) -> dict | None:
+        """Update a message's content and return the updated document in the same round trip."""
+        try:
+            obj_id = ObjectId(message_id)
+        except InvalidId:
+            database_logger.warning(f"Invalid ObjectId for message update: {message_id}")
+            return None
+
+        query = {"_id": obj_id}
+        if chat_id is not None:
+            query["chat_id"] = chat_id
+
+        message = self.chat_messages.find_one_and_update(
+            query,
+            {"$set": {"content": new_content, "editedAt": datetime.now(UTC).replace(tzinfo=None, microsecond=0)}},
+            return_document=ReturnDocument.AFTER
+        )
+        if message:
+            database_sample_logger.info("Updated content of message ID %s.", message_id)
+        else:
+            database_sample_logger.info("No message updated for ID %s.", message_id)
+        return message
+
     def delete_message(self, message_id: str) -> bool:
         """Delete a message by ID."""
+        return self.find_and_delete_message(message_id) is not None
+
+    def find_and_delete_message(self, message_id: str, chat_id: str | None = None) -> dict | None:
+        """Delete a message and return the deleted document in the same round trip."""
         try:
             obj_id = ObjectId(message_id)
         except InvalidId:
             database_logger.warning(f"Invalid ObjectId for message deletion: {message_id}")
-            return False
+            return None
 
-        result = self.chat_messages.delete_one({"_id": obj_id})
-        if result.deleted_count > 0:
-            database_logger.info(f"Deleted message with ID {message_id}.")
-            return True
+        query = {"_id": obj_id}
+        if chat_id is not None:
+            query["chat_id"] = chat_id
+
+        message = self.chat_messages.find_one_and_delete(query)
+        if message:
+            self._increment_counts({message["chat_id"]: -1})
+            database_sample_logger.info("Deleted message with ID %s.", message_id)
         else:
-            database_logger.info(f"No message found to delete with ID {message_id}.")
-            return False
\ No newline at end of file
+            database_sample_logger.info("No message found to delete with ID %s.", message_id)
+        return message
+
+    def mark_relayed(self, message_id: str) -> bool:
+        """Clear the XMPP relay state of a message once it has been delivered to the MUC."""
+        result = self.chat_messages.update_one(
+            {"_id": ObjectId(message_id)},
+            {"$unset": {"xmppStatus": "", "xmppAttempts": "", "xmppError": "", "xmppOwner": "", "xmppLeaseUntil": ""}}
+        )
+        database_sample_logger.debug("Marked message %s as relayed via XMPP.", message_id)
+        return result.modified_count > 0
+
+    def mark_relay_failed(self, message_id: str, attempts: int, error: str) -> bool:
+        """Dead-letter a message whose XMPP relay kept failing."""
+        result = self.chat_messages.update_one(
+            {"_id": ObjectId(message_id)},
+            {
+                "$set": {"xmppStatus": "failed", "xmppAttempts": attempts, "xmppError": error},
+                "$unset": {"xmppOwner": "", "xmppLeaseUntil": ""},
+            }
+        )
+        database_logger.warning(f"Dead-lettered message {message_id} after {attempts} XMPP relay attempts: {error}")
+        return result.modified_count > 0
+
+    def claim_pending_relay(self, status: str, older_than_seconds: int, owner: str, lease_seconds: int) -> dict | None:
+        """
+        Atomically claim the oldest message whose XMPP relay is pending (or failed) for `owner`.
+
+        The claim is a lease: other processes skip the message until it expires, so a
+        restarted fleet re-queues each message once. A claimed dead letter goes back to pending.
+        """
+        now = datetime.now(UTC).replace(tzinfo=None, microsecond=0)
+        message = self.chat_messages.find_one_and_update(
+            {
+                "xmppStatus": status,
+                "sentAt": {"$lte": now - timedelta(seconds=older_than_seconds)},
+                "$or": [{"xmppLeaseUntil": None}, {"xmppLeaseUntil": {"$lt": now}}],
+            },
+            {"$set": {"xmppStatus": "pending", "xmppOwner": owner, "xmppLeaseUntil": now + timedelta(seconds=lease_seconds)}},
+            sort=[("sentAt", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if message:
+            database_sample_logger.info("Claimed message %s with XMPP relay status '%s' for %s.", message["_id"], status, owner)
+        return message
@@ -4,6 +4,16 @@ from pymongo.errors import ConnectionFailure
 from config.database_config import DatabaseConfig
 from .logger import database_logger
 
+
+def field_projection(fields: tuple[str, ...] | None) -> dict | None:
+    """Projection returning only `fields` (and _id), or None for whole documents."""
+    if fields is None:
+        return None
+    projection = {"_id": 1}
+    projection.update({field: 1 for field in fields})
+    return projection
+
+
 class ChatServiceDatabase:
     def __init__(self):
         """Initialize MongoDB connection and setup collections."""
@@ -19,6 +29,10 @@ class ChatServiceDatabase:
             # Create collections and indexes
             self._create_collections_and_indexes()
 
+            # Report hot queries that are not served by an index
+            if DatabaseConfig.EXPLAIN_HOT_QUERIES:
+                self._check_hot_queries()
+
         except ConnectionFailure as e:
             # Log connection failure with database logger
             database_logger.error(f"Could not connect to MongoDB: {e}")
@@ -33,11 +47,66 @@ class ChatServiceDatabase:
 
             # Optimize index creation
             existing_indexes = {index["name"] for index in self.db[collection].list_indexes()}
-            for field, order in indexes:
-                index_name = f"{field}_index"
+            for index in indexes:
+                keys, index_name, options = self._parse_index_spec(index)
                 if index_name not in existing_indexes:
-                    self.db[collection].create_index([(field, order)], name=index_name, background=True)
-                    database_logger.info(f"Created index '{index_name}' on '{collection}' collection.")
+                    self.db[collection].create_index(keys, name=index_name, background=True, **options)
+                    database_logger.info(f"Created index '{index_name}' on '{collection}' collection with options {options}.")
+
+            # Drop indexes superseded by the configured ones
+            for index_name in DatabaseConfig.DROPPED_INDEXES.get(collection, []):
+                if index_name in existing_indexes:
+                    self.db[collection].drop_index(index_name)
+                    database_logger.info(f"Dropped superseded index '{index_name}' on '{collection}' collection.")
+
+    @staticmethod
+    def _parse_index_spec(index) -> tuple[list[tuple], str, dict]:
+        """Normalize an index spec from DatabaseConfig.COLLECTIONS into (keys, name, create_index options)."""
+        if isinstance(index, dict):
+            options = dict(index)
+            keys = list(options.pop("keys"))
+            name = options.pop("name", None)
+        elif isinstance(index, list):
+            keys, name, options = index, None, {}
+        else:
+            keys, name, options = [index], None, {}
+
+        if not name:
+            name = f"{'_'.join(field for field, _ in keys)}_index"
+        return keys, name, options
+
+    def _check_hot_queries(self) -> list[str]:
+        """Explain the configured hot queries and report the ones planned as collection scans."""
+        collection_scans = []
+        for collection, queries in DatabaseConfig.HOT_QUERIES.items():
+            for query in queries:
+                try:
+                    cursor = self.db[collection].find(query["filter"])
+                    if query.get("sort"):
+                        cursor = cursor.sort(query["sort"])
+                    plan = cursor.limit(1).explain()
+                except Exception as e:
+                    database_logger.warning(f"Could not explain hot query '{query['name']}' on '{collection}': {e}")
+                    continue
+
+                if self._has_collection_scan(plan.get("queryPlanner", {}).get("winningPlan", {})):
+                    collection_scans.append(f"{collection}.{query['name']}")
+                    database_logger.warning(f"Hot query '{query['name']}' on '{collection}' uses a collection scan (COLLSCAN). Check its indexes.")
+                else:
+                    database_logger.info(f"Hot query '{query['name']}' on '{collection}' is served by an index.")
+
+        return collection_scans
+
+    @staticmethod
+    def _has_collection_scan(plan) -> bool:
+        """Walk a query plan tree looking for a COLLSCAN stage."""
+        if isinstance(plan, dict):
+            if plan.get("stage") == "COLLSCAN":
+                return True
+            return any(ChatServiceDatabase._has_collection_scan(value) for value in plan.values())
+        if isinstance(plan, list):
+            return any(ChatServiceDatabase._has_collection_scan(value) for value in plan)
+        return False
 
     def get_database(self):
         """Returns the database instance."""
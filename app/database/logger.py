@@ -1,21 +1,15 @@
-import logging
 import os
 
+from config.logging_config import LoggingConfig
+
+from ..utils.logging_setup import SampledLogger, create_logger
+
 # Get absolute path to the current file's directory (app/database/)
 log_dir = os.path.dirname(__file__)
 log_file_path = os.path.join(log_dir, 'database.log')
 
-# Setup logger
-database_logger = logging.getLogger("database_logger")
-database_logger.setLevel(logging.DEBUG)
-database_logger.propagate = True
-database_logger.handlers.clear()
-
-file_handler = logging.FileHandler(log_file_path, mode='w')  # Use append mode
-file_handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter(
-    'Module %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s - %(asctime)s'
-)
-file_handler.setFormatter(formatter)
+# Setup logger (written by a background thread, see app/utils/logging_setup.py)
+database_logger = create_logger("database_logger", log_file_path, LoggingConfig.LOG_LEVEL_DATABASE)
 
-database_logger.addHandler(file_handler)
\ No newline at end of file
+# Per-message lines on the hot path, logged for a sample of calls only
+database_sample_logger = SampledLogger(database_logger)
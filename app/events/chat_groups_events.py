@@ -1,5 +1,8 @@
 from flask import current_app, has_request_context, request
 from flask_socketio import emit
+from .chat_rooms import add_users_to_chat_room, close_chat_room, remove_users_from_chat_room
+from .fanout import emit_to_rooms
+from .instrumentation import record_event_error
 from .logger import events_logger  # Assuming logger is set up in this file
 
 class ChatGroupsEvents:
@@ -11,14 +14,14 @@ class ChatGroupsEvents:
         Emit success to specific user rooms, or fallback to broadcast (e.g., in tests).
         """
         if target_user_ids:
-            for user_id in target_user_ids:
-                emit(event_name, response, room=user_id)
+            emit_to_rooms(event_name, response, target_user_ids)
         elif has_request_context() and hasattr(request, 'sid'):
             emit(event_name, response, room=request.sid)
         else:
             emit(event_name, response, broadcast=True)
 
     def _emit_error(self, error_type, message):
+        record_event_error()
         if has_request_context() and hasattr(request, 'sid'):
             emit('error', {
                 "type": error_type,
@@ -66,6 +69,7 @@ class ChatGroupsEvents:
 
             # Log successful creation of chat group
             events_logger.info(f"Chat group created: {chat_id} ({group_name})")
+            add_users_to_chat_room(chat_id, chat_group["users"])
             self._emit_success('chatGroupCreated', response, target_user_ids=chat_group["users"])
 
         except Exception as e:
@@ -136,6 +140,7 @@ class ChatGroupsEvents:
             # Log successful deletion
             if result:
                 events_logger.info(f"Chat group deleted: {chat_id}")
+                close_chat_room(chat_id)
             else:
                 events_logger.warning(f"Failed to delete chat group: {chat_id}")
 
@@ -174,6 +179,7 @@ class ChatGroupsEvents:
 
             # Log successful user addition
             events_logger.info(f"Users added to chat group: {chat_id} - {added_users}")
+            add_users_to_chat_room(chat_id, added_users)
 
             self._emit_success('usersAddedToChatGroup', response, added_users)
 
@@ -210,6 +216,7 @@ class ChatGroupsEvents:
 
             # Log successful user removal
             events_logger.info(f"Users removed from chat group: {chat_id} - {removed_users}")
+            remove_users_from_chat_room(chat_id, removed_users)
 
             self._emit_success('usersRemovedFromChatGroup', response, removed_users)
 
@@ -1,14 +1,18 @@
 from flask import current_app, request, has_request_context
 from flask_socketio import emit
 
-from .logger import events_logger
+from .chat_rooms import chat_room
+from .fanout import emit_to_rooms
+from .instrumentation import record_event_error
+from ..utils.logging_setup import Payload
+from .logger import events_logger, events_sample_logger
 
 class ChatMessagesEvents:
     def __init__(self):
         self.chat_messages_service = current_app.config['chat_messages_service']
-        self.chat_groups_service = current_app.config['chat_groups_service']
 
     def _emit_error(self, message, user_id=None, type="processing_error"):
+        record_event_error()
         error_payload = {
             "type": type,
             "message": message
@@ -20,16 +24,9 @@ class ChatMessagesEvents:
         else:
             emit('error', error_payload, broadcast=True)
 
-    def _emit_to_chat_users(self, event_name, payload, chat_id, exclude_user_id=None):
-        """Emit to each chat user in their own room (excluding one if specified)."""
-        try:
-            users = self.chat_groups_service.get_chat_users(chat_id)
-            for user_id in users:
-                if user_id != exclude_user_id:
-                    events_logger.info(f"Emitting event '{event_name}' to user {user_id} in chatId={chat_id}")
-                    emit(event_name, payload, room=user_id)
-        except Exception as e:
-            self._emit_error(f"Failed to fetch users for chatId={chat_id}: {str(e)}")
+    def _emit_to_chat(self, event_name, payload, chat_id):
+        """Broadcast to the chat room, which every online member joined on connect."""
+        emit_to_rooms(event_name, payload, [chat_room(chat_id)])
 
     # -------------------------------------------------------------------------
     # Event: Send Message
@@ -53,7 +50,7 @@ class ChatMessagesEvents:
                 raise ValueError("Invalid request: chatId, senderId, and content are required fields")
 
             # Log the message send event
-            events_logger.info(f"Sending message in chatId={chat_id} from sender={sender_id}: {content}")
+            events_sample_logger.info("Sending message in chatId=%s from sender=%s: %s", chat_id, sender_id, Payload(content))
 
             new_message = self.chat_messages_service.send_message(chat_id, sender_id, content)
 
@@ -71,15 +68,94 @@ class ChatMessagesEvents:
             }
 
             # Log the successful message send
-            events_logger.info(f"Message sent in chatId={chat_id} by sender={sender_id} with messageId={new_message['_id']}")
+            events_sample_logger.info("Message sent in chatId=%s by sender=%s with messageId=%s", chat_id, sender_id, new_message["_id"])
 
-            self._emit_to_chat_users('receiveMessage', response, chat_id, exclude_user_id=None)
+            self._emit_to_chat('receiveMessage', response, chat_id)
 
         except Exception as e:
             # Log error during message send
             events_logger.error(f"Error sending message in chatId={data.get('chatId')} from sender={data.get('senderId')}: {str(e)}")
             self._emit_error(str(e), user_id=data.get('senderId'))
 
+    # -------------------------------------------------------------------------
+    # Event: Send Message Batch
+    # Channel: chat/message/batch
+    # -------------------------------------------------------------------------
+    def handle_send_message_batch(self, data):
+        """
+        Expected payload (SendMessageBatchRequest):
+          {
+            "messages": [
+              {"chatId": "chat123", "senderId": "user1", "content": "Hello, team!"},
+              ...
+            ],
+            "ordered": false
+          }
+
+        The sender receives one messageBatchResult with the messageId or error of every
+        item, and each chat receives a single receiveMessage with its stored messages.
+        """
+        try:
+            messages = data.get('messages')
+            if not isinstance(messages, list):
+                raise ValueError("Invalid request: messages must be a list")
+
+            # Log the batch send event
+            events_sample_logger.info("Sending a batch of %s messages", len(messages))
+
+            results = self.chat_messages_service.send_messages(
+                [{
+                    "chat_id": item.get('chatId'),
+                    "sender_id": item.get('senderId'),
+                    "content": item.get('content'),
+                } if isinstance(item, dict) else item for item in messages],
+                ordered=bool(data.get('ordered', False))
+            )
+
+            items = []
+            chats = {}
+            for index, result in enumerate(results):
+                if "error" in result:
+                    items.append({"index": index, "error": result["error"]})
+                    continue
+                message = result["message"]
+                items.append({"index": index, "messageId": str(message["_id"])})
+                chats.setdefault(message["chat_id"], []).append({
+                    "messageId": str(message["_id"]),
+                    "senderId": message["sender_id"],
+                    "content": message["content"],
+                    "sentAt": message["sentAt"].isoformat()
+                })
+
+            # One payload per chat room, however many of its messages were in the batch
+            for chat_id, chat_messages in chats.items():
+                response = {
+                    "chatId": chat_id,
+                    "page": 1,
+                    "limit": len(chat_messages),
+                    "total": len(chat_messages),
+                    "messages": chat_messages
+                }
+                self._emit_to_chat('receiveMessage', response, chat_id)
+
+            batch_result = {
+                "total": len(results),
+                "succeeded": len(results) - sum(1 for item in items if "error" in item),
+                "results": items
+            }
+            if has_request_context() and hasattr(request, 'sid'):
+                emit('messageBatchResult', batch_result, room=request.sid)
+            else:
+                emit('messageBatchResult', batch_result)
+
+            # Log the successful batch send
+            events_sample_logger.info("Message batch sent: %s of %s stored in %s chats", batch_result["succeeded"], batch_result["total"], len(chats))
+
+        except Exception as e:
+            # Log error during batch send
+            events_logger.error(f"Error sending message batch: {str(e)}")
+            self._emit_error(str(e))
+
     # -------------------------------------------------------------------------
     # Event: Edit Message
     # Channel: chat/{chatId}/message/edit
@@ -99,7 +175,7 @@ class ChatMessagesEvents:
             new_content = data.get('newContent')
 
             # Log the message edit event
-            events_logger.info(f"Editing message in chatId={chat_id}, messageId={message_id} to new content: {new_content}")
+            events_sample_logger.info("Editing message in chatId=%s, messageId=%s to new content: %s", chat_id, message_id, Payload(new_content))
 
             updated_message = self.chat_messages_service.edit_message(chat_id, message_id, new_content)
 
@@ -111,9 +187,9 @@ class ChatMessagesEvents:
             }
 
             # Log the successful message edit
-            events_logger.info(f"Message edited in chatId={chat_id}, messageId={message_id}, new content: {new_content}")
+            events_sample_logger.info("Message edited in chatId=%s, messageId=%s", chat_id, message_id)
 
-            self._emit_to_chat_users('messageEdited', response, chat_id)
+            self._emit_to_chat('messageEdited', response, chat_id)
 
         except Exception as e:
             # Log error during message edit
@@ -137,7 +213,7 @@ class ChatMessagesEvents:
             message_id = data.get('messageId')
 
             # Log the message delete event
-            events_logger.info(f"Deleting message in chatId={chat_id}, messageId={message_id}")
+            events_sample_logger.info("Deleting message in chatId=%s, messageId=%s", chat_id, message_id)
 
             self.chat_messages_service.delete_message(chat_id, message_id)
 
@@ -147,9 +223,9 @@ class ChatMessagesEvents:
             }
 
             # Log the successful message delete
-            events_logger.info(f"Message deleted in chatId={chat_id}, messageId={message_id}")
+            events_sample_logger.info("Message deleted in chatId=%s, messageId=%s", chat_id, message_id)
 
-            self._emit_to_chat_users('messageDeleted', response, chat_id)
+            self._emit_to_chat('messageDeleted', response, chat_id)
 
         except Exception as e:
             # Log error during message deletion
@@ -168,39 +244,71 @@ class ChatMessagesEvents:
             "page": 1,
             "limit": 20
           }
+
+        Cursor mode (keyset pagination) is used when "before" or "after" is present:
+          {
+            "chatId": "chat123",
+            "before": "msg567",   # or "after": "msg567"; null starts from the newest message
+            "limit": 20,
+            "includeTotal": false
+          }
         """
         try:
             chat_id = data.get('chatId')
-            page = data.get('page', 1)
             limit = data.get('limit', 20)
 
-            # Log the request for message history
-            events_logger.info(f"Requesting message history for chatId={chat_id}, page={page}, limit={limit}")
+            if 'before' in data or 'after' in data:
+                before = data.get('before')
+                after = data.get('after')
+                include_total = bool(data.get('includeTotal', False))
+
+                # Log the request for message history
+                events_sample_logger.info("Requesting message history for chatId=%s, before=%s, after=%s, limit=%s", chat_id, before, after, limit)
+
+                messages_list, next_cursor, total = self.chat_messages_service.get_messages_by_cursor(
+                    chat_id, limit, before=before, after=after, include_total=include_total
+                )
+
+                response = {
+                    "chatId": chat_id,
+                    "limit": limit,
+                    "nextCursor": next_cursor,
+                }
+                if after:
+                    response["after"] = after
+                else:
+                    response["before"] = before
+                if total is not None:
+                    response["total"] = total
+            else:
+                page = data.get('page', 1)
 
-            messages_list, total = self.chat_messages_service.get_messages(chat_id, page, limit)
-        
-            formatted_messages = [{
+                # Log the request for message history
+                events_sample_logger.info("Requesting message history for chatId=%s, page=%s, limit=%s", chat_id, page, limit)
+
+                messages_list, total = self.chat_messages_service.get_messages(chat_id, page, limit)
+
+                response = {
+                    "chatId": chat_id,
+                    "page": page,
+                    "limit": limit,
+                    "total": total,
+                }
+
+            response["messages"] = [{
                 "messageId": str(msg["_id"]),
                 "senderId": msg["sender_id"],
                 "content": msg["content"],
                 "sentAt": msg["sentAt"].isoformat(),
             } for msg in messages_list]
 
-            response = {
-                "chatId": chat_id,
-                "page": page,
-                "limit": limit,
-                "total": total,
-                "messages": formatted_messages
-            }
-
             if has_request_context() and hasattr(request, 'sid'):
                 emit('receiveMessage', response, room=request.sid)
             else:
                 emit('receiveMessage', response)
 
             # Log the successful message history retrieval
-            events_logger.info(f"Message history for chatId={chat_id} retrieved successfully: {response}")
+            events_sample_logger.info("Message history for chatId=%s retrieved successfully: %s", chat_id, Payload(response["messages"]))
 
         except Exception as e:
             # Log error during message history request
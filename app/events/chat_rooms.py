@@ -0,0 +1,32 @@
+from flask import current_app
+from flask_socketio import join_room
+
+
+def chat_room(chat_id: str) -> str:
+    """Socket.IO room shared by the online sessions of a chat's members."""
+    return f"chat:{chat_id}"
+
+
+def join_chat_rooms(chat_ids: list[str]) -> None:
+    """Join the current session to the rooms of the given chats (on connect)."""
+    for chat_id in chat_ids:
+        join_room(chat_room(chat_id))
+
+
+def add_users_to_chat_room(chat_id: str, user_ids: list[str]) -> None:
+    """Make the online sessions of the users join the chat room, on every node."""
+    manager = current_app.extensions['socketio'].server.manager
+    for user_id in user_ids:
+        manager.enter_room_of(user_id, chat_room(chat_id))
+
+
+def remove_users_from_chat_room(chat_id: str, user_ids: list[str]) -> None:
+    """Make the online sessions of the users leave the chat room, on every node."""
+    manager = current_app.extensions['socketio'].server.manager
+    for user_id in user_ids:
+        manager.leave_room_of(user_id, chat_room(chat_id))
+
+
+def close_chat_room(chat_id: str) -> None:
+    """Remove every session from the room of a deleted chat."""
+    current_app.extensions['socketio'].close_room(chat_room(chat_id))
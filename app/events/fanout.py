@@ -0,0 +1,22 @@
+from flask_socketio import emit
+
+from ..utils.metrics import SIZE_BUCKETS, metrics
+
+# Counted instead of logging every recipient: count = emits, sum = rooms addressed
+SOCKETIO_FANOUT_ROOMS = metrics.histogram(
+    "socketio_fanout_rooms", "Rooms addressed per fan-out emit", ["event"], buckets=SIZE_BUCKETS
+)
+
+
+def emit_to_rooms(event_name: str, payload, rooms) -> None:
+    """
+    Emit one event to several rooms in a single call.
+
+    The payload is encoded once and every connected session in any of the
+    rooms receives it once, however many of the rooms it has joined.
+    """
+    rooms = list(dict.fromkeys(rooms))
+    if not rooms:
+        return
+    emit(event_name, payload, to=rooms)
+    SOCKETIO_FANOUT_ROOMS.observe(len(rooms), event=event_name)
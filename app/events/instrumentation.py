@@ -0,0 +1,60 @@
+import functools
+import time
+from contextvars import ContextVar
+
+from flask_socketio import SocketIO
+
+from ..utils.metrics import metrics
+
+SOCKETIO_EVENT_SECONDS = metrics.histogram(
+    "socketio_event_duration_seconds", "Duration of Socket.IO event handlers", ["event"]
+)
+SOCKETIO_EVENT_ERRORS = metrics.counter(
+    "socketio_event_errors_total", "Socket.IO events answered with an error or whose handler raised", ["event"]
+)
+
+# Event whose handler is running, so errors it emits are counted against it
+_current_event = ContextVar("socketio_event", default="unknown")
+
+
+def record_event_error() -> None:
+    """Count an error answered by the running event handler (call it where the error is emitted)."""
+    SOCKETIO_EVENT_ERRORS.inc(event=_current_event.get())
+
+
+def timed_handler(event_name: str, handler):
+    """Wrap a Socket.IO event handler to record its duration and the errors it raises."""
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        token = _current_event.set(event_name)
+        try:
+            return handler(*args, **kwargs)
+        except Exception:
+            SOCKETIO_EVENT_ERRORS.inc(event=event_name)
+            raise
+        finally:
+            _current_event.reset(token)
+            SOCKETIO_EVENT_SECONDS.observe(time.perf_counter() - start, event=event_name)
+    return wrapper
+
+
+class InstrumentedSocketIO:
+    """SocketIO proxy whose on_event registers timed handlers."""
+
+    def __init__(self, socketio: SocketIO):
+        self._socketio = socketio
+
+    def on_event(self, message, handler, namespace=None):
+        return self._socketio.on_event(message, timed_handler(message, handler), namespace=namespace)
+
+    def __getattr__(self, name):
+        return getattr(self._socketio, name)
+
+
+def instrument_events(register):
+    """Decorator for the register_*_events functions: every handler they register is timed."""
+    @functools.wraps(register)
+    def wrapper(socketio: SocketIO, *args, **kwargs):
+        return register(InstrumentedSocketIO(socketio), *args, **kwargs)
+    return wrapper
@@ -1,31 +1,16 @@
-import logging
 import os
 
+from config.logging_config import LoggingConfig
+
+from ..utils.logging_setup import SampledLogger, create_logger
+
 # Get absolute path to the current file's directory (app/events/)
 log_dir = os.path.dirname(__file__)
 log_file_path = os.path.join(log_dir, 'events.log')
 
-# Setup logger for events
-events_logger = logging.getLogger("events_logger")
-events_logger.setLevel(logging.DEBUG)
-events_logger.propagate = False
-events_logger.handlers.clear()
-
-# Create a file handler to store logs in 'events.log'
-file_handler = logging.FileHandler(log_file_path, mode='w')  # Use 'w' for overwriting, 'a' for append
-file_handler.setLevel(logging.DEBUG)
-
-# Define the format for the log entries
-formatter = logging.Formatter(
-    'Module %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s - %(asctime)s'
-)
-file_handler.setFormatter(formatter)
-
-# Add the file handler to the logger
-events_logger.addHandler(file_handler)
+# Setup logger for events (written by a background thread, see app/utils/logging_setup.py).
+# Set LOG_CONSOLE=true to also see the logs on the terminal (useful during development)
+events_logger = create_logger("events_logger", log_file_path, LoggingConfig.LOG_LEVEL_EVENTS, propagate=False)
 
-# Optionally, you can also add a console handler to see logs on the terminal (useful during development)
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)  # Set this to INFO or ERROR for terminal output
-console_handler.setFormatter(formatter)
-events_logger.addHandler(console_handler)
+# Per-message lines on the hot path, logged for a sample of calls only
+events_sample_logger = SampledLogger(events_logger)
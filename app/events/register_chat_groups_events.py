@@ -1,7 +1,9 @@
 from flask import current_app
 from flask_socketio import SocketIO
 from ..events.chat_groups_events import ChatGroupsEvents
+from ..events.instrumentation import instrument_events
 
+@instrument_events
 def register_chat_group_events(socketio: SocketIO):
     """
     Registers all chat group-related event handlers to the SocketIO instance.
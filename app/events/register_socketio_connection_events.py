@@ -1,6 +1,10 @@
+from flask import current_app
 from flask_socketio import SocketIO
 from ..events.socketio_connection_events import SocketIOConnectionEvents
+from ..events.instrumentation import instrument_events
+from ..utils.metrics import metrics
 
+@instrument_events
 def register_socketio_connection_events(socketio: SocketIO):
     """
     Registers all SocketIO connection-related event handlers to the SocketIO instance.
@@ -9,4 +13,14 @@ def register_socketio_connection_events(socketio: SocketIO):
     socketio_connection_events = SocketIOConnectionEvents()
 
     socketio.on_event('connect', socketio_connection_events.handle_connect)
+    socketio.on_event('disconnect', socketio_connection_events.handle_disconnect)
+
+    # Exposed on /health and /metrics as this node's connection count
+    current_app.config['socketio_connection_events'] = socketio_connection_events
+
+    def connected_sockets():
+        stats = socketio_connection_events.stats()
+        return {(stats["node"],): stats["activeConnections"]}
+
+    metrics.gauge("socketio_connected_sockets", "Socket.IO sessions connected to this node", ["node"], callback=connected_sockets)
     
\ No newline at end of file
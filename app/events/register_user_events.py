@@ -1,11 +1,14 @@
 from flask import current_app
 from flask_socketio import SocketIO
 from ..events.user_events import UserEvents
+from ..events.instrumentation import instrument_events
 
+@instrument_events
 def register_user_events(socketio: SocketIO):
     """
     Registers all user-related event handlers to the SocketIO instance."""
 
     user_events = UserEvents()
 
-    socketio.on_event('user/chats', user_events.handle_get_chat_list)
\ No newline at end of file
+    socketio.on_event('user/chats', user_events.handle_get_chat_list)
+    socketio.on_event('chat/read', user_events.handle_mark_chat_read)
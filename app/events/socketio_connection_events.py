@@ -1,15 +1,31 @@
+import os
+import socket
+import threading
+
 import jwt
 from flask import request, current_app
 from flask_socketio import join_room, emit, disconnect
 
+from .chat_rooms import join_chat_rooms
+from .instrumentation import record_event_error
 from .logger import events_logger
 
+# Identifies this replica in health checks and logs
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
 class SocketIOConnectionEvents:
     """
     Handles SocketIO connection events. Supports both JWT and plain userId-based auth.
+    Keeps a count of the connections held by this node.
     """
 
-    def handle_connect(self):
+    def __init__(self):
+        self.user_service = current_app.config['user_service']
+        self._sids = set()
+        self._total_connections = 0
+        self._lock = threading.Lock()
+
+    def handle_connect(self, auth=None):
         token = request.args.get('token')  # token can be passed in query string
         user_id = None
 
@@ -28,16 +44,19 @@ class SocketIOConnectionEvents:
                 events_logger.info(f"User {user_id} decoded from token.")
             except jwt.ExpiredSignatureError:
                 events_logger.warning("Token expired.")
+                record_event_error()
                 emit('error', {'type': 'unauthorized', 'message': 'Token expired'})
                 disconnect()
                 return
             except jwt.InvalidTokenError:
                 events_logger.warning("Invalid token.")
+                record_event_error()
                 emit('error', {'type': 'unauthorized', 'message': 'Invalid token'})
                 disconnect()
                 return
             except Exception as e:
                 events_logger.error(f"Error decoding token: {str(e)}")
+                record_event_error()
                 emit('error', {'type': 'server_error', 'message': str(e)})
                 disconnect()
                 return
@@ -53,6 +72,7 @@ class SocketIOConnectionEvents:
         # If userId is still missing, reject the connection
         if not user_id:
             events_logger.warning("Missing token or userId.")
+            record_event_error()
             emit('error', {'type': 'unauthorized', 'message': 'Missing token or userId'})
             disconnect()
             return
@@ -65,4 +85,29 @@ class SocketIOConnectionEvents:
 
         events_logger.debug(f"Joining room: {repr(user_id)}")
 
+        # Join the rooms of the user's chat groups, so chat events are a single room broadcast
+        try:
+            chat_ids = self.user_service.get_user_chat_ids(user_id)
+            join_chat_rooms(chat_ids)
+            events_logger.debug(f"User {user_id} joined {len(chat_ids)} chat rooms")
+        except Exception as e:
+            events_logger.error(f"Failed to join chat rooms for user {user_id}: {str(e)}")
+
+        with self._lock:
+            self._sids.add(request.sid)
+            self._total_connections += 1
+
         emit('connected', {'message': f'Connected as {user_id}'})
+
+    def handle_disconnect(self, *args):
+        with self._lock:
+            self._sids.discard(request.sid)
+
+    def stats(self) -> dict:
+        """Connections held by this node (each replica reports its own)."""
+        with self._lock:
+            return {
+                "node": NODE_ID,
+                "activeConnections": len(self._sids),
+                "totalConnections": self._total_connections,
+            }
@@ -1,5 +1,7 @@
 import os
-from flask import Blueprint, jsonify, send_from_directory
+from flask import Blueprint, Response, current_app, jsonify, send_from_directory
+
+from ..utils.metrics import metrics
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 FRONTEND_PATH = os.path.join(BASE_DIR, '..', '..', 'chat_frontend')
@@ -27,4 +29,9 @@ def favicon():
 
 @static_routes_bp.route('/health')
 def health():
-    return jsonify(status='ok'), 200
\ No newline at end of file
+    connections = current_app.config['socketio_connection_events'].stats()
+    return jsonify(status='ok', **connections), 200
+
+@static_routes_bp.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
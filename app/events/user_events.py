@@ -1,6 +1,9 @@
 from flask import current_app, request, has_request_context
 from flask_socketio import emit
 
+from .fanout import emit_to_rooms
+from .instrumentation import record_event_error
+from ..utils.logging_setup import Payload
 from .logger import events_logger
 
 class UserEvents:
@@ -12,14 +15,14 @@ class UserEvents:
         Emit success to specific user rooms, or fallback to broadcast (e.g., in tests).
         """
         if target_user_ids:
-            for user_id in target_user_ids:
-                emit(event_name, response, room=user_id)
+            emit_to_rooms(event_name, response, target_user_ids)
         elif has_request_context() and hasattr(request, 'sid'):
             emit(event_name, response, room=request.sid)
         else:
             emit(event_name, response, broadcast=True)
 
     def _emit_error(self, message, user_id=None, type="processing_error"):
+        record_event_error()
         error_payload = {
             "type": type,
             "message": message
@@ -64,14 +67,53 @@ class UserEvents:
                 "page": page,
                 "limit": limit,
                 "total": result["total"],
-                "chats": result["chats"]
+                "chats": [{
+                    "chatId": chat["chatId"],
+                    "groupName": chat["groupName"],
+                    "lastMessage": {
+                        "messageId": chat["lastMessage"]["messageId"],
+                        "senderId": chat["lastMessage"]["senderId"],
+                        "snippet": chat["lastMessage"]["snippet"],
+                        "sentAt": chat["lastMessage"]["sentAt"].isoformat(),
+                    } if chat["lastMessage"] else None,
+                    "lastActivityAt": chat["lastActivityAt"].isoformat() if chat["lastActivityAt"] else None,
+                    "unreadCount": chat["unreadCount"],
+                } for chat in result["chats"]]
             }
 
             events_logger.info(f"Successfully fetched chat list for user {user_id}. Total chats: {result['total']}")
             self._emit_success('getUserChats', response, target_user_ids=[user_id])
-            events_logger.info(f"Chat list for user {user_id}: {response['chats']}")
+            events_logger.debug("Chat list for user %s: %s", user_id, Payload(response["chats"]))
         
         except Exception as e:
             error_message = str(e)
             events_logger.error(f"Failed to handle get chat list for user {data.get('userId')}. Error: {error_message}")
             self._emit_error(error_message, user_id=data.get("userId"))
+
+    # -----------------------------------------------------------------------------
+    # Event: Mark a Chat as Read
+    # Channel: chat/read
+    # -----------------------------------------------------------------------------
+    def handle_mark_chat_read(self, data):
+        """
+        Expected payload (MarkChatReadRequest):
+            {
+                "userId": "user123",
+                "chatId": "chat123"
+            }
+        """
+        try:
+            user_id = data.get("userId")
+            chat_id = data.get("chatId")
+
+            events_logger.info(f"Request to mark chat {chat_id} as read for user {user_id}")
+
+            self.user_service.mark_chat_read(user_id, chat_id)
+
+            # Every session of the user clears the badge
+            self._emit_success('chatRead', {"userId": user_id, "chatId": chat_id, "unreadCount": 0}, target_user_ids=[user_id])
+
+        except Exception as e:
+            error_message = str(e)
+            events_logger.error(f"Failed to mark chat {data.get('chatId')} as read for user {data.get('userId')}. Error: {error_message}")
+            self._emit_error(error_message, user_id=data.get("userId"))
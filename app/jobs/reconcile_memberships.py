@@ -0,0 +1,23 @@
+import sys
+
+from ..database.database_init import ChatServiceDatabase
+from ..database.chat_groups import ChatGroups
+from ..database.chat_memberships import ChatMemberships
+from ..services.user_service import UserService
+
+
+def reconcile_memberships(user_ids: list[str] | None = None) -> dict:
+    """Rebuild the chat membership index from ejabberd room affiliations."""
+    db = ChatServiceDatabase()
+    try:
+        user_service = UserService(ChatGroups(db), ChatMemberships(db))
+        return user_service.reconcile_chat_memberships(user_ids)
+    finally:
+        db.close_connection()
+
+
+if __name__ == '__main__':
+    summary = reconcile_memberships(sys.argv[1:] or None)
+    print(f"Reconciled {summary['users']} users: {summary['added']} memberships added, {summary['removed']} removed.")
+
+# run: python -m app.jobs.reconcile_memberships [userId ...]
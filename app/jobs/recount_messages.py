@@ -0,0 +1,22 @@
+import sys
+
+from ..database.database_init import ChatServiceDatabase
+from ..database.chat_messages import ChatMessages
+from ..services.chat_messages_services import ChatMessagesService
+
+
+def recount_messages(chat_ids: list[str] | None = None) -> dict:
+    """Rebuild the per-chat message counters from the stored messages."""
+    db = ChatServiceDatabase()
+    try:
+        chat_messages_service = ChatMessagesService(ChatMessages(db), relay_mode="sync", coalescing=False)
+        return chat_messages_service.recount_messages(chat_ids)
+    finally:
+        db.close_connection()
+
+
+if __name__ == '__main__':
+    summary = recount_messages(sys.argv[1:] or None)
+    print(f"Recounted messages of {summary['chats']} chats: {summary['fixed']} counters fixed.")
+
+# run: python -m app.jobs.recount_messages [chatId ...]
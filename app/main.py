@@ -1,16 +1,20 @@
+from config.server_config import ServerConfig
+
 from app import create_app, socketio
 
 app = create_app()
 
 if __name__ == '__main__':
     # Start the Flask-SocketIO server.
+    # With ASYNC_MODE=threading this is the Werkzeug development server;
+    # with gevent/eventlet Flask-SocketIO runs that server instead.
+    # In production run gunicorn: gunicorn -c config/gunicorn_conf.py app.wsgi:app
     socketio.run(
         app,
         host=app.config['FLASK_HOST'],
         port=int(app.config['FLASK_PORT']),
-        debug=True,
-        allow_unsafe_werkzeug=True # For development only, not recommended for production (use eventlet instead). 
+        debug=ServerConfig.FLASK_DEBUG,
+        allow_unsafe_werkzeug=ServerConfig.ASYNC_MODE == "threading" # Werkzeug is for development only
     )
 
 # run: python -m app.main
-
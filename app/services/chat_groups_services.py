@@ -1,16 +1,27 @@
 from flask import current_app
+from config.cache_config import CacheConfig
 from ..database.chat_groups import ChatGroups
+from ..database.chat_memberships import ChatMemberships
 from ..xmpp.user_management_xmpp import UserManagementXMPP
 from ..xmpp.chat_groups_xmpp import ChatGroupsXMPP
 from ..utils.validators import validate_id, validate_group_name, validate_users, validate_removed_users
+from ..utils.cache import create_cache
+from ..utils.verify_policy import VerifyPolicy
 
 from .logger import services_logger
 
 class ChatGroupsService:
-    def __init__(self, chat_groups_dal: ChatGroups, xmpp_user_management: UserManagementXMPP):
+    def __init__(self, chat_groups_dal: ChatGroups, chat_memberships_dal: ChatMemberships, xmpp_user_management: UserManagementXMPP, verify_policy: VerifyPolicy | None = None):
         self.chat_groups_dal = chat_groups_dal
+        self.chat_memberships_dal = chat_memberships_dal
         self.xmpp_user_management = xmpp_user_management
         self.chat_groups_xmpp = ChatGroupsXMPP()
+        self.verify_policy = verify_policy or VerifyPolicy()
+        # Member lists are read from the membership index; the cache only runs with a
+        # shared backend (or CACHE_IN_PROCESS), so changes on other replicas invalidate it
+        self.occupants_cache = create_cache(
+            "chat_occupants", CacheConfig.OCCUPANTS_CACHE_MAXSIZE, CacheConfig.OCCUPANTS_CACHE_TTL
+        )
 
     def _get_occupants_usernames(self, chat_id: str) -> set[str]:
         try:
@@ -23,21 +34,38 @@ class ChatGroupsService:
             services_logger.error(f"Error getting occupants for chat group ID {chat_id}: {e}")
             raise
 
+    def _cache_occupants(self, chat_id: str, occupants) -> None:
+        """Write the current member list of a chat through to the occupants cache."""
+        if self.occupants_cache:
+            self.occupants_cache.set(chat_id, sorted(occupants))
+
+    def _invalidate_occupants(self, chat_id: str) -> None:
+        if self.occupants_cache:
+            self.occupants_cache.delete(chat_id)
+
+    def get_occupants_cache_stats(self) -> dict | None:
+        """Hit/miss statistics of the chat occupants cache (None when it is disabled)."""
+        return self.occupants_cache.stats() if self.occupants_cache else None
+
     def create_chat_group(self, group_name: str, users: list[str]) -> dict:
         try:
             services_logger.info(f"Creating chat group '{group_name}' with users: {users}")
             validate_group_name(group_name)
             validate_users(users)
 
-            chat_id = self.chat_groups_dal.create_chat_group(group_name).get("_id")
+            verify = self.verify_policy.should_verify()
+
+            chat_group = self.chat_groups_dal.create_chat_group(group_name)
+            chat_id = chat_group.get("_id")
             if not chat_id:
                 raise ValueError("Chat group not created")
-            
-            chat_group = self.chat_groups_dal.get_chat_group(chat_id)
-            if not chat_group:
-                raise ValueError("Chat group not created")
-            if chat_group["groupName"] != group_name:
-                raise ValueError("Chat group name not set correctly")
+
+            if verify:
+                chat_group = self.chat_groups_dal.get_chat_group(chat_id, fields=("groupName", "createdAt"))
+                if not chat_group:
+                    raise ValueError("Chat group not created")
+                if chat_group["groupName"] != group_name:
+                    raise ValueError("Chat group name not set correctly")
 
             self.xmpp_user_management.ensure_users_register(users)
 
@@ -45,10 +73,15 @@ class ChatGroupsService:
             if not success:
                 raise ValueError("Failed to create chat group in XMPP")
 
-            occupants = self._get_occupants_usernames(chat_id)
-            missing_users = [user for user in users if user not in occupants]
-            if missing_users:
-                raise ValueError(f"The following users were not added to the XMPP room: {missing_users}")
+            occupants = set(users)
+            if verify:
+                occupants = self._get_occupants_usernames(chat_id)
+                missing_users = [user for user in users if user not in occupants]
+                if missing_users:
+                    raise ValueError(f"The following users were not added to the XMPP room: {missing_users}")
+
+            self.chat_memberships_dal.add_members(chat_id, users, group_name=chat_group["groupName"])
+            self._cache_occupants(chat_id, occupants)
 
             services_logger.info(f"Chat group '{group_name}' created successfully with ID: {chat_id}")
             return {
@@ -67,38 +100,50 @@ class ChatGroupsService:
             validate_id(chat_id)
             validate_group_name(group_name)
 
-            self.chat_groups_dal.update_chat_group_name(chat_id, group_name)
-            chat_group = self.chat_groups_dal.get_chat_group(chat_id)
-            if not chat_group:
-                raise ValueError(f"Chat group with ID {chat_id} not found")
-            if chat_group["groupName"] != group_name:
-                raise ValueError("Chat group name not updated")
+            if self.verify_policy.should_verify():
+                self.chat_groups_dal.update_chat_group_name(chat_id, group_name)
+                chat_group = self.chat_groups_dal.get_chat_group(chat_id, fields=("groupName",))
+                if not chat_group:
+                    raise ValueError(f"Chat group with ID {chat_id} not found")
+                if chat_group["groupName"] != group_name:
+                    raise ValueError("Chat group name not updated")
+            else:
+                chat_group = self.chat_groups_dal.find_and_update_chat_group_name(chat_id, group_name)
+                if not chat_group:
+                    raise ValueError(f"Chat group with ID {chat_id} not found")
+
+            self.chat_memberships_dal.set_group_name(chat_id, group_name)
 
             services_logger.info(f"Chat group with ID {chat_id} successfully updated to '{group_name}'")
             return {
                 "chatId": str(chat_id),
                 "groupName": chat_group["groupName"],
-                "users": chat_group.get("users"),
+                "users": self.get_chat_users(chat_id),
             }
         except Exception as e:
             services_logger.error(f"Error updating chat group with ID {chat_id}: {e}")
             raise
 
-    def delete_chat_group(self, chat_id: str) -> bool:
+    def delete_chat_group(self, chat_id: str) -> tuple[bool, list[str]]:
         try:
             services_logger.info(f"Deleting chat group with ID {chat_id}")
             validate_id(chat_id)
 
+            # Members to notify, read before the room and the memberships are dropped
+            # (falls back to ejabberd for chats missing from the membership index)
+            affected_users = self.get_chat_users(chat_id)
+
             self.chat_groups_xmpp.delete_chat_group(chat_id)
+            self._invalidate_occupants(chat_id)
 
-            chat_group = self.chat_groups_dal.get_chat_group(chat_id)
+            chat_group = self.chat_groups_dal.get_chat_group(chat_id, fields=())
             if not chat_group:
                 raise ValueError(f"Chat group with ID {chat_id} not found")
 
-            affected_users = chat_group.get("users", [])
-
             deleted_count = self.chat_groups_dal.delete_chat_group(chat_id)
             if deleted_count == 1:
+                # Memberships only go once the group itself is gone
+                self.chat_memberships_dal.remove_chat(chat_id)
                 services_logger.info(f"Chat group with ID {chat_id} deleted successfully")
                 return True, affected_users
 
@@ -107,17 +152,24 @@ class ChatGroupsService:
             services_logger.error(f"Error deleting chat group with ID {chat_id}: {e}")
             raise
 
-    def add_users_to_chat(self, chat_id: str, user_ids: list[str], verify: bool = True) -> list[str]:
+    def add_users_to_chat(self, chat_id: str, user_ids: list[str], verify: bool | None = None) -> tuple[list[str], set[str]]:
         try:
             services_logger.info(f"Adding users {user_ids} to chat group with ID {chat_id}")
             validate_id(chat_id)
             validate_users(user_ids)
 
+            if verify is None:
+                verify = self.verify_policy.should_verify()
+
             self.xmpp_user_management.ensure_users_register(user_ids)
 
-            success = self.chat_groups_xmpp.add_users_to_room(chat_id, user_ids)
-            if not success:
-                raise ValueError("Failed to add users to chat group")
+            results = self.chat_groups_xmpp.set_room_affiliations(chat_id, user_ids, "member")
+            self._invalidate_occupants(chat_id)
+            failed_users = [user for user, success in results.items() if not success]
+            if failed_users:
+                # Keep the index in line with the users ejabberd did accept
+                self.chat_memberships_dal.add_members(chat_id, [user for user in user_ids if user not in failed_users])
+                raise ValueError(f"Failed to add users to chat group: {failed_users}")
 
             if verify:
                 occupants = self._get_occupants_usernames(chat_id)
@@ -125,29 +177,46 @@ class ChatGroupsService:
                 if missing_users:
                     raise ValueError(f"The following users were not found in the room after addition: {missing_users}")
 
+            self.chat_memberships_dal.add_members(chat_id, user_ids)
+            if not verify:
+                occupants = set(self.chat_memberships_dal.get_chat_member_ids(chat_id))
+            self._cache_occupants(chat_id, occupants)
+
             services_logger.info(f"Users {user_ids} added to chat group with ID {chat_id}")
             return user_ids, occupants
         except Exception as e:
             services_logger.error(f"Error adding users to chat group with ID {chat_id}: {e}")
             raise
 
-    def remove_users_from_chat(self, chat_id: str, user_ids: list[str], verify: bool = True) -> list[str]:
+    def remove_users_from_chat(self, chat_id: str, user_ids: list[str], verify: bool | None = None) -> tuple[list[str], set[str]]:
         try:
             services_logger.info(f"Removing users {user_ids} from chat group with ID {chat_id}")
             validate_id(chat_id)
             validate_removed_users(user_ids)
 
-            affected_occupants = self._get_occupants_usernames(chat_id)
+            if verify is None:
+                verify = self.verify_policy.should_verify()
 
-            success = self.chat_groups_xmpp.remove_users_from_room(chat_id, user_ids)
-            if not success:
-                raise ValueError("Failed to remove one or more users from the chat group")
+            affected_occupants = set(self.get_chat_users(chat_id))
+
+            results = self.chat_groups_xmpp.set_room_affiliations(chat_id, user_ids, "none")
+            self._invalidate_occupants(chat_id)
+            failed_users = [user for user, success in results.items() if not success]
+            if failed_users:
+                # Keep the index in line with the users ejabberd did remove
+                self.chat_memberships_dal.remove_members(chat_id, [user for user in user_ids if user not in failed_users])
+                raise ValueError(f"Failed to remove users from the chat group: {failed_users}")
 
             if verify:
                 occupants = self._get_occupants_usernames(chat_id)
                 remaining_users = [user for user in user_ids if user in occupants]
                 if remaining_users:
                     raise ValueError(f"The following users are still in the room after removal: {remaining_users}")
+            else:
+                occupants = affected_occupants - set(user_ids)
+
+            self.chat_memberships_dal.remove_members(chat_id, user_ids)
+            self._cache_occupants(chat_id, occupants)
 
             services_logger.info(f"Users {user_ids} removed from chat group with ID {chat_id}")
             return user_ids, affected_occupants
@@ -159,7 +228,19 @@ class ChatGroupsService:
         try:
             services_logger.info(f"Getting users for chat group with ID {chat_id}")
             validate_id(chat_id)
-            users = list(self._get_occupants_usernames(chat_id))
+
+            users = self.occupants_cache.get(chat_id) if self.occupants_cache else None
+            if users is not None:
+                services_logger.debug(f"Occupants cache hit for chat group {chat_id}")
+                return list(users)
+
+            # The membership index is written alongside every affiliation change
+            users = self.chat_memberships_dal.get_chat_member_ids(chat_id)
+            if not users:
+                # Chat not indexed yet (created before the index): ask ejabberd once and backfill
+                users = list(self._get_occupants_usernames(chat_id))
+                self.chat_memberships_dal.add_members(chat_id, users)
+            self._cache_occupants(chat_id, users)
             services_logger.info(f"Found users in chat group {chat_id}: {users}")
             return users
         except Exception as e:
@@ -1,135 +1,406 @@
-from ..utils.validators import validate_id, validate_message_content
+from config.cache_config import CacheConfig
+from config.coalescing_config import CoalescingConfig
+from config.xmpp_config import XMPPConfig
+
+from ..utils.cache import create_recent_messages_cache
+from ..utils.logging_setup import Payload
+from ..utils.validators import validate_id, validate_message_content, validate_message_batch
+from ..utils.verify_policy import VerifyPolicy
 from ..xmpp.chat_messages_xmpp import ChatMessagesXMPP
-from ..database.chat_messages import ChatMessages
+from ..database.chat_messages import HISTORY_FIELDS, ChatMessages
+from ..database.chat_memberships import ChatMemberships
 
-from .logger import services_logger
+from .logger import services_logger, services_sample_logger
+from .write_coalescer import WriteCoalescer
+from .xmpp_relay import XMPPRelay
 
 class ChatMessagesService:
-    def __init__(self, chat_messages_dal: ChatMessages):
+    def __init__(
+        self,
+        chat_messages_dal: ChatMessages,
+        relay_mode: str = XMPPConfig.XMPP_RELAY_MODE,
+        verify_policy: VerifyPolicy | None = None,
+        coalescing: bool = CoalescingConfig.MESSAGE_COALESCING,
+        chat_memberships_dal: ChatMemberships | None = None,
+    ):
         """Business logic layer for chat messages."""
         self.chat_messages_dal = chat_messages_dal
+        # Members' chat list entries (last message preview, unread counts), when available
+        self.chat_memberships_dal = chat_memberships_dal
         self.chat_messages_xmpp = ChatMessagesXMPP()
+        self.verify_policy = verify_policy or VerifyPolicy()
+
+        # In async mode messages are stored and acknowledged first, then relayed to the MUC in the background
+        self.xmpp_relay = None
+        if relay_mode == "async":
+            self.xmpp_relay = XMPPRelay(chat_messages_dal, self.chat_messages_xmpp)
+            self.xmpp_relay.start()
+            self.xmpp_relay.recover_pending()
+
+        # Newest messages of active chats, serving first history pages without Mongo
+        # (shared through CACHE_REDIS_URL, or in-process with CACHE_IN_PROCESS)
+        self.recent_messages = None
+        if CacheConfig.RECENT_MESSAGES_CACHE_SIZE > 0:
+            self.recent_messages = create_recent_messages_cache(
+                "recent_messages",
+                CacheConfig.RECENT_MESSAGES_CACHE_SIZE,
+                CacheConfig.RECENT_MESSAGES_CACHE_MAX_MESSAGES,
+                CacheConfig.RECENT_MESSAGES_CACHE_TTL,
+            )
+
+        # With coalescing, concurrent sends are stored (and relayed in sync mode) in micro-batches
+        self.write_coalescer = None
+        if coalescing:
+            self.write_coalescer = WriteCoalescer(lambda items: self._store_batch(items, preserve_order=False))
+            self.write_coalescer.start()
+
+    def get_relay_stats(self) -> dict | None:
+        """Queue depth and counters of the background XMPP relay (None in sync mode)."""
+        return self.xmpp_relay.stats() if self.xmpp_relay else None
+
+    def get_coalescing_stats(self) -> dict | None:
+        """Batch counters of the write coalescer (None when coalescing is disabled)."""
+        return self.write_coalescer.stats() if self.write_coalescer else None
+
+    def get_recent_messages_cache_stats(self) -> dict | None:
+        """Hit/miss statistics of the recent-messages cache (None when it is disabled)."""
+        return self.recent_messages.stats() if self.recent_messages else None
+
+    @staticmethod
+    def _history_view(message: dict) -> dict:
+        """The fields of a message kept in the recent-messages cache, whatever read or write produced it."""
+        view = {"_id": message["_id"]}
+        view.update({field: message[field] for field in HISTORY_FIELDS if field in message})
+        return view
+
+    def _get_recent_messages(self, chat_id: str, limit: int) -> tuple[list[dict], int]:
+        """Newest `limit` messages of a chat and its total, from the ring buffer or Mongo (refilling the buffer)."""
+        if not self.recent_messages or limit > self.recent_messages.size:
+            return self.chat_messages_dal.fetch_messages(chat_id, 0, limit, fields=HISTORY_FIELDS)
+
+        cached = self.recent_messages.get(chat_id, limit)
+        if cached is not None:
+            services_sample_logger.debug("Recent messages cache hit for chat_id: %s", chat_id)
+            return cached
+
+        # Fill in (sentAt, _id) order, the order cursor pagination continues from
+        self.recent_messages.begin_fill(chat_id)
+        messages, _ = self.chat_messages_dal.fetch_messages_by_cursor(chat_id, self.recent_messages.size, fields=HISTORY_FIELDS)
+        total_messages = self.chat_messages_dal.count_messages(chat_id)
+        self.recent_messages.fill(chat_id, [self._history_view(message) for message in messages], total_messages)
+        return messages[:limit], total_messages
+
+    def _record_chat_activity(self, messages: list[dict]) -> None:
+        """Move new messages into their chats' list entries (preview, lastActivityAt, unread counts)."""
+        if not self.chat_memberships_dal:
+            return
+        by_chat = {}
+        for message in messages:
+            by_chat.setdefault(message["chat_id"], []).append(message)
+        for chat_id, chat_messages in by_chat.items():
+            self.chat_memberships_dal.record_messages(chat_id, chat_messages)
+
+    def _store_batch(self, items: list[dict], ordered: bool = False, preserve_order: bool = True) -> list[dict]:
+        """
+        Relay (in sync mode) and store already validated messages with a single insert_many.
+
+        Returns, in input order, {"message": document} or {"error": reason}. Only messages
+        accepted by ejabberd are stored in sync mode; in async mode the stored messages
+        are queued for the background relay. `preserve_order` keeps each room's messages
+        in input order on the XMPP side, which coalesced sends from independent senders
+        do not need.
+        """
+        results = [None] * len(items)
+        pending = list(enumerate(items))
+
+        if pending and not self.xmpp_relay:
+            outcomes = self.chat_messages_xmpp.send_messages(items, preserve_order=preserve_order)
+            for (index, _), success in zip(pending, outcomes):
+                if not success:
+                    results[index] = {"error": "Failed to send message via XMPP"}
+            pending = [(index, item) for (index, item), success in zip(pending, outcomes) if success]
+
+        xmpp_status = "pending" if self.xmpp_relay else None
+        stored = self.chat_messages_dal.insert_messages([item for _, item in pending], ordered=ordered, xmpp_status=xmpp_status)
+
+        for (index, _), result in zip(pending, stored):
+            if "error" in result:
+                results[index] = {"error": result["error"]}
+                continue
+            results[index] = {"message": result["message"]}
+            if self.xmpp_relay:
+                self.xmpp_relay.submit(result["message"])
+        return results
 
     def send_message(self, chat_id: str, sender_id: str, content: str) -> dict:
-        services_logger.info(f"Attempting to send message from {sender_id} to {chat_id}")
+        services_sample_logger.info("Attempting to send message from %s to %s", sender_id, chat_id)
 
         try:
             validate_id(chat_id)
             validate_id(sender_id)
             validate_message_content(content)
-            services_logger.debug(f"Validated chat_id: {chat_id}, sender_id: {sender_id}, content length: {len(content)}")
-
-            success = self.chat_messages_xmpp.send_message(
-                user_id=sender_id,
-                to_id=chat_id,
-                message_type="groupchat",
-                subject="",
-                body=content
-            )
-            if not success:
-                raise RuntimeError("Failed to send message via XMPP")
-            services_logger.info(f"Message sent successfully via XMPP to {chat_id}")
+            services_sample_logger.debug("Validated chat_id: %s, sender_id: %s, content length: %s", chat_id, sender_id, len(content))
+
+            if self.write_coalescer:
+                # Relayed and stored together with the other sends of the same window
+                result = self.write_coalescer.submit({"chat_id": chat_id, "sender_id": sender_id, "content": content})
+                if "error" in result:
+                    raise RuntimeError(result["error"])
+                message_obj_id = {"messageId": str(result["message"]["_id"]), "message": result["message"]}
+            else:
+                if not self.xmpp_relay:
+                    success = self.chat_messages_xmpp.send_message(
+                        user_id=sender_id,
+                        to_id=chat_id,
+                        message_type="groupchat",
+                        subject="",
+                        body=content
+                    )
+                    if not success:
+                        raise RuntimeError("Failed to send message via XMPP")
+                    services_sample_logger.info("Message sent successfully via XMPP to %s", chat_id)
+
+                xmpp_status = "pending" if self.xmpp_relay else None
+                message_obj_id = self.chat_messages_dal.insert_message(chat_id, sender_id, content, xmpp_status=xmpp_status)
 
-            message_obj_id = self.chat_messages_dal.insert_message(chat_id, sender_id, content)
             message_id = message_obj_id.get("messageId")
             if not message_id:
                 raise RuntimeError("Failed to store message")
-            services_logger.info(f"Message stored in database with ID: {message_id}")
+            services_sample_logger.info("Message stored in database with ID: %s", message_id)
 
-            message = self.chat_messages_dal.fetch_message(message_id)
-            if not message:
-                raise RuntimeError("Failed to retrieve stored message")
-            services_logger.info(f"Message retrieved from database: {message_id}")
+            if self.verify_policy.should_verify():
+                message = self.chat_messages_dal.fetch_message(message_id)
+                if not message:
+                    raise RuntimeError("Failed to retrieve stored message")
+                services_sample_logger.info("Message retrieved from database: %s", message_id)
 
-            if str(message["chat_id"]) != chat_id:
-                raise RuntimeError("Chat ID mismatch in stored message")
-            if message["sender_id"] != sender_id:
-                raise RuntimeError("Sender ID mismatch in stored message")
-            if message["content"] != content:
-                raise RuntimeError("Content mismatch in stored message")
+                if str(message["chat_id"]) != chat_id:
+                    raise RuntimeError("Chat ID mismatch in stored message")
+                if message["sender_id"] != sender_id:
+                    raise RuntimeError("Sender ID mismatch in stored message")
+                if message["content"] != content:
+                    raise RuntimeError("Content mismatch in stored message")
+            else:
+                # Trust the acknowledged insert: the stored document is the one we sent
+                message = message_obj_id["message"]
 
-            services_logger.info(f"Message validated successfully with content: {content}")
+            if self.xmpp_relay and not self.write_coalescer:
+                self.xmpp_relay.submit(message)
+                services_sample_logger.info("Message %s queued for XMPP relay to %s", message_id, chat_id)
+
+            if self.recent_messages:
+                self.recent_messages.add(chat_id, self._history_view(message))
+            self._record_chat_activity([message])
+
+            services_sample_logger.info("Message validated successfully with content: %s", Payload(content))
             return message
         except Exception as e:
             services_logger.error(f"Error in send_message: {e}")
             raise
 
+    def send_messages(self, messages: list[dict], ordered: bool = False) -> list[dict]:
+        """
+        Send a batch of {"chat_id", "sender_id", "content"} messages (imports, bots, replayed backlogs).
+
+        Invalid items and failed XMPP sends are reported per item instead of failing the
+        batch; the rest is stored with a single insert_many (`ordered` applies to that
+        insert). Returns, in input order, {"message": document} or {"error": reason}.
+        """
+        services_sample_logger.info("Attempting to send a batch of %s messages", len(messages) if isinstance(messages, list) else 0)
+
+        try:
+            validate_message_batch(messages)
+            results = [None] * len(messages)
+
+            valid = []
+            for index, item in enumerate(messages):
+                try:
+                    if not isinstance(item, dict):
+                        raise ValueError("Invalid message type")
+                    validate_id(item.get("chat_id"))
+                    validate_id(item.get("sender_id"))
+                    validate_message_content(item.get("content"))
+                    valid.append((index, item))
+                except ValueError as e:
+                    results[index] = {"error": str(e)}
+
+            # Batches trust the acknowledged insert_many: the stored documents are the ones we sent
+            stored = self._store_batch([item for _, item in valid], ordered=ordered)
+            for (index, _), result in zip(valid, stored):
+                results[index] = result
+
+            stored_messages = [result["message"] for result in results if "message" in result]
+            if self.recent_messages:
+                for message in stored_messages:
+                    self.recent_messages.add(message["chat_id"], self._history_view(message))
+            self._record_chat_activity(stored_messages)
+
+            failed = sum(1 for result in results if "error" in result)
+            services_sample_logger.info("Batch of %s messages sent, %s failed", len(messages), failed)
+            return results
+        except Exception as e:
+            services_logger.error(f"Error in send_messages: {e}")
+            raise
+
     def get_message(self, message_id: str) -> dict:
-        services_logger.info(f"Fetching message with ID: {message_id}")
+        services_sample_logger.info("Fetching message with ID: %s", message_id)
 
         try:
             validate_id(message_id)
             message = self.chat_messages_dal.fetch_message(message_id)
             if not message:
                 raise ValueError(f"Message with ID {message_id} not found")
-            services_logger.info(f"Message retrieved successfully: {message_id}")
+            services_sample_logger.info("Message retrieved successfully: %s", message_id)
             return message
         except Exception as e:
             services_logger.error(f"Error in get_message: {e}")
             raise
 
     def get_messages(self, chat_id: str, page: int = 1, limit: int = 20) -> list[dict]:
-        services_logger.info(f"Fetching messages for chat_id: {chat_id}, page: {page}, limit: {limit}")
+        services_sample_logger.info("Fetching messages for chat_id: %s, page: %s, limit: %s", chat_id, page, limit)
 
         try:
             validate_id(chat_id)
             if page < 1 or limit < 1:
                 raise ValueError("Page and limit must be greater than zero")
-            skip = (page - 1) * limit
-            messages, total_messages = self.chat_messages_dal.fetch_messages(chat_id, skip, limit)
-            services_logger.info(f"Fetched {len(messages)} messages for chat_id: {chat_id}. Total: {total_messages}")
+            if page == 1:
+                messages, total_messages = self._get_recent_messages(chat_id, limit)
+            else:
+                skip = (page - 1) * limit
+                messages, total_messages = self.chat_messages_dal.fetch_messages(chat_id, skip, limit, fields=HISTORY_FIELDS)
+            services_sample_logger.info("Fetched %s messages for chat_id: %s. Total: %s", len(messages), chat_id, total_messages)
             return messages, total_messages
         except Exception as e:
             services_logger.error(f"Error in get_messages: {e}")
             raise
 
+    def get_messages_by_cursor(
+        self, chat_id: str, limit: int = 20, before: str | None = None, after: str | None = None, include_total: bool = False
+    ) -> tuple[list[dict], str | None, int | None]:
+        services_sample_logger.info("Fetching messages for chat_id: %s, before: %s, after: %s, limit: %s", chat_id, before, after, limit)
+
+        try:
+            validate_id(chat_id)
+            if limit < 1:
+                raise ValueError("Limit must be greater than zero")
+            if before and after:
+                raise ValueError("Only one of before or after can be provided")
+
+            total = None
+            if not before and not after and self.recent_messages and limit <= self.recent_messages.size:
+                # Newest page: served by the ring buffer, whose total also answers has_more
+                messages, total = self._get_recent_messages(chat_id, limit)
+                has_more = total > len(messages)
+            else:
+                messages, has_more = self.chat_messages_dal.fetch_messages_by_cursor(
+                    chat_id, limit, before=before, after=after, fields=HISTORY_FIELDS
+                )
+
+            next_cursor = None
+            if has_more and messages:
+                # Keep moving in the same direction: older for before/latest, newer for after
+                edge_message = messages[0] if after else messages[-1]
+                next_cursor = str(edge_message["_id"])
+
+            if not include_total:
+                total = None
+            elif total is None:
+                total = self.chat_messages_dal.count_messages(chat_id)
+            services_sample_logger.info("Fetched %s messages for chat_id: %s. Next cursor: %s", len(messages), chat_id, next_cursor)
+            return messages, next_cursor, total
+        except Exception as e:
+            services_logger.error(f"Error in get_messages_by_cursor: {e}")
+            raise
+
+    def recount_messages(self, chat_ids: list[str] | None = None) -> dict:
+        """Repair the per-chat message counters by recounting the stored messages."""
+        services_logger.info(f"Recounting messages for chats: {chat_ids or 'all'}")
+
+        try:
+            summary = self.chat_messages_dal.recount_messages(chat_ids)
+            if self.recent_messages:
+                # Cached totals may carry the drift that was just repaired
+                if chat_ids is None:
+                    self.recent_messages.clear()
+                else:
+                    for chat_id in chat_ids:
+                        self.recent_messages.delete(chat_id)
+            services_logger.info(f"Recounted messages of {summary['chats']} chats, {summary['fixed']} counters fixed")
+            return summary
+        except Exception as e:
+            services_logger.error(f"Error in recount_messages: {e}")
+            raise
+
     def edit_message(self, chat_id: str, message_id: str, new_content: str) -> dict:
-        services_logger.info(f"Editing message with ID: {message_id} for chat_id: {chat_id}")
+        services_sample_logger.info("Editing message with ID: %s for chat_id: %s", message_id, chat_id)
 
         try:
             validate_id(chat_id)
             validate_id(message_id)
             validate_message_content(new_content)
 
-            updated = self.chat_messages_dal.update_message(message_id, new_content)
-            if not updated:
-                raise RuntimeError("Failed to update message")
-            services_logger.info(f"Message with ID: {message_id} updated successfully")
+            if self.verify_policy.should_verify():
+                updated = self.chat_messages_dal.update_message(message_id, new_content)
+                if not updated:
+                    raise RuntimeError("Failed to update message")
+                services_sample_logger.info("Message with ID: %s updated successfully", message_id)
 
-            updated_message = self.chat_messages_dal.fetch_message(message_id)
-            if not updated_message:
-                raise RuntimeError("Failed to retrieve updated message")
+                updated_message = self.chat_messages_dal.fetch_message(message_id)
+                if not updated_message:
+                    raise RuntimeError("Failed to retrieve updated message")
 
-            if updated_message["chat_id"] != chat_id:
-                raise RuntimeError("Chat ID mismatch in updated message")
-            if updated_message["content"] != new_content:
-                raise RuntimeError("Content mismatch in updated message")
-            if updated_message.get("editedAt") is None:
-                raise RuntimeError("Missing editedAt timestamp in updated message")
+                if updated_message["chat_id"] != chat_id:
+                    raise RuntimeError("Chat ID mismatch in updated message")
+                if updated_message["content"] != new_content:
+                    raise RuntimeError("Content mismatch in updated message")
+                if updated_message.get("editedAt") is None:
+                    raise RuntimeError("Missing editedAt timestamp in updated message")
+            else:
+                # Update and read back in one round trip, scoped to the chat
+                updated_message = self.chat_messages_dal.find_and_update_message(message_id, new_content, chat_id=chat_id)
+                if not updated_message:
+                    raise RuntimeError("Failed to update message")
+                services_sample_logger.info("Message with ID: %s updated successfully", message_id)
 
-            services_logger.info(f"Message edited successfully: {message_id}")
+            if self.recent_messages:
+                self.recent_messages.update(chat_id, self._history_view(updated_message))
+            if self.chat_memberships_dal:
+                self.chat_memberships_dal.update_last_message(chat_id, updated_message)
+
+            services_sample_logger.info("Message edited successfully: %s", message_id)
             return updated_message
         except Exception as e:
             services_logger.error(f"Error in edit_message: {e}")
             raise
 
     def delete_message(self, chat_id: str, message_id: str) -> bool:
-        services_logger.info(f"Attempting to delete message with ID: {message_id} for chat_id: {chat_id}")
+        services_sample_logger.info("Attempting to delete message with ID: %s for chat_id: %s", message_id, chat_id)
 
         try:
             validate_id(chat_id)
             validate_id(message_id)
 
-            deleted = self.chat_messages_dal.delete_message(message_id)
+            deleted = self.chat_messages_dal.find_and_delete_message(message_id, chat_id=chat_id)
             if not deleted:
                 raise ValueError(f"Message with ID {message_id} not found or already deleted")
 
             # Confirm deletion
-            message = self.chat_messages_dal.fetch_message(message_id)
-            if message is not None:
-                raise RuntimeError("Message still exists after deletion")
+            if self.verify_policy.should_verify():
+                message = self.chat_messages_dal.fetch_message(message_id, fields=())
+                if message is not None:
+                    raise RuntimeError("Message still exists after deletion")
+
+            if self.recent_messages:
+                self.recent_messages.remove(chat_id, message_id)
+            if self.chat_memberships_dal:
+                new_last_message = None
+                # Only the deletion of the last message changes the preview
+                if self.chat_memberships_dal.is_last_message(chat_id, message_id):
+                    newest, _ = self._get_recent_messages(chat_id, 1)
+                    new_last_message = newest[0] if newest else None
+                self.chat_memberships_dal.record_deleted_message(chat_id, deleted, new_last_message)
 
-            services_logger.info(f"Message with ID {message_id} deleted successfully")
+            services_sample_logger.info("Message with ID %s deleted successfully", message_id)
             return True
         except Exception as e:
             services_logger.error(f"Error in delete_message: {e}")
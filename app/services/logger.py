@@ -1,21 +1,15 @@
-import logging
 import os
 
+from config.logging_config import LoggingConfig
+
+from ..utils.logging_setup import SampledLogger, create_logger
+
 # Ensure the log directory exists (services logs will be stored here)
 log_dir = os.path.join(os.path.dirname(__file__))
 log_file_path = os.path.join(log_dir, 'services.log')
 
-# Setup the service logger
-services_logger = logging.getLogger("services_logger")
-services_logger.setLevel(logging.DEBUG)  # Adjust level as needed (DEBUG, INFO, WARNING, etc.)
-services_logger.propagate = True
-services_logger.handlers.clear()
-
-file_handler = logging.FileHandler(log_file_path, mode='w')  # Use append mode
-file_handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter(
-    'Module %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s - %(asctime)s'
-)
-file_handler.setFormatter(formatter)
+# Setup the service logger (written by a background thread, see app/utils/logging_setup.py)
+services_logger = create_logger("services_logger", log_file_path, LoggingConfig.LOG_LEVEL_SERVICES)
 
-services_logger.addHandler(file_handler)
\ No newline at end of file
+# Per-message lines on the hot path, logged for a sample of calls only
+services_sample_logger = SampledLogger(services_logger)
@@ -1,15 +1,20 @@
+from config.xmpp_config import XMPPConfig
+
 from ..xmpp.chat_groups_xmpp import ChatGroupsXMPP
+from ..xmpp.user_management_xmpp import UserManagementXMPP
 from ..utils.validators import validate_id
 from .logger import services_logger
 
 class UserService:
-    def __init__(self, chat_groups_dal):
+    def __init__(self, chat_groups_dal, chat_memberships_dal):
         self.chat_groups_dal = chat_groups_dal
+        self.chat_memberships_dal = chat_memberships_dal
         self.chat_groups_xmpp = ChatGroupsXMPP()
 
     def get_chat_list(self, user_id: str, page: int = 1, limit: int = 20) -> dict:
         """
-        Retrieves a paginated list of chat groups (MUC rooms) for a given user via XMPP.
+        Retrieves a paginated list of chat groups (MUC rooms) for a given user from the membership index,
+        most recent activity first, with each chat's last message preview and the user's unread count.
 
         Args:
             user_id (str): The ID of the user.
@@ -27,34 +32,32 @@ class UserService:
 
             validate_id(user_id)
 
-            all_group_ids = self.chat_groups_dal.get_all_chat_group_ids()
-            services_logger.debug(f"Retrieved {len(all_group_ids)} total chat group IDs")
-
-            affiliated_groups = []
-            for group_id in all_group_ids:
-                affiliation = ChatGroupsXMPP.get_user_affiliation_in_room(group_id, user_id)
-                if affiliation and affiliation is not None and affiliation != "none":
-                    affiliated_groups.append(group_id)
-
-            total = len(affiliated_groups)
-            services_logger.debug(f"User {user_id} is affiliated with {total} chat groups")
+            skip = (page - 1) * limit
+            entries, total = self.chat_memberships_dal.get_user_chat_list(user_id, skip, limit)
+            services_logger.debug(f"User {user_id} is a member of {total} chat groups")
 
-            start = (page - 1) * limit
-            end = start + limit
-            paginated_ids = affiliated_groups[start:end]
+            # Entries indexed before chat list fields existed: fill their names in once,
+            # resolving all of them with a single query
+            unnamed_ids = [entry["chat_id"] for entry in entries if entry.get("groupName") is None]
+            group_names = {}
+            if unnamed_ids:
+                for group_id, chat_group in zip(unnamed_ids, self.chat_groups_dal.get_chat_groups(unnamed_ids, fields=("groupName",))):
+                    if chat_group:
+                        group_names[group_id] = chat_group["groupName"]
+                        self.chat_memberships_dal.set_group_name(group_id, chat_group["groupName"])
+                    else:
+                        services_logger.warning(f"Metadata not found for group {group_id}")
 
             chat_groups = []
-            for group_id in paginated_ids:
-                chat_group = self.chat_groups_dal.get_chat_group(group_id)
-                if chat_group:
-                    chat_groups.append({
-                        "chatId": str(chat_group["_id"]),
-                        "groupName": chat_group["groupName"],
-                    })
-                    services_logger.debug(f"Included group {group_id}")
-                else:
-                    chat_groups.append({"chatId": group_id, "groupName": None})
-                    services_logger.warning(f"Metadata not found for group {group_id}")
+            for entry in entries:
+                group_id = entry["chat_id"]
+                chat_groups.append({
+                    "chatId": group_id,
+                    "groupName": entry.get("groupName") or group_names.get(group_id),
+                    "lastMessage": entry.get("lastMessage"),
+                    "lastActivityAt": entry.get("lastActivityAt"),
+                    "unreadCount": entry.get("unreadCount", 0),
+                })
 
             result = {
                 "userId": user_id,
@@ -69,4 +72,84 @@ class UserService:
 
         except Exception as e:
             services_logger.error(f"❌ Error in get_chat_list for user {user_id}: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def mark_chat_read(self, user_id: str, chat_id: str) -> bool:
+        """
+        Resets the user's unread count for a chat group.
+
+        Args:
+            user_id (str): The ID of the user.
+            chat_id (str): The ID of the chat group.
+
+        Returns:
+            bool: True once the chat is marked as read.
+        """
+        services_logger.info(f"Marking chat {chat_id} as read for user {user_id}")
+
+        try:
+            validate_id(user_id)
+            validate_id(chat_id)
+            if not self.chat_memberships_dal.mark_read(chat_id, user_id):
+                raise ValueError(f"User {user_id} is not a member of chat group {chat_id}")
+            return True
+        except Exception as e:
+            services_logger.error(f"❌ Error in mark_chat_read for user {user_id}: {e}")
+            raise
+
+    def get_user_chat_ids(self, user_id: str) -> list[str]:
+        """
+        Retrieves the IDs of every chat group the user belongs to (e.g. to join their rooms on connect).
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            list[str]: The chat IDs from the membership index.
+        """
+        try:
+            validate_id(user_id)
+            return self.chat_memberships_dal.get_all_user_chat_ids(user_id)
+        except Exception as e:
+            services_logger.error(f"❌ Error in get_user_chat_ids for user {user_id}: {e}")
+            raise
+
+    def reconcile_chat_memberships(self, user_ids: list[str] | None = None) -> dict:
+        """
+        Rebuilds the user -> chat groups membership index from ejabberd's get_user_rooms.
+
+        Args:
+            user_ids (list[str] | None): Users to reconcile. Defaults to every user registered in ejabberd.
+
+        Returns:
+            dict: Number of users processed and memberships added/removed.
+        """
+        services_logger.info("Reconciling chat membership index with ejabberd")
+
+        try:
+            if user_ids is None:
+                user_ids = UserManagementXMPP.get_registered_users()
+
+            known_group_ids = set(self.chat_groups_dal.get_all_chat_group_ids())
+            room_suffix = f"@{XMPPConfig.MUC_SERVICE}"
+
+            summary = {"users": 0, "added": 0, "removed": 0}
+            for user_id in user_ids:
+                rooms = ChatGroupsXMPP.get_user_rooms(user_id)
+                chat_ids = [
+                    room[:-len(room_suffix)] if room.endswith(room_suffix) else room
+                    for room in rooms
+                ]
+                chat_ids = [chat_id for chat_id in chat_ids if chat_id in known_group_ids]
+
+                result = self.chat_memberships_dal.replace_user_chats(user_id, chat_ids)
+                summary["users"] += 1
+                summary["added"] += result["added"]
+                summary["removed"] += result["removed"]
+
+            services_logger.info(f"✅ Membership index reconciled: {summary}")
+            return summary
+
+        except Exception as e:
+            services_logger.error(f"❌ Error reconciling chat membership index: {e}")
+            raise
@@ -0,0 +1,154 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from config.coalescing_config import CoalescingConfig
+
+from ..utils.metrics import metrics, SIZE_BUCKETS
+
+from .logger import services_logger
+
+COALESCED_BATCH_SIZE = metrics.histogram(
+    "message_coalesced_batch_size", "Messages stored per coalesced write", buckets=SIZE_BUCKETS
+)
+
+
+class WriteCoalescer:
+    """
+    Micro-batching of concurrent message writes.
+
+    Senders hand their message to `submit` and block on a future. A collector
+    thread takes the first waiting message, gathers whatever else arrives within
+    `window_ms` (or until `max_batch` messages) and hands the whole batch to one
+    of `flushers` threads, which calls `flush_batch` once for it. Each sender
+    then gets its own result back. Up to `flushers` batches are in flight at
+    once, so a slow flush does not stall the next batch; batches carry no
+    order between them, which independent senders waiting for their own
+    acknowledgement never rely on.
+
+    A sender that times out withdraws its message if no flush has picked it up
+    yet, and otherwise waits for that flush: an error is only reported for a
+    message that will not be stored.
+    """
+
+    def __init__(
+        self,
+        flush_batch: Callable[[list[dict]], list[dict]],
+        window_ms: float = CoalescingConfig.MESSAGE_COALESCE_WINDOW_MS,
+        max_batch: int = CoalescingConfig.MESSAGE_COALESCE_MAX_BATCH,
+        timeout: float = CoalescingConfig.MESSAGE_COALESCE_TIMEOUT,
+        flushers: int = CoalescingConfig.MESSAGE_COALESCE_FLUSHERS,
+    ):
+        self.flush_batch = flush_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.flushers = flushers
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._executor = None
+        self._stats = {
+            "batches": 0,
+            "messages": 0,
+            "maxBatchSize": 0,
+            "failedBatches": 0,
+            "abandoned": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the collector thread and the flusher pool."""
+        if self._thread:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.flushers, thread_name_prefix="message-flusher")
+        self._thread = threading.Thread(target=self._run, name="message-coalescer", daemon=True)
+        self._thread.start()
+        services_logger.info(f"Write coalescing started (window {self.window * 1000:g} ms, max batch {self.max_batch}, {self.flushers} flushers)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush what is queued and stop the collector and flusher threads."""
+        if not self._thread:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._executor.shutdown(wait=True)
+        self._thread = None
+        self._executor = None
+        services_logger.info("Write coalescing stopped")
+
+    def submit(self, item: dict) -> dict:
+        """Queue a message for the next batch and wait for its own result."""
+        future = Future()
+        self._queue.put((item, future))
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            if future.cancel():
+                # Not picked up by a flush yet: withdrawn, it will never be written
+                with self._stats_lock:
+                    self._stats["abandoned"] += 1
+                raise TimeoutError(f"Message not stored within {self.timeout:g}s (withdrawn from its batch)")
+            # Already being written: report the real outcome rather than a failure that still gets delivered
+            return future.result()
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+
+            batch = [entry]
+            stopping = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            self._executor.submit(self._flush, batch)
+            if stopping:
+                return
+
+    def _flush(self, batch: list[tuple[dict, Future]]) -> None:
+        # Claim each message; those whose sender gave up are left out
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            results = self.flush_batch([item for item, _ in batch])
+        except Exception as e:
+            services_logger.error(f"Coalesced write of {len(batch)} messages failed: {e}")
+            with self._stats_lock:
+                self._stats["failedBatches"] += 1
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+        COALESCED_BATCH_SIZE.observe(len(batch))
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["messages"] += len(batch)
+            self._stats["maxBatchSize"] = max(self._stats["maxBatchSize"], len(batch))
+
+    def stats(self) -> dict:
+        """Batch counters and the current number of waiting messages."""
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        snapshot["avgBatchSize"] = snapshot["messages"] / snapshot["batches"] if snapshot["batches"] else 0.0
+        snapshot["queueDepth"] = self._queue.qsize()
+        return snapshot
@@ -0,0 +1,186 @@
+import os
+import queue
+import socket
+import threading
+import time
+
+from config.xmpp_config import XMPPConfig
+
+from ..database.chat_messages import ChatMessages
+from ..xmpp.chat_messages_xmpp import ChatMessagesXMPP
+
+from .logger import services_logger
+
+
+class XMPPRelay:
+    """
+    Background relay of stored chat messages to their XMPP MUC room.
+
+    Messages are stored with xmppStatus "pending" before they are queued, so a
+    message is only considered relayed once ejabberd accepted it (at-least-once).
+    Failed sends are retried with exponential backoff and dead-lettered
+    (xmppStatus "failed") after the last attempt. When the bounded queue is
+    full the caller relays inline, which pushes back on senders.
+
+    Every process recovers leftovers at startup and then every
+    `recovery_interval` seconds, which also picks up messages whose lease ran
+    out while the process was running. Recovered messages are claimed with a
+    lease first, so each one is re-queued by a single process.
+    """
+
+    def __init__(
+        self,
+        chat_messages_dal: ChatMessages,
+        chat_messages_xmpp: ChatMessagesXMPP,
+        queue_size: int = XMPPConfig.XMPP_RELAY_QUEUE_SIZE,
+        workers: int = XMPPConfig.XMPP_RELAY_WORKERS,
+        max_attempts: int = XMPPConfig.XMPP_RELAY_MAX_ATTEMPTS,
+        retry_backoff: float = XMPPConfig.XMPP_RELAY_RETRY_BACKOFF,
+        lease_seconds: int = XMPPConfig.XMPP_RELAY_LEASE,
+        recovery_interval: float = XMPPConfig.XMPP_RELAY_RECOVERY_INTERVAL,
+    ):
+        self.chat_messages_dal = chat_messages_dal
+        self.chat_messages_xmpp = chat_messages_xmpp
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease_seconds = lease_seconds
+        self.recovery_interval = recovery_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._recovery_thread = None
+        self._stopping = threading.Event()
+        self._stats = {
+            "enqueued": 0,
+            "relayed": 0,
+            "retries": 0,
+            "deadLettered": 0,
+            "inlineRelays": 0,
+            "maxQueueDepth": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def _incr(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def start(self) -> None:
+        """Start the background relay workers and the periodic recovery."""
+        if self._threads:
+            return
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"xmpp-relay-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.recovery_interval > 0:
+            self._recovery_thread = threading.Thread(target=self._recover_periodically, name="xmpp-relay-recovery", daemon=True)
+            self._recovery_thread.start()
+        services_logger.info(f"XMPP relay started with {self.workers} workers (queue size {self._queue.maxsize})")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the periodic recovery, let the workers drain the queue and stop them."""
+        self._stopping.set()
+        if self._recovery_thread:
+            self._recovery_thread.join(timeout)
+            self._recovery_thread = None
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        services_logger.info("XMPP relay stopped")
+
+    def submit(self, message: dict) -> None:
+        """Queue a stored message for relay, relaying inline when the queue is full."""
+        job = {
+            "messageId": str(message["_id"]),
+            "chatId": message["chat_id"],
+            "senderId": message["sender_id"],
+            "content": message["content"],
+        }
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            services_logger.warning(f"XMPP relay queue full, relaying message {job['messageId']} inline")
+            self._incr("inlineRelays")
+            self._deliver(job)
+            return
+
+        self._incr("enqueued")
+        with self._stats_lock:
+            self._stats["maxQueueDepth"] = max(self._stats["maxQueueDepth"], self._queue.qsize())
+
+    def recover_pending(
+        self, older_than_seconds: int = XMPPConfig.XMPP_RELAY_RECOVERY_AGE, include_failed: bool = False, limit: int = 1000
+    ) -> int:
+        """Claim and re-queue messages left pending (e.g. by a restarted worker), optionally with dead letters."""
+        statuses = ["pending", "failed"] if include_failed else ["pending"]
+        recovered = 0
+        for status in statuses:
+            while recovered < limit:
+                message = self.chat_messages_dal.claim_pending_relay(status, older_than_seconds, self.owner, self.lease_seconds)
+                if not message:
+                    break
+                self.submit(message)
+                recovered += 1
+        if recovered:
+            services_logger.info(f"Re-queued {recovered} messages for XMPP relay")
+        return recovered
+
+    def _recover_periodically(self) -> None:
+        while not self._stopping.wait(self.recovery_interval):
+            try:
+                self.recover_pending()
+            except Exception as e:
+                services_logger.error(f"Error in periodic XMPP relay recovery: {e}")
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._deliver(job)
+            except Exception as e:
+                services_logger.error(f"Unexpected error in XMPP relay worker: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, job: dict) -> bool:
+        error = "XMPP send_message returned failure"
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                success = self.chat_messages_xmpp.send_message(
+                    user_id=job["senderId"],
+                    to_id=job["chatId"],
+                    message_type="groupchat",
+                    subject="",
+                    body=job["content"]
+                )
+            except Exception as e:
+                success = False
+                error = str(e)
+
+            if success:
+                self.chat_messages_dal.mark_relayed(job["messageId"])
+                self._incr("relayed")
+                return True
+
+            if attempt < self.max_attempts:
+                self._incr("retries")
+                time.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+
+        self.chat_messages_dal.mark_relay_failed(job["messageId"], self.max_attempts, error)
+        self._incr("deadLettered")
+        return False
+
+    def stats(self) -> dict:
+        """Queue depth and relay counters (for backpressure monitoring)."""
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        snapshot["queueDepth"] = self._queue.qsize()
+        snapshot["queueCapacity"] = self._queue.maxsize
+        return snapshot
@@ -0,0 +1,429 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from bson import json_util
+
+from config.cache_config import CacheConfig
+
+from .metrics import metrics
+
+# Caches created by create_cache / create_recent_messages_cache, by namespace, for /metrics
+_caches = {}
+
+
+def _cache_lookups() -> dict:
+    values = {}
+    for namespace, cache in list(_caches.items()):
+        stats = cache.stats()
+        values[(namespace, "hit")] = stats["hits"]
+        values[(namespace, "miss")] = stats["misses"]
+    return values
+
+
+metrics.gauge("cache_lookups", "Cache lookups per cache and result (hit or miss)", ["cache", "result"], callback=_cache_lookups)
+
+
+class _CacheStats:
+    """Thread-safe hit/miss/eviction counters shared by the cache backends."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = _CacheStats()
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss or an expired entry."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self._stats.incr("hits")
+                    return value
+                del self._data[key]
+        self._stats.incr("misses")
+        return None
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats.incr("evictions")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+        self._stats.incr("invalidations")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        snapshot = self._stats.snapshot()
+        with self._lock:
+            snapshot["size"] = len(self._data)
+        snapshot["backend"] = "memory"
+        return snapshot
+
+
+class RedisCache:
+    """Cache stored in Redis so every worker reads and invalidates the same entries."""
+
+    def __init__(self, url: str, namespace: str, ttl: float):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("CACHE_REDIS_URL is set but the 'redis' package is not installed") from e
+
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self.ttl = ttl
+        self._stats = _CacheStats()
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str):
+        raw = self.client.get(self._key(key))
+        if raw is None:
+            self._stats.incr("misses")
+            return None
+        self._stats.incr("hits")
+        return json.loads(raw)
+
+    def set(self, key: str, value) -> None:
+        self.client.set(self._key(key), json.dumps(value), ex=max(1, int(self.ttl)))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self._key(key))
+        self._stats.incr("invalidations")
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self._key("*")))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> dict:
+        snapshot = self._stats.snapshot()
+        snapshot["backend"] = "redis"
+        return snapshot
+
+
+def _message_key(message: dict) -> tuple:
+    return (message["sentAt"], message["_id"])
+
+
+class RecentMessagesCache:
+    """
+    In-process ring buffer of the newest `size` messages of each chat.
+
+    Each buffer holds the chat's newest messages (newest first) and its total
+    message count, and is updated in place by sends, edits and deletes. Chats
+    are evicted least recently used first once more than `max_messages`
+    messages are cached overall, which bounds memory (message content is
+    capped at MAX_MESSAGE_LENGTH). A fill started before a concurrent write to
+    the same chat is dropped, so a stale page read from Mongo never replaces a
+    newer buffer.
+    """
+
+    def __init__(self, size: int, max_messages: int, ttl: float):
+        self.size = size
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self._chats = OrderedDict()  # chat_id -> {"messages", "total", "complete", "expiresAt"}
+        self._message_count = 0
+        self._fills = {}  # chat_id -> [fills in progress, written since the fill started]
+        self._lock = threading.Lock()
+        self._stats = _CacheStats()
+
+    def get(self, chat_id: str, limit: int) -> tuple[list[dict], int] | None:
+        """Return the newest `limit` messages and the total, or None when the buffer cannot serve them."""
+        with self._lock:
+            entry = self._chats.get(chat_id)
+            if entry is not None and entry["expiresAt"] <= time.monotonic():
+                self._drop(chat_id)
+                entry = None
+            if entry is not None and (len(entry["messages"]) >= limit or entry["complete"]):
+                self._chats.move_to_end(chat_id)
+                self._stats.incr("hits")
+                return entry["messages"][:limit], entry["total"]
+        self._stats.incr("misses")
+        return None
+
+    def begin_fill(self, chat_id: str) -> None:
+        """Mark a Mongo read for `fill` as started, so writes racing with it are noticed."""
+        with self._lock:
+            self._fills.setdefault(chat_id, [0, False])[0] += 1
+
+    def fill(self, chat_id: str, messages: list[dict], total: int) -> None:
+        """Store the newest messages (newest first) read from Mongo after `begin_fill`."""
+        with self._lock:
+            fill = self._fills.get(chat_id)
+            stale = False
+            if fill is not None:
+                stale = fill[1]
+                fill[0] -= 1
+                if fill[0] <= 0:
+                    del self._fills[chat_id]
+            if stale:
+                return
+
+            self._drop(chat_id)
+            messages = list(messages[:self.size])
+            self._chats[chat_id] = {
+                "messages": messages,
+                "total": total,
+                "complete": total <= len(messages),
+                "expiresAt": time.monotonic() + self.ttl,
+            }
+            self._message_count += len(messages)
+            self._evict()
+
+    def _written(self, chat_id: str) -> None:
+        fill = self._fills.get(chat_id)
+        if fill is not None:
+            fill[1] = True
+
+    def add(self, chat_id: str, message: dict) -> None:
+        """Put a newly stored message at the head of the chat's buffer."""
+        with self._lock:
+            self._written(chat_id)
+            entry = self._chats.get(chat_id)
+            if entry is None:
+                return
+            messages = entry["messages"]
+            # Concurrent sends can be stored out of order: keep the buffer sorted newest first
+            index = 0
+            while index < len(messages) and _message_key(messages[index]) > _message_key(message):
+                index += 1
+            messages.insert(index, message)
+            entry["total"] += 1
+            self._message_count += 1
+            if len(messages) > self.size:
+                messages.pop()
+                self._message_count -= 1
+                entry["complete"] = False
+            self._evict()
+
+    def update(self, chat_id: str, message: dict) -> None:
+        """Replace an edited message in the chat's buffer."""
+        with self._lock:
+            self._written(chat_id)
+            entry = self._chats.get(chat_id)
+            if entry is None:
+                return
+            for index, cached in enumerate(entry["messages"]):
+                if cached["_id"] == message["_id"]:
+                    entry["messages"][index] = message
+                    break
+
+    def remove(self, chat_id: str, message_id) -> None:
+        """Drop a deleted message from the chat's buffer and count."""
+        with self._lock:
+            self._written(chat_id)
+            entry = self._chats.get(chat_id)
+            if entry is None:
+                return
+            messages = entry["messages"]
+            kept = [cached for cached in messages if str(cached["_id"]) != str(message_id)]
+            self._message_count -= len(messages) - len(kept)
+            entry["messages"] = kept
+            entry["total"] = max(0, entry["total"] - 1)
+
+    def delete(self, chat_id: str) -> None:
+        with self._lock:
+            self._written(chat_id)
+            self._drop(chat_id)
+        self._stats.incr("invalidations")
+
+    def _drop(self, chat_id: str) -> None:
+        entry = self._chats.pop(chat_id, None)
+        if entry is not None:
+            self._message_count -= len(entry["messages"])
+
+    def _evict(self) -> None:
+        while self._message_count > self.max_messages and len(self._chats) > 1:
+            _, entry = self._chats.popitem(last=False)
+            self._message_count -= len(entry["messages"])
+            self._stats.incr("evictions")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._chats.clear()
+            self._message_count = 0
+
+    def stats(self) -> dict:
+        snapshot = self._stats.snapshot()
+        with self._lock:
+            snapshot["size"] = len(self._chats)
+            snapshot["messages"] = self._message_count
+        snapshot["backend"] = "memory"
+        return snapshot
+
+
+class RedisRecentMessagesCache:
+    """
+    Recent-messages buffers stored in Redis so every worker and replica shares them.
+
+    Each chat is one JSON document (bson.json_util keeps ObjectIds and datetimes)
+    updated with optimistic WATCH/MULTI transactions. Fills are not checked against
+    concurrent writes on other nodes; the TTL bounds how long such a race can last.
+    """
+
+    def __init__(self, url: str, namespace: str, size: int, ttl: float):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("CACHE_REDIS_URL is set but the 'redis' package is not installed") from e
+
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self.size = size
+        self.ttl = ttl
+        self._json_options = json_util.JSONOptions(tz_aware=False)
+        self._stats = _CacheStats()
+
+    def _key(self, chat_id: str) -> str:
+        return f"{self.namespace}:{chat_id}"
+
+    def _load(self, raw) -> dict | None:
+        return json_util.loads(raw, json_options=self._json_options) if raw is not None else None
+
+    def _store(self, client, chat_id: str, entry: dict) -> None:
+        client.set(self._key(chat_id), json_util.dumps(entry), ex=max(1, int(self.ttl)))
+
+    def get(self, chat_id: str, limit: int) -> tuple[list[dict], int] | None:
+        entry = self._load(self.client.get(self._key(chat_id)))
+        if entry is not None and (len(entry["messages"]) >= limit or entry["complete"]):
+            self._stats.incr("hits")
+            return entry["messages"][:limit], entry["total"]
+        self._stats.incr("misses")
+        return None
+
+    def begin_fill(self, chat_id: str) -> None:
+        pass
+
+    def fill(self, chat_id: str, messages: list[dict], total: int) -> None:
+        messages = list(messages[:self.size])
+        self._store(self.client, chat_id, {"messages": messages, "total": total, "complete": total <= len(messages)})
+
+    def _modify(self, chat_id: str, change) -> None:
+        """Apply `change(entry)` to a cached buffer atomically; chats that are not cached are left alone."""
+        key = self._key(chat_id)
+
+        def transaction(pipe):
+            entry = self._load(pipe.get(key))
+            if entry is None:
+                return
+            change(entry)
+            pipe.multi()
+            self._store(pipe, chat_id, entry)
+
+        self.client.transaction(transaction, key)
+
+    def add(self, chat_id: str, message: dict) -> None:
+        def change(entry):
+            messages = entry["messages"]
+            messages.append(message)
+            messages.sort(key=_message_key, reverse=True)
+            entry["total"] += 1
+            if len(messages) > self.size:
+                del messages[self.size:]
+                entry["complete"] = False
+
+        self._modify(chat_id, change)
+
+    def update(self, chat_id: str, message: dict) -> None:
+        def change(entry):
+            entry["messages"] = [message if cached["_id"] == message["_id"] else cached for cached in entry["messages"]]
+
+        self._modify(chat_id, change)
+
+    def remove(self, chat_id: str, message_id) -> None:
+        def change(entry):
+            entry["messages"] = [cached for cached in entry["messages"] if str(cached["_id"]) != str(message_id)]
+            entry["total"] = max(0, entry["total"] - 1)
+
+        self._modify(chat_id, change)
+
+    def delete(self, chat_id: str) -> None:
+        self.client.delete(self._key(chat_id))
+        self._stats.incr("invalidations")
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self._key("*")))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> dict:
+        snapshot = self._stats.snapshot()
+        snapshot["backend"] = "redis"
+        return snapshot
+
+
+def create_cache(namespace: str, maxsize: int, ttl: float):
+    """
+    Create a cache backed by Redis when CACHE_REDIS_URL is set.
+
+    An in-process cache is only created with CACHE_IN_PROCESS, since other replicas
+    cannot invalidate it. Returns None otherwise.
+    """
+    if CacheConfig.CACHE_REDIS_URL:
+        cache = RedisCache(CacheConfig.CACHE_REDIS_URL, namespace, ttl)
+    elif CacheConfig.CACHE_IN_PROCESS:
+        cache = TTLCache(maxsize, ttl)
+    else:
+        return None
+    _caches[namespace] = cache
+    return cache
+
+
+def create_recent_messages_cache(namespace: str, size: int, max_messages: int, ttl: float):
+    """
+    Create the per-chat recent-messages buffers, in Redis when CACHE_REDIS_URL is set.
+
+    In-process buffers are only created with CACHE_IN_PROCESS: sends, edits and deletes
+    handled by another replica would never reach them. Returns None otherwise.
+    """
+    if CacheConfig.CACHE_REDIS_URL:
+        cache = RedisRecentMessagesCache(CacheConfig.CACHE_REDIS_URL, namespace, size, ttl)
+    elif CacheConfig.CACHE_IN_PROCESS:
+        cache = RecentMessagesCache(size, max_messages, ttl)
+    else:
+        return None
+    _caches[namespace] = cache
+    return cache
@@ -11,4 +11,7 @@ MIN_USERS_REQUIRED = 2
 MAX_USERS_ALLOWED = 20
 
 # Message Content
-MAX_MESSAGE_LENGTH = 750
\ No newline at end of file
+MAX_MESSAGE_LENGTH = 750
+
+# Message Batches
+MAX_MESSAGE_BATCH_SIZE = 1000
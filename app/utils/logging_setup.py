@@ -0,0 +1,156 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+from datetime import datetime
+
+from bson import ObjectId
+
+from config.logging_config import LoggingConfig
+
+LOG_FORMAT = 'Module %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s - %(asctime)s'
+
+# Log arguments that are safe to format later in the listener thread
+_IMMUTABLE_ARG_TYPES = (str, bytes, int, float, bool, type(None), datetime, ObjectId)
+
+_listeners = {}
+_dropped = {}
+_dropped_lock = threading.Lock()
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a background listener without blocking the caller.
+
+    Records are queued as they are: message formatting happens in the listener
+    thread. When the queue is full the record is dropped and counted instead of
+    making the request wait for the disk.
+
+    Exception tracebacks are rendered before queueing, so queued records do not
+    keep the failing frames alive. So are messages with mutable arguments (lists,
+    dicts, documents), which the caller may change before the listener runs.
+    """
+
+    _exception_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        if record.args:
+            args = record.args.values() if isinstance(record.args, dict) else record.args
+            if not all(_is_immutable(arg) for arg in args):
+                record.msg = record.getMessage()
+                record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with _dropped_lock:
+                _dropped[record.name] = _dropped.get(record.name, 0) + 1
+
+
+def create_logger(name: str, log_file_path: str, level: str, propagate: bool = True) -> logging.Logger:
+    """
+    Build a subsystem logger whose file (and optional console) output is written
+    by a background thread fed through a bounded queue.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.propagate = propagate
+    logger.handlers.clear()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.FileHandler(log_file_path, mode='w')]
+    if LoggingConfig.LOG_CONSOLE:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=LoggingConfig.LOG_QUEUE_SIZE)
+    logger.addHandler(NonBlockingQueueHandler(log_queue))
+
+    if name in _listeners:
+        _listeners[name].stop()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[name] = listener
+    return logger
+
+
+def stop_logging() -> None:
+    """Flush the queued records and stop the listener threads."""
+    for listener in _listeners.values():
+        listener.stop()
+    _listeners.clear()
+
+
+atexit.register(stop_logging)
+
+
+def logging_stats() -> dict:
+    """Queue depth and dropped records per logger."""
+    with _dropped_lock:
+        dropped = dict(_dropped)
+    return {
+        name: {"queueDepth": listener.queue.qsize(), "dropped": dropped.get(name, 0)}
+        for name, listener in _listeners.items()
+    }
+
+
+class SampledLogger:
+    """
+    Logs only LOG_SAMPLE_RATE percent of its calls.
+
+    For per-message lines on the hot path: the level check and the sampling
+    decision come before any argument is formatted.
+    """
+
+    def __init__(self, logger: logging.Logger, sample_rate: float = LoggingConfig.LOG_SAMPLE_RATE):
+        self.logger = logger
+        self.sample_rate = sample_rate
+
+    def _log(self, level: int, msg: str, *args) -> None:
+        if self.logger.isEnabledFor(level) and random.random() * 100 < self.sample_rate:
+            self.logger.log(level, msg, *args, stacklevel=3)
+
+    def debug(self, msg: str, *args) -> None:
+        self._log(logging.DEBUG, msg, *args)
+
+    def info(self, msg: str, *args) -> None:
+        self._log(logging.INFO, msg, *args)
+
+
+def _is_immutable(arg) -> bool:
+    """Whether a log argument renders the same later in the listener thread."""
+    if isinstance(arg, Payload):
+        return isinstance(arg.value, (str, bytes))
+    return isinstance(arg, _IMMUTABLE_ARG_TYPES)
+
+
+class Payload:
+    """
+    Lazily rendered payload (message content, response body) for log arguments.
+
+    Only rendered when the line is actually written, and replaced by its size
+    unless LOG_PAYLOADS is enabled.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        if LoggingConfig.LOG_PAYLOADS:
+            return str(self.value)
+        if isinstance(self.value, str):
+            return f"<{len(self.value)} chars omitted>"
+        if hasattr(self.value, "__len__"):
+            return f"<{len(self.value)} items omitted>"
+        return "<payload omitted>"
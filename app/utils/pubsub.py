@@ -0,0 +1,111 @@
+import json
+import queue
+import threading
+
+import socketio
+
+
+class RoomSyncMixin:
+    """
+    Moves every session of one room into or out of another room, on all nodes.
+
+    Used to put all of a user's sessions (their personal room) into a chat
+    room when they join the chat, wherever those sessions are connected.
+    Pub/sub managers forward the change to the other nodes as an enter_room
+    or leave_room message carrying a "sourceRoom".
+    """
+
+    def enter_room_of(self, source_room: str, room: str, namespace: str = "/") -> None:
+        self._sync_room({"method": "enter_room", "sourceRoom": source_room, "room": room, "namespace": namespace})
+
+    def leave_room_of(self, source_room: str, room: str, namespace: str = "/") -> None:
+        self._sync_room({"method": "leave_room", "sourceRoom": source_room, "room": room, "namespace": namespace})
+
+    def _sync_room(self, message: dict) -> None:
+        self._apply_room_sync(message)  # sessions on this node
+        if isinstance(self, socketio.PubSubManager):
+            self._publish(dict(message, host_id=self.host_id))  # sessions on the other nodes
+
+    def _apply_room_sync(self, message: dict) -> None:
+        namespace = message["namespace"]
+        sids = [sid for sid, _ in self.get_participants(namespace, message["sourceRoom"])]
+        for sid in sids:
+            if message["method"] == "enter_room":
+                self.enter_room(sid, namespace, message["room"])
+            else:
+                self.leave_room(sid, namespace, message["room"])
+
+    def _handle_enter_room(self, message):
+        if "sourceRoom" in message:
+            return self._apply_room_sync(message)
+        return super()._handle_enter_room(message)
+
+    def _handle_leave_room(self, message):
+        if "sourceRoom" in message:
+            return self._apply_room_sync(message)
+        return super()._handle_leave_room(message)
+
+
+class RoomSyncManager(RoomSyncMixin, socketio.Manager):
+    """Single-node client manager (no message queue)."""
+
+
+class LocalPubSubManager(RoomSyncMixin, socketio.PubSubManager):
+    """
+    In-process stand-in for a Socket.IO message queue.
+
+    Every manager on the same channel receives the messages published by the
+    others, like Redis pub/sub, but without leaving the process. Used for tests
+    and to run several SocketIO servers in one process (SOCKETIO_MESSAGE_QUEUE=memory://).
+    """
+
+    name = "local"
+
+    _inboxes = {}  # channel -> list of subscriber queues
+    _inboxes_lock = threading.Lock()
+
+    def __init__(self, channel: str = "flask-socketio", write_only: bool = False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._inbox = queue.Queue()
+        if not write_only:
+            with LocalPubSubManager._inboxes_lock:
+                LocalPubSubManager._inboxes.setdefault(channel, []).append(self._inbox)
+
+    def _publish(self, data):
+        message = json.dumps(data)
+        with LocalPubSubManager._inboxes_lock:
+            inboxes = list(LocalPubSubManager._inboxes.get(self.channel, []))
+        for inbox in inboxes:
+            inbox.put(message)
+
+    def _listen(self):
+        while True:
+            yield self._inbox.get()
+
+
+def _queue_manager_class(url: str) -> type:
+    """Pick the python-socketio manager for a message queue URL (same rules as Flask-SocketIO)."""
+    if url.startswith(("redis://", "rediss://")):
+        base = socketio.RedisManager
+    elif url.startswith("kafka://"):
+        base = socketio.KafkaManager
+    elif url.startswith("zmq"):
+        base = socketio.ZmqManager
+    else:
+        base = socketio.KombuManager
+    return type(f"RoomSync{base.__name__}", (RoomSyncMixin, base), {})
+
+
+def message_queue_options(url: str, channel: str) -> dict:
+    """
+    SocketIO options that share room emits across nodes through `url`.
+
+    "memory://" uses the in-process LocalPubSubManager, any other URL
+    (redis://, amqp://, kafka://, ...) the matching python-socketio manager,
+    and an empty URL keeps rooms local to this process.
+    """
+    if not url:
+        return {"client_manager": RoomSyncManager()}
+    if url.startswith("memory://"):
+        return {"client_manager": LocalPubSubManager(channel=channel)}
+    return {"client_manager": _queue_manager_class(url)(url, channel=channel)}
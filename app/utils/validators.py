@@ -64,4 +64,14 @@ def validate_message_content(content: str) -> str:
         raise ValueError(f"Invalid content type {type(content)}. Expected string")
     if len(content) > MAX_MESSAGE_LENGTH:
         raise ValueError(f"Message content exceeds {MAX_MESSAGE_LENGTH} characters")
-    return content
\ No newline at end of file
+    return content
+
+def validate_message_batch(messages: list[dict]) -> list[dict]:
+    """Validate a message batch (the items themselves are validated one by one)."""
+    if not messages:
+        raise ValueError("Missing messages field")
+    if not isinstance(messages, list):
+        raise ValueError("Invalid messages type")
+    if len(messages) > MAX_MESSAGE_BATCH_SIZE:
+        raise ValueError(f"Maximum {MAX_MESSAGE_BATCH_SIZE} messages per batch allowed")
+    return messages
@@ -0,0 +1,24 @@
+import random
+
+from config.consistency_config import ConsistencyConfig
+
+VERIFY_MODES = ("strict", "sampled", "trusted")
+
+
+class VerifyPolicy:
+    """Decides whether a write should be verified by reading it back."""
+
+    def __init__(self, mode: str = ConsistencyConfig.WRITE_VERIFY_MODE, sample_rate: float = ConsistencyConfig.WRITE_VERIFY_SAMPLE_RATE):
+        if mode not in VERIFY_MODES:
+            raise ValueError(f"Invalid verify mode '{mode}'. Expected one of {VERIFY_MODES}")
+        if not 0 <= sample_rate <= 100:
+            raise ValueError("Verify sample rate must be between 0 and 100")
+        self.mode = mode
+        self.sample_rate = sample_rate
+
+    def should_verify(self) -> bool:
+        if self.mode == "strict":
+            return True
+        if self.mode == "trusted":
+            return False
+        return random.random() * 100 < self.sample_rate
@@ -0,0 +1,4 @@
+from app import create_app
+
+# Production entry point: gunicorn -c config/gunicorn_conf.py app.wsgi:app
+app = create_app()
@@ -1,9 +1,9 @@
 import requests
-from requests.auth import HTTPBasicAuth
 from requests.exceptions import RequestException
 
 from config.xmpp_config import XMPPConfig
 
+from .ejabberd_client import ejabberd_client, bulk_executor
 from .logger import xmpp_logger
 
 
@@ -15,13 +15,7 @@ class ChatGroupsXMPP:
     def _post(endpoint: str, payload: dict) -> requests.Response:
         """Helper method for making HTTP POST requests."""
         try:
-            response = requests.post(
-                endpoint,
-                json=payload,
-                auth=HTTPBasicAuth(XMPPConfig.ADMIN_USER, XMPPConfig.ADMIN_PASSWORD),
-                verify=False
-            )
-            response.raise_for_status()
+            response = ejabberd_client.post(endpoint, payload)
             xmpp_logger.info(f"✅ HTTP POST to {endpoint} succeeded.")
             return response
         except RequestException as e:
@@ -188,18 +182,36 @@ class ChatGroupsXMPP:
             xmpp_logger.error(f"❌ Failed to set affiliation '{affiliation}' for user {user}@{XMPPConfig.VHOST} in room {room}")
             return False
 
+    @staticmethod
+    def set_room_affiliations(room: str, users: list[str], affiliation: str) -> dict[str, bool]:
+        """
+        Set the same affiliation for several users of a room.
+
+        ejabberd has no bulk affiliation command, so the set_room_affiliation calls are
+        sent concurrently over a bounded worker pool (sharing the pooled HTTP session).
+        Returns the outcome per user so partial failures can be reported.
+        """
+        if len(users) <= 1:
+            return {user: ChatGroupsXMPP.set_room_affiliation(room, user, affiliation) for user in users}
+
+        outcomes = bulk_executor.map(lambda user: ChatGroupsXMPP.set_room_affiliation(room, user, affiliation), users)
+        results = dict(zip(users, outcomes))
+
+        failed_users = [user for user, success in results.items() if not success]
+        if failed_users:
+            xmpp_logger.error(f"❌ Failed to set affiliation '{affiliation}' in room {room} for users: {failed_users}")
+        else:
+            xmpp_logger.info(f"✅ Set affiliation '{affiliation}' in room {room} for {len(users)} users.")
+        return results
+
     @staticmethod
     def add_user_to_room(room: str, user: str) -> bool:
         return ChatGroupsXMPP.set_room_affiliation(room, user, "member")
 
     @staticmethod
     def add_users_to_room(room: str, users: list[str]) -> bool:
-        success = True
-        for user in users:
-            if not ChatGroupsXMPP.set_room_affiliation(room, user, "member"):
-                xmpp_logger.error(f"❌ Failed to add user {user} to room {room}")
-                success = False
-        return success
+        results = ChatGroupsXMPP.set_room_affiliations(room, users, "member")
+        return all(results.values())
 
     @staticmethod
     def remove_user_from_room(room: str, user: str) -> bool:
@@ -207,9 +219,5 @@ class ChatGroupsXMPP:
 
     @staticmethod
     def remove_users_from_room(room: str, users: list[str]) -> bool:
-        success = True
-        for user in users:
-            if not ChatGroupsXMPP.set_room_affiliation(room, user, "none"):
-                xmpp_logger.error(f"❌ Failed to remove user {user} from room {room}")
-                success = False
-        return success
+        results = ChatGroupsXMPP.set_room_affiliations(room, users, "none")
+        return all(results.values())
@@ -1,10 +1,11 @@
 import requests
-from requests.auth import HTTPBasicAuth
 from requests.exceptions import RequestException
 
 from config.xmpp_config import XMPPConfig
 
-from .logger import xmpp_logger
+from ..utils.logging_setup import Payload
+from .ejabberd_client import ejabberd_client, bulk_executor
+from .logger import xmpp_logger, xmpp_sample_logger
 
 
 class ChatMessagesXMPP:
@@ -14,14 +15,8 @@ class ChatMessagesXMPP:
     @staticmethod
     def _post(endpoint: str, payload: dict) -> requests.Response:
         try:
-            response = requests.post(
-                endpoint,
-                json=payload,
-                auth=HTTPBasicAuth(XMPPConfig.ADMIN_USER, XMPPConfig.ADMIN_PASSWORD),
-                verify=False
-            )
-            response.raise_for_status()
-            xmpp_logger.info(f"✅ HTTP POST to {endpoint} succeeded.")
+            response = ejabberd_client.post(endpoint, payload)
+            xmpp_sample_logger.info("✅ HTTP POST to %s succeeded.", endpoint)
             return response
         except RequestException as e:
             xmpp_logger.exception(f"❌ HTTP request failed (POST {endpoint}): {e}")
@@ -62,7 +57,7 @@ class ChatMessagesXMPP:
             result = response.json()
 
             if result == 0:
-                xmpp_logger.info(f"📤 Sent message from {from_jid} to {to_jid}: {body}")
+                xmpp_sample_logger.info("📤 Sent message from %s to %s: %s", from_jid, to_jid, Payload(body))
                 return True
             else:
                 xmpp_logger.error(
@@ -72,3 +67,38 @@ class ChatMessagesXMPP:
         except RequestException:
             xmpp_logger.error(f"❌ Failed to send message from {from_jid} to {to_jid}")
             return False
+
+    @staticmethod
+    def send_messages(messages: list[dict], message_type: str = "groupchat", preserve_order: bool = True) -> list[bool]:
+        """
+        Send several {"sender_id", "chat_id", "content"} messages, returning the outcome per message.
+
+        ejabberd has no batch send command, so the send_message calls are pipelined
+        over the bounded worker pool (sharing the pooled HTTP session). With
+        `preserve_order`, messages to the same room are sent one after the other by one
+        worker to keep their order and only different rooms are sent concurrently;
+        otherwise every message is sent concurrently.
+        """
+        by_room = {}
+        for index, message in enumerate(messages):
+            key = message["chat_id"] if preserve_order else index
+            by_room.setdefault(key, []).append(index)
+
+        def send_room(indexes: list[int]) -> list[tuple[int, bool]]:
+            return [
+                (index, ChatMessagesXMPP.send_message(
+                    user_id=messages[index]["sender_id"],
+                    to_id=messages[index]["chat_id"],
+                    message_type=message_type,
+                    subject="",
+                    body=messages[index]["content"]
+                ))
+                for index in indexes
+            ]
+
+        outcomes = [False] * len(messages)
+        room_results = map(send_room, by_room.values()) if len(by_room) <= 1 else bulk_executor.map(send_room, by_room.values())
+        for results in room_results:
+            for index, success in results:
+                outcomes[index] = success
+        return outcomes
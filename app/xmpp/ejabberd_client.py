@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from requests.exceptions import RequestException
+
+from config.xmpp_config import XMPPConfig
+
+from ..utils.metrics import metrics
+from .logger import xmpp_logger
+
+EJABBERD_REQUEST_SECONDS = metrics.histogram(
+    "ejabberd_request_duration_seconds", "Duration of ejabberd admin API calls", ["endpoint"]
+)
+EJABBERD_REQUEST_ERRORS = metrics.counter(
+    "ejabberd_request_errors_total", "Failed ejabberd admin API calls", ["endpoint"]
+)
+
+
+class EjabberdClient:
+    """
+    Shared HTTP client for the ejabberd admin API.
+
+    Keeps a single keep-alive `requests.Session` with a bounded connection pool,
+    so every API call reuses an open TLS connection instead of doing a fresh
+    handshake. Latency and error counters are kept per endpoint.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = XMPPConfig.EJABBERD_POOL_SIZE,
+        connect_timeout: float = XMPPConfig.EJABBERD_CONNECT_TIMEOUT,
+        read_timeout: float = XMPPConfig.EJABBERD_READ_TIMEOUT,
+        verify: bool = XMPPConfig.EJABBERD_VERIFY_TLS,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth(XMPPConfig.ADMIN_USER, XMPPConfig.ADMIN_PASSWORD)
+        self.session.verify = verify
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        if not verify:
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def _endpoint_name(endpoint: str) -> str:
+        """Reduce a full API URL to its command name (e.g. 'send_message')."""
+        return endpoint.rstrip("/").rsplit("/", 1)[-1]
+
+    def _record(self, name: str, elapsed: float, failed: bool) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(name, {
+                "count": 0,
+                "errors": 0,
+                "totalSeconds": 0.0,
+                "maxSeconds": 0.0,
+            })
+            stats["count"] += 1
+            stats["totalSeconds"] += elapsed
+            stats["maxSeconds"] = max(stats["maxSeconds"], elapsed)
+            if failed:
+                stats["errors"] += 1
+        EJABBERD_REQUEST_SECONDS.observe(elapsed, endpoint=name)
+        if failed:
+            EJABBERD_REQUEST_ERRORS.inc(endpoint=name)
+
+    def post(self, endpoint: str, payload: dict) -> requests.Response:
+        """POST a JSON payload to an ejabberd API endpoint over the pooled session."""
+        name = self._endpoint_name(endpoint)
+        start = time.perf_counter()
+        failed = False
+        try:
+            response = self.session.post(endpoint, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return response
+        except RequestException:
+            failed = True
+            raise
+        finally:
+            self._record(name, time.perf_counter() - start, failed)
+
+    def get_stats(self) -> dict:
+        """Return a snapshot of per-endpoint call counts, errors and latencies."""
+        with self._stats_lock:
+            snapshot = {}
+            for name, stats in self._stats.items():
+                snapshot[name] = dict(stats)
+                snapshot[name]["avgSeconds"] = stats["totalSeconds"] / stats["count"] if stats["count"] else 0.0
+            return snapshot
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._stats.clear()
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.session.close()
+        xmpp_logger.info("ejabberd HTTP session closed.")
+
+
+# Shared client used by all XMPP modules
+ejabberd_client = EjabberdClient()
+
+# Bounded worker pool for fanning out independent API calls (e.g. one affiliation per user)
+bulk_executor = ThreadPoolExecutor(max_workers=XMPPConfig.EJABBERD_BULK_WORKERS, thread_name_prefix="ejabberd-bulk")
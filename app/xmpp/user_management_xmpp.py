@@ -1,29 +1,36 @@
 import logging
+import threading
+import time
 from typing import List, Tuple
 
 import requests
-from requests.auth import HTTPBasicAuth
 from requests.exceptions import RequestException
 
 from config.xmpp_config import XMPPConfig
 
+from .ejabberd_client import ejabberd_client, bulk_executor
 from .logger import xmpp_logger
 
 
 class UserManagementXMPP:
+    # Usernames known to be registered in ejabberd, shared by all instances.
+    # Loaded once from registered_users, then kept up to date on (un)registration
+    # and refreshed in the background every REGISTERED_USERS_REFRESH seconds.
+    _registered_users = set()
+    _registered_users_loaded_at = None
+    _registered_users_refreshing = False
+    # (Un)registrations made while a refresh is in flight, one dict per running refresh,
+    # replayed onto the fetched set so they are not lost in the swap
+    _registered_users_journals = []
+    _registered_users_lock = threading.Lock()
+
     def __init__(self):
         pass
 
     @staticmethod
     def _post(endpoint: str, payload: dict) -> requests.Response:
         try:
-            response = requests.post(
-                endpoint,
-                json=payload,
-                auth=HTTPBasicAuth(XMPPConfig.ADMIN_USER, XMPPConfig.ADMIN_PASSWORD),
-                verify=False
-            )
-            response.raise_for_status()
+            response = ejabberd_client.post(endpoint, payload)
             xmpp_logger.info(f"✅ HTTP POST request to {endpoint} succeeded.")
             return response
         except RequestException as e:
@@ -31,7 +38,7 @@ class UserManagementXMPP:
             raise
 
     @staticmethod
-    def register_user(username: str, password: str):
+    def register_user(username: str, password: str) -> bool:
         """Register a new user via HTTP API."""
         endpoint = f"{XMPPConfig.EJABBERD_API_URL}/register"
         payload = {
@@ -45,12 +52,19 @@ class UserManagementXMPP:
             xmpp_logger.info(f"✅ Registered user {username}@{XMPPConfig.VHOST}")
         except RequestException:
             xmpp_logger.error(f"❌ Failed to register user {username}@{XMPPConfig.VHOST}")
+            return False
+
+        UserManagementXMPP._record_registration(username, True)
+        return True
 
     @staticmethod
-    def register_users(users: List[Tuple[str, str]]):
-        """Register multiple users via HTTP API."""
-        for username, password in users:
-            UserManagementXMPP.register_user(username, password)
+    def register_users(users: List[Tuple[str, str]]) -> dict[str, bool]:
+        """Register multiple users concurrently via HTTP API, returning the result per username."""
+        if len(users) <= 1:
+            return {username: UserManagementXMPP.register_user(username, password) for username, password in users}
+
+        results = bulk_executor.map(lambda user: UserManagementXMPP.register_user(*user), users)
+        return {username: success for (username, _), success in zip(users, results)}
 
     @staticmethod
     def unregister_user(username: str):
@@ -66,6 +80,20 @@ class UserManagementXMPP:
             xmpp_logger.info(f"🗑️ Unregistered user {username}@{XMPPConfig.VHOST}")
         except RequestException:
             xmpp_logger.error(f"❌ Failed to unregister user {username}@{XMPPConfig.VHOST}")
+            return
+
+        UserManagementXMPP._record_registration(username, False)
+
+    @staticmethod
+    def _record_registration(username: str, registered: bool) -> None:
+        """Update the cached registered-users set, and the journals of refreshes in flight."""
+        with UserManagementXMPP._registered_users_lock:
+            if registered:
+                UserManagementXMPP._registered_users.add(username)
+            else:
+                UserManagementXMPP._registered_users.discard(username)
+            for journal in UserManagementXMPP._registered_users_journals:
+                journal[username] = registered
 
     @staticmethod
     def get_registered_users() -> List[dict]:
@@ -76,19 +104,69 @@ class UserManagementXMPP:
         try:
             response = UserManagementXMPP._post(endpoint, payload)
             registered_users = response.json()
-            xmpp_logger.info(f"✅ Retrieved registered users: {registered_users}")
+            xmpp_logger.info(f"✅ Retrieved {len(registered_users)} registered users")
             return registered_users
         except RequestException:
             xmpp_logger.error("❌ Failed to retrieve registered users")
             return []
 
+    @staticmethod
+    def refresh_registered_users() -> bool:
+        """Reload the cached registered-users set from ejabberd, keeping (un)registrations made meanwhile."""
+        endpoint = f"{XMPPConfig.EJABBERD_API_URL}/registered_users"
+        payload = {"host": XMPPConfig.VHOST}
+
+        journal = {}
+        with UserManagementXMPP._registered_users_lock:
+            UserManagementXMPP._registered_users_journals.append(journal)
+
+        try:
+            registered_users = set(UserManagementXMPP._post(endpoint, payload).json())
+        except RequestException:
+            xmpp_logger.error("❌ Failed to refresh the registered users cache")
+            return False
+        finally:
+            with UserManagementXMPP._registered_users_lock:
+                UserManagementXMPP._registered_users_journals.remove(journal)
+                UserManagementXMPP._registered_users_refreshing = False
+
+        with UserManagementXMPP._registered_users_lock:
+            # The fetched list may predate (un)registrations that finished during the request
+            for username, registered in journal.items():
+                if registered:
+                    registered_users.add(username)
+                else:
+                    registered_users.discard(username)
+            UserManagementXMPP._registered_users = registered_users
+            UserManagementXMPP._registered_users_loaded_at = time.monotonic()
+        xmpp_logger.info(f"🔄 Registered users cache refreshed ({len(registered_users)} users)")
+        return True
+
+    @staticmethod
+    def _get_registered_usernames() -> set:
+        """Return the cached registered-users set, loading it on first use and refreshing it in the background once stale."""
+        with UserManagementXMPP._registered_users_lock:
+            loaded_at = UserManagementXMPP._registered_users_loaded_at
+            stale = loaded_at is not None and time.monotonic() - loaded_at > XMPPConfig.REGISTERED_USERS_REFRESH
+            start_refresh = stale and not UserManagementXMPP._registered_users_refreshing
+            if start_refresh:
+                UserManagementXMPP._registered_users_refreshing = True
+
+        if loaded_at is None:
+            UserManagementXMPP.refresh_registered_users()
+        elif start_refresh:
+            threading.Thread(target=UserManagementXMPP.refresh_registered_users, name="registered-users-refresh", daemon=True).start()
+
+        with UserManagementXMPP._registered_users_lock:
+            return UserManagementXMPP._registered_users
+
     @staticmethod
     def ensure_users_register(users: list[str], default_password: str = "password") -> None:
         """Ensure users are registered in the XMPP server, register them if missing."""
         try:
 
-            registered_usernames = UserManagementXMPP.get_registered_users()
-            
+            registered_usernames = UserManagementXMPP._get_registered_usernames()
+
             missing_users = [
                 (user, default_password)
                 for user in users
@@ -97,7 +175,10 @@ class UserManagementXMPP:
 
             if missing_users:
                 xmpp_logger.info(f"❌ Some users are missing and will be registered: {missing_users}")
-                UserManagementXMPP.register_users(missing_users)
+                results = UserManagementXMPP.register_users(missing_users)
+                failed_users = [user for user, success in results.items() if not success]
+                if failed_users:
+                    xmpp_logger.warning(f"⚠️ Failed to register users: {failed_users}")
             else:
                 xmpp_logger.info(f"✅ All users are already registered: {users}")
         
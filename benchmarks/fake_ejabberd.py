@@ -0,0 +1,323 @@
+"""
+Stateful in-process emulator of the ejabberd admin HTTP API.
+
+Used by the benchmarks and the end-to-end XMPP tests, and runnable on its own
+so the app can be pointed at it without a real ejabberd:
+
+    python -m benchmarks.fake_ejabberd --port 5280 --latency 0.02 --failure-rate 0.01
+    EJABBERD_API_URL=http://127.0.0.1:5280/api python main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeEjabberdState:
+    """In-memory users, rooms and affiliations behind the fake admin API."""
+
+    COMMANDS = {
+        "register", "unregister", "registered_users",
+        "create_room_with_opts", "destroy_room",
+        "set_room_affiliation", "get_room_affiliations", "get_room_affiliation",
+        "get_room_occupants", "get_user_rooms", "send_message",
+    }
+
+    def __init__(self):
+        self.users = {}  # username -> password
+        self.rooms = {}  # room -> {"options": [...], "affiliations": {username: affiliation}}
+        self.messages = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _username(jid: str) -> str:
+        return jid.split("@", 1)[0]
+
+    def register(self, payload):
+        with self.lock:
+            if payload["user"] in self.users:
+                return 409, f"User {payload['user']}@{payload['host']} already registered"
+            self.users[payload["user"]] = payload.get("password", "")
+        return 200, f"Success: user {payload['user']}@{payload['host']} successfully registered"
+
+    def unregister(self, payload):
+        with self.lock:
+            self.users.pop(payload["user"], None)
+        return 200, 0
+
+    def registered_users(self, payload):
+        with self.lock:
+            return 200, sorted(self.users)
+
+    def create_room_with_opts(self, payload):
+        affiliations = {}
+        for option in payload.get("options", []):
+            if option["name"] == "affiliations" and option["value"]:
+                for entry in option["value"].split(";"):
+                    affiliation, jid = entry.split("=", 1)
+                    affiliations[self._username(jid)] = affiliation
+        with self.lock:
+            if payload["room"] in self.rooms:
+                return 200, 1
+            self.rooms[payload["room"]] = {"options": payload.get("options", []), "affiliations": affiliations}
+        return 200, 0
+
+    def destroy_room(self, payload):
+        with self.lock:
+            if self.rooms.pop(payload["room"], None) is None:
+                return 200, 1
+        return 200, 0
+
+    def set_room_affiliation(self, payload):
+        with self.lock:
+            room = self.rooms.get(payload["room"])
+            if room is None:
+                return 200, 1
+            if payload["affiliation"] == "none":
+                room["affiliations"].pop(payload["user"], None)
+            else:
+                room["affiliations"][payload["user"]] = payload["affiliation"]
+        return 200, 0
+
+    def get_room_affiliations(self, payload):
+        with self.lock:
+            room = self.rooms.get(payload["room"])
+            if room is None:
+                return 200, []
+            return 200, [
+                {"jid": f"{username}@localhost", "username": username, "domain": "localhost", "affiliation": affiliation, "reason": ""}
+                for username, affiliation in room["affiliations"].items()
+            ]
+
+    def get_room_affiliation(self, payload):
+        with self.lock:
+            room = self.rooms.get(payload["room"], {"affiliations": {}})
+            return 200, room["affiliations"].get(self._username(payload["jid"]), "none")
+
+    def get_room_occupants(self, payload):
+        return 200, []
+
+    def get_user_rooms(self, payload):
+        with self.lock:
+            return 200, [
+                f"{room}@conference.localhost"
+                for room, state in self.rooms.items()
+                if payload["user"] in state["affiliations"]
+            ]
+
+    def send_message(self, payload):
+        with self.lock:
+            if payload.get("type") == "groupchat" and self._username(payload["to"]) not in self.rooms:
+                return 200, 1
+            self.messages += 1
+        return 200, 0
+
+
+class FaultInjection:
+    """
+    Latency and failure injected into every admin API call.
+
+    `latency` (plus up to `jitter`) seconds are slept before answering, and a
+    `failure_rate` fraction of calls fails: with `failure_status` (e.g. 500 or
+    503), or by dropping the connection without a response when it is 0.
+    Per-command settings in `commands` override the defaults, e.g.
+    {"send_message": {"latency": 0.2, "failure_rate": 0.1}}.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_status: int = 500,
+        commands: dict | None = None,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.commands = commands or {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _setting(self, command: str, name: str):
+        return self.commands.get(command, {}).get(name, getattr(self, name))
+
+    def delay(self, command: str) -> float:
+        jitter = self._setting(command, "jitter")
+        with self._lock:
+            extra = self._random.uniform(0, jitter) if jitter else 0.0
+        return self._setting(command, "latency") + extra
+
+    def failure(self, command: str) -> int | None:
+        """The status to fail this call with (0 drops the connection), or None to serve it."""
+        rate = self._setting(command, "failure_rate")
+        if not rate:
+            return None
+        with self._lock:
+            failed = self._random.random() < rate
+        return self._setting(command, "failure_status") if failed else None
+
+
+class FakeEjabberdServer:
+    """
+    ejabberd admin HTTP API emulator served from a background thread.
+
+    Point EJABBERD_API_URL at `url` to run the XMPP layer and the services
+    against it without a real ejabberd. Keeps per-command request and failure
+    counters, the number of TCP connections accepted and the peak number of
+    requests in flight, so connection pooling and concurrency are observable.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, faults: FaultInjection | None = None):
+        self.state = FakeEjabberdState()
+        self.faults = faults or FaultInjection()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+        self._stats_lock = threading.Lock()
+        self._requests = {}
+        self._failures = {}
+        self._connections = 0
+        self._in_flight = 0
+        self._max_in_flight = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def _begin(self, command: str) -> None:
+        with self._stats_lock:
+            self._requests[command] = self._requests.get(command, 0) + 1
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+
+    def _end(self, command: str, failed: bool) -> None:
+        with self._stats_lock:
+            self._in_flight -= 1
+            if failed:
+                self._failures[command] = self._failures.get(command, 0) + 1
+
+    def _connection_opened(self) -> None:
+        with self._stats_lock:
+            self._connections += 1
+
+    def stats(self) -> dict:
+        """Snapshot of request counters, injected failures, connections and peak concurrency."""
+        with self._stats_lock:
+            return {
+                "requests": dict(self._requests),
+                "failures": dict(self._failures),
+                "totalRequests": sum(self._requests.values()),
+                "connections": self._connections,
+                "maxInFlight": self._max_in_flight,
+            }
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._requests.clear()
+            self._failures.clear()
+            self._connections = 0
+            self._max_in_flight = 0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like ejabberd
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def setup(self):
+                super().setup()
+                server._connection_opened()
+
+            def do_POST(self):
+                command = self.path.rstrip("/").rsplit("/", 1)[-1]
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                server._begin(command)
+                failure = server.faults.failure(command)
+                try:
+                    delay = server.faults.delay(command)
+                    if delay:
+                        time.sleep(delay)
+
+                    if failure == 0:
+                        self.close_connection = True
+                        return
+                    if failure is not None:
+                        status, result = failure, "Injected failure"
+                    elif command in server.state.COMMANDS:
+                        status, result = getattr(server.state, command)(payload)
+                    else:
+                        status, result = 404, f"Unknown command {command}"
+                finally:
+                    server._end(command, failure is not None)
+
+                body = json.dumps(result).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeEjabberdServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-ejabberd", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeEjabberdServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Fake ejabberd admin HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5280)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra random seconds per call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of calls that fail (0-1)")
+    parser.add_argument("--failure-status", type=int, default=500, help="HTTP status of failed calls, 0 drops the connection")
+    parser.add_argument("--command", action="append", default=[], metavar="NAME:LATENCY:FAILURE_RATE",
+                        help="Per-command override, e.g. send_message:0.2:0.05 (repeatable)")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible jitter and failures")
+    args = parser.parse_args(argv)
+
+    commands = {}
+    for override in args.command:
+        name, latency, failure_rate = override.split(":")
+        commands[name] = {"latency": float(latency), "failure_rate": float(failure_rate)}
+
+    faults = FaultInjection(args.latency, args.jitter, args.failure_rate, args.failure_status, commands, args.seed)
+    server = FakeEjabberdServer(args.host, args.port, faults).start()
+    print(f"Fake ejabberd admin API listening on {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(10)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats(), indent=2))
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Load test for the Socket.IO API (asyncapi.yaml channels).
+
+Simulates N concurrent clients against the app in-process: every client
+connects, the first member of each group creates it, then every client sends
+messages, pages the history and lists its chats. Mongo is mongomock unless
+--mongo-uri is given, ejabberd is the in-process fake admin API server.
+
+    python -m benchmarks.socketio_bench --clients 50 --messages 20
+    python -m benchmarks.socketio_bench --output benchmarks/results/baseline.json
+    python -m benchmarks.socketio_bench --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+
+from .fake_ejabberd import FakeEjabberdServer, FaultInjection
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Per-operation latencies and error counts, shared by the client threads."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.wall = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            self.latencies.setdefault(operation, []).append(seconds)
+            if error:
+                self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    def summary(self) -> dict:
+        operations = {}
+        for operation, values in self.latencies.items():
+            values = sorted(values)
+            wall = self.wall.get(operation, 0.0)
+            operations[operation] = {
+                "count": len(values),
+                "errors": self.errors.get(operation, 0),
+                "p50Ms": percentile(values, 50) * 1000,
+                "p95Ms": percentile(values, 95) * 1000,
+                "p99Ms": percentile(values, 99) * 1000,
+                "maxMs": values[-1] * 1000,
+                "opsPerSecond": len(values) / wall if wall else 0.0,
+            }
+        return operations
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _configure_environment(args, ejabberd_url: str) -> None:
+    """Environment for the app under test; must run before any app module is imported."""
+    os.environ["EJABBERD_API_URL"] = ejabberd_url
+    os.environ["SOCKETIO_MESSAGE_QUEUE"] = ""
+    os.environ["ASYNC_MODE"] = "threading"
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+    os.environ.setdefault("XMPP_RELAY_MODE", args.relay_mode)
+    os.environ.setdefault("EXPLAIN_HOT_QUERIES", "false")
+    os.environ.setdefault("MESSAGE_COALESCING", str(args.coalescing).lower())
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+        os.environ.setdefault("MONGO_DB", "chat_service_benchmark")
+
+
+def _create_app(args):
+    from app import create_app, socketio
+    from app.database import database_init
+
+    if not args.mongo_uri:
+        import mongomock
+        database_init.MongoClient = mongomock.MongoClient
+
+    app = create_app()
+    if args.mongo_uri:
+        # Start from empty collections so runs are comparable
+        db = app.config['db'].get_db()
+        for collection in ("chat_groups", "chat_messages", "chat_memberships"):
+            db[collection].delete_many({})
+    return app, socketio
+
+
+def _emit(recorder: Recorder, client, operation: str, channel: str, data: dict, expected_event: str):
+    """Emit one event and time it; the handler runs synchronously in this thread."""
+    start = time.perf_counter()
+    client.emit(channel, data)
+    elapsed = time.perf_counter() - start
+
+    received = client.get_received()
+    responses = [message["args"][0] for message in received if message["name"] == expected_event]
+    error = any(message["name"] == "error" for message in received) or not responses
+    recorder.record(operation, elapsed, error)
+    return responses
+
+
+def _run_phase(recorder: Recorder, operation: str, workers: int, tasks: list) -> None:
+    """Run the tasks of one phase concurrently and keep the phase wall time for throughput."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(task) for task in tasks]:
+            future.result()
+    recorder.wall[operation] = time.perf_counter() - start
+
+
+def run_benchmark(args) -> dict:
+    fake_ejabberd = FakeEjabberdServer(faults=FaultInjection(latency=args.ejabberd_latency)).start()
+    _configure_environment(args, fake_ejabberd.url)
+    app, socketio = _create_app(args)
+
+    recorder = Recorder()
+    user_ids = [f"bench_user_{i}" for i in range(args.clients)]
+    groups = [user_ids[i:i + args.group_size] for i in range(0, len(user_ids), args.group_size)]
+    groups = [group for group in groups if len(group) >= 2]
+    clients = {}
+    chat_ids = {}
+
+    def connect(user_id):
+        start = time.perf_counter()
+        client = socketio.test_client(app, query_string=f"userId={user_id}")
+        elapsed = time.perf_counter() - start
+        clients[user_id] = client
+        recorder.record("connect", elapsed, not client.is_connected())
+        client.get_received()
+
+    def create_group(index, members):
+        responses = _emit(recorder, clients[members[0]], "chat/create", "chat/create",
+                          {"groupName": f"bench group {index}", "users": members}, "chatGroupCreated")
+        if responses:
+            for member in members:
+                chat_ids[member] = responses[0]["chatId"]
+
+    def send_messages(user_id):
+        chat_id = chat_ids.get(user_id)
+        if chat_id:
+            for n in range(args.messages):
+                _emit(recorder, clients[user_id], "send_message", "chat/message",
+                      {"chatId": chat_id, "senderId": user_id, "content": f"message {n} from {user_id}"}, "receiveMessage")
+
+    def send_batch(user_id):
+        chat_id = chat_ids.get(user_id)
+        if chat_id:
+            batch = [{"chatId": chat_id, "senderId": user_id, "content": f"batch message {n} from {user_id}"} for n in range(args.batch_size)]
+            _emit(recorder, clients[user_id], "send_batch", "chat/message/batch", {"messages": batch}, "messageBatchResult")
+
+    def page_history(user_id):
+        chat_id = chat_ids.get(user_id)
+        cursor = None
+        for _ in range(args.history_pages):
+            if not chat_id:
+                break
+            responses = _emit(recorder, clients[user_id], "message_history", "chat/message/history",
+                              {"chatId": chat_id, "before": cursor, "limit": args.page_size}, "receiveMessage")
+            cursor = responses[-1].get("nextCursor") if responses else None
+            if not cursor:
+                break
+
+    def list_chats(user_id):
+        _emit(recorder, clients[user_id], "chat_list", "user/chats", {"userId": user_id, "page": 1, "limit": 20}, "getUserChats")
+
+    _run_phase(recorder, "connect", args.clients, [lambda u=u: connect(u) for u in user_ids])
+    _run_phase(recorder, "chat/create", args.clients, [lambda i=i, g=g: create_group(i, g) for i, g in enumerate(groups)])
+    _run_phase(recorder, "send_message", args.clients, [lambda u=u: send_messages(u) for u in user_ids])
+    if args.batch_size:
+        _run_phase(recorder, "send_batch", args.clients, [lambda u=u: send_batch(u) for u in user_ids])
+    _run_phase(recorder, "message_history", args.clients, [lambda u=u: page_history(u) for u in user_ids])
+    _run_phase(recorder, "chat_list", args.clients, [lambda u=u: list_chats(u) for u in user_ids])
+
+    for client in clients.values():
+        client.disconnect()
+    fake_ejabberd.stop()
+
+    operations = recorder.summary()
+    return {
+        "createdAt": datetime.now(UTC).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "clients": args.clients,
+            "messages": args.messages,
+            "groupSize": args.group_size,
+            "batchSize": args.batch_size,
+            "historyPages": args.history_pages,
+            "pageSize": args.page_size,
+            "relayMode": os.environ["XMPP_RELAY_MODE"],
+            "coalescing": os.environ["MESSAGE_COALESCING"] == "true",
+            "mongo": "mongodb" if args.mongo_uri else "mongomock",
+            "ejabberdLatency": args.ejabberd_latency,
+        },
+        "messagesPerSecond": operations.get("send_message", {}).get("opsPerSecond", 0.0),
+        "batchMessagesPerSecond": operations.get("send_batch", {}).get("opsPerSecond", 0.0) * args.batch_size,
+        "operations": operations,
+    }
+
+
+def print_report(result: dict, baseline: dict | None = None) -> None:
+    print(f"\nSocket.IO benchmark ({result['config']}) at commit {result['commit']}")
+    print(f"{'operation':<18}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}")
+    for operation, stats in result["operations"].items():
+        line = (f"{operation:<18}{stats['count']:>8}{stats['errors']:>8}{stats['p50Ms']:>10.2f}"
+                f"{stats['p95Ms']:>10.2f}{stats['p99Ms']:>10.2f}{stats['opsPerSecond']:>10.1f}")
+        if baseline and operation in baseline["operations"]:
+            before = baseline["operations"][operation]["p95Ms"]
+            if before:
+                line += f"   p95 {100 * (stats['p95Ms'] - before) / before:+.1f}% vs {baseline.get('commit')}"
+        print(line)
+    print(f"messages/s: {result['messagesPerSecond']:.1f}")
+    if result.get("batchMessagesPerSecond"):
+        print(f"batched messages/s: {result['batchMessagesPerSecond']:.1f}")
+
+
+def find_regressions(result: dict, baseline: dict, threshold: float) -> list[str]:
+    """Operations whose p95 latency grew by more than `threshold` percent over the baseline."""
+    regressions = []
+    for operation, stats in result["operations"].items():
+        before = baseline["operations"].get(operation, {}).get("p95Ms")
+        if before and stats["p95Ms"] > before * (1 + threshold / 100):
+            regressions.append(f"{operation}: p95 {before:.2f} ms -> {stats['p95Ms']:.2f} ms")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Socket.IO API load test")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent simulated clients")
+    parser.add_argument("--messages", type=int, default=20, help="Messages sent by each client")
+    parser.add_argument("--group-size", type=int, default=5, help="Members per chat group")
+    parser.add_argument("--batch-size", type=int, default=0, help="Messages per chat/message/batch event sent by each client (0 skips the phase)")
+    parser.add_argument("--history-pages", type=int, default=3, help="History pages fetched by each client")
+    parser.add_argument("--page-size", type=int, default=20, help="Messages per history page")
+    parser.add_argument("--relay-mode", choices=["sync", "async"], default="sync", help="XMPP relay mode of send_message")
+    parser.add_argument("--coalescing", action="store_true", help="Enable write coalescing of chat/message sends")
+    parser.add_argument("--ejabberd-latency", type=float, default=0.0, help="Seconds the fake ejabberd adds to every admin API call")
+    parser.add_argument("--mongo-uri", help="Run against a local MongoDB instead of mongomock")
+    parser.add_argument("--output", help="Write the JSON results to this file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="p95 regression (percent) that fails the run with --compare")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{result['commit'] or 'latest'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+
+    if baseline:
+        regressions = find_regressions(result, baseline, args.threshold)
+        if regressions:
+            print("p95 regressions over the baseline:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
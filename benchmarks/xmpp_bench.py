@@ -0,0 +1,104 @@
+"""
+End-to-end benchmark of the XMPP layer against the fake ejabberd admin API.
+
+Runs user registration, room creation, bulk affiliation changes and message
+relays concurrently through the shared EjabberdClient session, with latency
+and failures injected by the fake server, and reports client-side latencies
+next to the server's view (requests, TCP connections, peak concurrency).
+
+    python -m benchmarks.xmpp_bench --users 200 --rooms 20 --messages 500 --latency 0.02
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .fake_ejabberd import FakeEjabberdServer, FaultInjection
+from .socketio_bench import Recorder
+
+
+def _timed(recorder: Recorder, operation: str, func, *args):
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+        failed = result is False or (isinstance(result, dict) and not all(result.values()))
+    except Exception:
+        result, failed = None, True
+    recorder.record(operation, time.perf_counter() - start, failed)
+    return result
+
+
+def _run_phase(recorder: Recorder, operation: str, workers: int, func, items: list) -> None:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda item: _timed(recorder, operation, func, *item), items))
+    recorder.wall[operation] = time.perf_counter() - start
+
+
+def run_benchmark(args) -> dict:
+    faults = FaultInjection(args.latency, args.jitter, args.failure_rate, args.failure_status, seed=args.seed)
+    server = FakeEjabberdServer(faults=faults).start()
+    # XMPPConfig reads the URL at import time
+    os.environ["EJABBERD_API_URL"] = server.url
+    from app.xmpp.chat_groups_xmpp import ChatGroupsXMPP
+    from app.xmpp.chat_messages_xmpp import ChatMessagesXMPP
+    from app.xmpp.ejabberd_client import ejabberd_client
+    from app.xmpp.user_management_xmpp import UserManagementXMPP
+
+    users = [f"bench_user_{i}" for i in range(args.users)]
+    rooms = [f"bench_room_{i}" for i in range(args.rooms)]
+    members = {room: users[i::args.rooms] for i, room in enumerate(rooms)}
+
+    recorder = Recorder()
+    _run_phase(recorder, "register", args.workers, UserManagementXMPP.register_user, [(user, "password") for user in users])
+    _run_phase(recorder, "create_room", args.workers, ChatGroupsXMPP.create_chat_group, [(room, members[room][:1]) for room in rooms])
+    _run_phase(recorder, "add_members", args.workers, ChatGroupsXMPP.set_room_affiliations,
+               [(room, members[room][1:], "member") for room in rooms])
+    _run_phase(recorder, "send_message", args.workers, ChatMessagesXMPP.send_message,
+               [(members[rooms[n % len(rooms)]][0], rooms[n % len(rooms)], "groupchat", "", f"message {n}") for n in range(args.messages)])
+    _run_phase(recorder, "destroy_room", args.workers, ChatGroupsXMPP.delete_chat_group, [(room,) for room in rooms])
+
+    result = {
+        "config": vars(args),
+        "operations": recorder.summary(),
+        "client": ejabberd_client.get_stats(),
+        "server": server.stats(),
+    }
+    server.stop()
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="XMPP layer benchmark against the fake ejabberd admin API")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=20, help="Concurrent callers")
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds the fake server adds to every call")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-status", type=int, default=500)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args)
+
+    print(f"{'operation':<14}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}")
+    for operation, stats in result["operations"].items():
+        print(f"{operation:<14}{stats['count']:>8}{stats['errors']:>8}{stats['p50Ms']:>10.2f}"
+              f"{stats['p95Ms']:>10.2f}{stats['p99Ms']:>10.2f}{stats['opsPerSecond']:>10.1f}")
+    server = result["server"]
+    print(f"server: {server['totalRequests']} requests over {server['connections']} connections, "
+          f"peak {server['maxInFlight']} in flight, failures injected: {sum(server['failures'].values())}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -82,3 +82,27 @@ export function fetchMessageHistory(socket, chatId, page = 1, limit = 20) {
         limit };
     socket.emit('chat/message/history', payload);
 }
+
+/**
+ * Requests message history for a chat group using cursor (keyset) pagination.
+ * Pass `before = null` for the newest page, then the returned `nextCursor`
+ * to scroll further back.
+ * 
+ * Server response (on `receiveMessage`):
+ * {
+ *   chatId: string,            // Identifier of the chat group
+ *   limit: number,             // Messages per page
+ *   before: string | null,     // Cursor the page was requested with
+ *   nextCursor: string | null, // Cursor for the next (older) page, null when done
+ *   messages: [                // Array of message objects as above
+ *     { messageId, senderId, content, sentAt }, …
+ *   ]
+ * }
+ */
+export function fetchMessageHistoryBefore(socket, chatId, before = null, limit = 20) {
+    const payload = { 
+        chatId, 
+        before, 
+        limit };
+    socket.emit('chat/message/history', payload);
+}
@@ -0,0 +1,20 @@
+from .base_config import get_env_variable
+
+class CacheConfig:
+    """Cache-related configurations."""
+
+    # Optional shared store so several Flask workers see the same cache (e.g. redis://localhost:6379/0).
+    # Without it, caches are off unless CACHE_IN_PROCESS is set.
+    CACHE_REDIS_URL = get_env_variable("CACHE_REDIS_URL", "")
+    # Keep caches in this process's memory when CACHE_REDIS_URL is empty. Writes on other
+    # workers or replicas never reach these caches, so only enable it for a single process.
+    CACHE_IN_PROCESS = get_env_variable("CACHE_IN_PROCESS", "false").lower() == "true"
+
+    # Chat occupants (members) cache used for message fan-out
+    OCCUPANTS_CACHE_TTL = int(get_env_variable("OCCUPANTS_CACHE_TTL", "60"))  # Seconds
+    OCCUPANTS_CACHE_MAXSIZE = int(get_env_variable("OCCUPANTS_CACHE_MAXSIZE", "10000"))  # Chats kept in memory
+
+    # Per-chat ring buffer of the newest messages, serving first history pages without Mongo
+    RECENT_MESSAGES_CACHE_SIZE = int(get_env_variable("RECENT_MESSAGES_CACHE_SIZE", "50"))  # Messages kept per chat, 0 disables the cache
+    RECENT_MESSAGES_CACHE_MAX_MESSAGES = int(get_env_variable("RECENT_MESSAGES_CACHE_MAX_MESSAGES", "100000"))  # Messages kept in memory over all chats (LRU)
+    RECENT_MESSAGES_CACHE_TTL = int(get_env_variable("RECENT_MESSAGES_CACHE_TTL", "300"))  # Seconds
@@ -0,0 +1,12 @@
+from .base_config import get_env_variable
+
+class CoalescingConfig:
+    """Write coalescing (micro-batching) of chat/message sends."""
+
+    # When enabled, sends arriving within the window are stored with one insert_many
+    # and relayed to XMPP together, while every caller still gets its own message
+    MESSAGE_COALESCING = get_env_variable("MESSAGE_COALESCING", "false").lower() == "true"
+    MESSAGE_COALESCE_WINDOW_MS = float(get_env_variable("MESSAGE_COALESCE_WINDOW_MS", "5"))  # Max time the first message of a batch waits for others
+    MESSAGE_COALESCE_MAX_BATCH = int(get_env_variable("MESSAGE_COALESCE_MAX_BATCH", "100"))  # Messages that flush a batch before the window ends
+    MESSAGE_COALESCE_TIMEOUT = float(get_env_variable("MESSAGE_COALESCE_TIMEOUT", "10"))  # Seconds a sender waits for its batch to be stored
+    MESSAGE_COALESCE_FLUSHERS = int(get_env_variable("MESSAGE_COALESCE_FLUSHERS", "4"))  # Batches stored concurrently
@@ -0,0 +1,10 @@
+from .base_config import get_env_variable
+
+class ConsistencyConfig:
+    """Read-after-write verification settings for the service layer."""
+
+    # "strict": re-read every write to verify it (default)
+    # "sampled": verify WRITE_VERIFY_SAMPLE_RATE percent of writes
+    # "trusted": build responses from the write results without re-reading
+    WRITE_VERIFY_MODE = get_env_variable("WRITE_VERIFY_MODE", "strict").lower()
+    WRITE_VERIFY_SAMPLE_RATE = float(get_env_variable("WRITE_VERIFY_SAMPLE_RATE", "10"))  # Percent of writes verified in sampled mode
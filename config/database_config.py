@@ -2,21 +2,71 @@ from .base_config import get_env_variable
 
 class DatabaseConfig:
     """Class to store configuration settings."""
-    
+
     MONGO_URI = get_env_variable("MONGO_URI", "mongodb://localhost:27017/")
     MONGO_DB = get_env_variable("MONGO_DB", "chat_service")
 
+    # Run explain() on HOT_QUERIES at startup and report collection scans
+    EXPLAIN_HOT_QUERIES = get_env_variable("EXPLAIN_HOT_QUERIES", "true").lower() == "true"
+
     # Dictionary with collections and indexes
+    # Each index is one of:
+    #   - a (field, order) pair
+    #   - a list of (field, order) pairs for a compound index
+    #   - a dict {"keys": [(field, order), ...], "name": ..., plus any create_index option,
+    #     e.g. "unique", "partialFilterExpression" (partial index) or "expireAfterSeconds" (TTL index)}
     COLLECTIONS = {
         "chat_groups": [
             ("groupName", "text"),  # Full-text search on group names (case-insensitive)
             ("createdAt", -1)  # Sort by creation time (descending order)
             ],
         "chat_messages": [
-            ("chat_id", 1),  # Query messages by chat_id (ascending order)
+            [("chat_id", 1), ("sentAt", -1), ("_id", -1)],  # Query a chat's messages newest first (filter + sort + keyset pagination)
             ("sender_id", 1),  # Search messages by sender (ascending order)
-            ("sentAt", -1),  # Sort messages by time (newest first)
             ("content", "text"),  # Full-text search on message content (case-insensitive)
-            ("editedAt", -1),  # Sort messages by time (descending order)
+            {
+                "keys": [("editedAt", -1)],  # Sort edited messages by time (descending order)
+                "name": "editedAt_partial_index",  # Not editedAt_index: that name is the former full index
+                "partialFilterExpression": {"editedAt": {"$exists": True}},  # Only index edited messages
+            },
+            {
+                "keys": [("xmppStatus", 1), ("sentAt", 1)],  # Messages still pending or failed XMPP relay
+                "partialFilterExpression": {"xmppStatus": {"$exists": True}},  # Relayed messages drop the field
+            },
+        ],
+        "chat_message_counts": [],  # One counter per chat (_id = chat_id), kept by the messages DAL
+        "chat_memberships": [
+            {
+                "keys": [("user_id", 1), ("chat_id", 1)],  # One membership per user and chat
+                "unique": True,
+            },
+            [("user_id", 1), ("lastActivityAt", -1)],  # A user's chat list, most recent activity first
+            ("chat_id", 1),  # Query or drop a chat group's members (ascending order)
+        ],
+    }
+
+    # Indexes replaced by the ones above, dropped at startup where they still exist
+    DROPPED_INDEXES = {
+        "chat_messages": [
+            "chat_id_index",  # Prefix of chat_id_sentAt__id_index
+            "sentAt_index",  # History sorts by sentAt within a chat, served by chat_id_sentAt__id_index
+            "editedAt_index",  # Full index, replaced by editedAt_partial_index
+        ],
+        "chat_memberships": [
+            "user_id_index",  # Prefix of user_id_chat_id_index
+            "joinedAt_index",  # Chat lists sort per user, served by user_id_lastActivityAt_index
+            "user_id_joinedAt_index",  # Chat lists sort by lastActivityAt, served by user_id_lastActivityAt_index
+        ],
+    }
+
+    # Queries on the hot path, checked with explain() at startup.
+    # A winning plan with a COLLSCAN stage means a supporting index is missing.
+    HOT_QUERIES = {
+        "chat_messages": [
+            {"name": "message_history", "filter": {"chat_id": ""}, "sort": [("sentAt", -1), ("_id", -1)]},
+        ],
+        "chat_memberships": [
+            {"name": "user_chat_list", "filter": {"user_id": ""}, "sort": [("lastActivityAt", -1)]},
+            {"name": "chat_members", "filter": {"chat_id": ""}},
         ],
-    }
\ No newline at end of file
+    }
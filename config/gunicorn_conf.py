@@ -0,0 +1,27 @@
+# gunicorn settings for the production server:
+#   gunicorn -c config/gunicorn_conf.py app.wsgi:app
+import os
+
+from config.server_config import ServerConfig
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5000')}"
+
+# One gevent worker serves thousands of websockets concurrently. The app only
+# monkey-patches sockets with ASYNC_MODE=gevent, so any other mode is refused here
+# rather than running Socket.IO in threading mode inside gevent workers.
+if ServerConfig.ASYNC_MODE != "gevent":
+    raise RuntimeError(
+        f"gunicorn needs ASYNC_MODE=gevent (got '{ServerConfig.ASYNC_MODE}'); "
+        "use python -m app.main for the threading development server"
+    )
+worker_class = "gevent"
+# gunicorn balances requests across its workers itself, so a long-polling client's
+# requests could land on a worker that does not hold its Socket.IO session. Keep one
+# worker per pod and scale with replicas, which the load balancer keeps sticky.
+workers = 1
+worker_connections = ServerConfig.SERVER_WORKER_CONNECTIONS
+timeout = ServerConfig.SERVER_TIMEOUT
+graceful_timeout = ServerConfig.SERVER_GRACEFUL_TIMEOUT
+
+accesslog = "-"
+errorlog = "-"
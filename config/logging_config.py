@@ -0,0 +1,15 @@
+from .base_config import get_env_variable
+
+class LoggingConfig:
+    """Logging levels and hot-path logging settings."""
+
+    # Per-subsystem levels (DEBUG, INFO, WARNING, ERROR)
+    LOG_LEVEL_EVENTS = get_env_variable("LOG_LEVEL_EVENTS", "INFO").upper()
+    LOG_LEVEL_SERVICES = get_env_variable("LOG_LEVEL_SERVICES", "INFO").upper()
+    LOG_LEVEL_DATABASE = get_env_variable("LOG_LEVEL_DATABASE", "INFO").upper()
+    LOG_LEVEL_XMPP = get_env_variable("LOG_LEVEL_XMPP", "INFO").upper()
+
+    LOG_CONSOLE = get_env_variable("LOG_CONSOLE", "false").lower() == "true"  # Also write log lines to stderr
+    LOG_QUEUE_SIZE = int(get_env_variable("LOG_QUEUE_SIZE", "10000"))  # Records buffered per logger before new ones are dropped
+    LOG_SAMPLE_RATE = float(get_env_variable("LOG_SAMPLE_RATE", "1"))  # Percent of per-message lines logged
+    LOG_PAYLOADS = get_env_variable("LOG_PAYLOADS", "false").lower() == "true"  # Log message contents and response bodies
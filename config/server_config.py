@@ -0,0 +1,22 @@
+from .base_config import get_env_variable
+
+class ServerConfig:
+    """Server and async worker settings."""
+
+    # "threading": Werkzeug development server (python -m app.main)
+    # "gevent": cooperative gunicorn workers; pymongo and requests sockets are
+    # monkey-patched at import so blocking I/O yields instead of stalling the worker
+    ASYNC_MODE = get_env_variable("ASYNC_MODE", "threading").lower()
+    FLASK_DEBUG = get_env_variable("FLASK_DEBUG", "false").lower() == "true"  # Reloader and debugger, development server only
+
+    # Socket.IO message queue shared by all nodes, so room emits reach clients
+    # connected to any replica (e.g. redis://redis:6379/0, memory:// for a single process).
+    # Empty keeps rooms local to this process: only run one replica then.
+    SOCKETIO_MESSAGE_QUEUE = get_env_variable("SOCKETIO_MESSAGE_QUEUE", "")
+    SOCKETIO_CHANNEL = get_env_variable("SOCKETIO_CHANNEL", "chat_service")
+
+    # gunicorn settings (gunicorn -c config/gunicorn_conf.py app.wsgi:app)
+    # gunicorn runs a single worker per pod (see gunicorn_conf.py): scale out with replicas
+    SERVER_WORKER_CONNECTIONS = int(get_env_variable("SERVER_WORKER_CONNECTIONS", "5000"))  # Max concurrent connections per worker
+    SERVER_TIMEOUT = int(get_env_variable("SERVER_TIMEOUT", "60"))  # Seconds before a silent worker is restarted
+    SERVER_GRACEFUL_TIMEOUT = int(get_env_variable("SERVER_GRACEFUL_TIMEOUT", "30"))  # Seconds to drain connections on shutdown
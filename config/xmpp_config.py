@@ -2,9 +2,28 @@ from .base_config import get_env_variable
 
 class XMPPConfig:
     """Class to store XMPP configuration settings."""
-    
+
     EJABBERD_API_URL = get_env_variable("EJABBERD_API_URL", "https://localhost:5443/api")
     ADMIN_USER = get_env_variable("ADMIN_USER", "admin@localhost")
     ADMIN_PASSWORD = get_env_variable("ADMIN_PASSWORD", "admin_password")
     VHOST = get_env_variable("VHOST", "localhost")  # ejabberd virtual host for HTTP API calls
-    MUC_SERVICE = get_env_variable("MUC_SERVICE", "conference.localhost")  # MUC service domain
\ No newline at end of file
+    MUC_SERVICE = get_env_variable("MUC_SERVICE", "conference.localhost")  # MUC service domain
+
+    # HTTP client settings for the ejabberd admin API (shared keep-alive session)
+    EJABBERD_POOL_SIZE = int(get_env_variable("EJABBERD_POOL_SIZE", "20"))  # Max pooled connections kept alive
+    EJABBERD_CONNECT_TIMEOUT = float(get_env_variable("EJABBERD_CONNECT_TIMEOUT", "3"))  # Seconds
+    EJABBERD_READ_TIMEOUT = float(get_env_variable("EJABBERD_READ_TIMEOUT", "10"))  # Seconds
+    EJABBERD_VERIFY_TLS = get_env_variable("EJABBERD_VERIFY_TLS", "false").lower() == "true"
+    EJABBERD_BULK_WORKERS = int(get_env_variable("EJABBERD_BULK_WORKERS", "8"))  # Concurrent calls for bulk operations (e.g. affiliations)
+    REGISTERED_USERS_REFRESH = int(get_env_variable("REGISTERED_USERS_REFRESH", "300"))  # Seconds before the cached registered-users set is refreshed in the background
+
+    # Message relay to the MUC: "sync" sends via XMPP before storing the message,
+    # "async" stores and acknowledges first and relays through a background queue
+    XMPP_RELAY_MODE = get_env_variable("XMPP_RELAY_MODE", "sync").lower()
+    XMPP_RELAY_QUEUE_SIZE = int(get_env_variable("XMPP_RELAY_QUEUE_SIZE", "1000"))  # Max queued messages before senders relay inline
+    XMPP_RELAY_WORKERS = int(get_env_variable("XMPP_RELAY_WORKERS", "4"))  # Background relay threads
+    XMPP_RELAY_MAX_ATTEMPTS = int(get_env_variable("XMPP_RELAY_MAX_ATTEMPTS", "5"))  # Attempts before dead-lettering
+    XMPP_RELAY_RETRY_BACKOFF = float(get_env_variable("XMPP_RELAY_RETRY_BACKOFF", "0.5"))  # Seconds, doubled per retry
+    XMPP_RELAY_RECOVERY_AGE = int(get_env_variable("XMPP_RELAY_RECOVERY_AGE", "30"))  # Seconds before a pending message is re-queued by recovery
+    XMPP_RELAY_RECOVERY_INTERVAL = int(get_env_variable("XMPP_RELAY_RECOVERY_INTERVAL", "60"))  # Seconds between recovery runs while the process is up, 0 disables them
+    XMPP_RELAY_LEASE = int(get_env_variable("XMPP_RELAY_LEASE", "300"))  # Seconds a recovered message stays claimed by the process that re-queued it
@@ -2,6 +2,7 @@ import pytest
 import mongomock
 from app.database.chat_groups import ChatGroups
 from app.database.chat_messages import ChatMessages
+from app.database.chat_memberships import ChatMemberships
 from app.database.database_init import ChatServiceDatabase
 
 
@@ -30,3 +31,9 @@ def chat_groups(mock_db):
 def chat_messages(mock_db):
     """Fixture for the ChatMessages DAL."""
     return ChatMessages(mock_db)
+
+
+@pytest.fixture
+def chat_memberships(mock_db):
+    """Fixture for the ChatMemberships DAL."""
+    return ChatMemberships(mock_db)
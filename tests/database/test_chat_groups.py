@@ -219,4 +219,37 @@ def test_get_chat_groups_for_user_negative_page_limit(chat_groups):
         chat_groups.get_chat_groups_for_user(user_id, page=0, limit=5)
 
     with pytest.raises(ValueError, match="Page and limit must be greater than zero"):
-        chat_groups.get_chat_groups_for_user(user_id, page=2, limit=-3)
\ No newline at end of file
+        chat_groups.get_chat_groups_for_user(user_id, page=2, limit=-3)
+
+def test_find_and_update_chat_group_name(chat_groups):
+    """Test renaming a chat group and getting the new document in one call."""
+    created = chat_groups.create_chat_group("Original Name")
+    assert created["groupName"] == "Original Name"
+    assert isinstance(created["createdAt"], datetime)
+
+    updated = chat_groups.find_and_update_chat_group_name(created["_id"], "Renamed")
+    assert updated["_id"] == ObjectId(created["_id"])
+    assert updated["groupName"] == "Renamed"
+
+    assert chat_groups.find_and_update_chat_group_name(str(ObjectId()), "Missing") is None
+    assert chat_groups.find_and_update_chat_group_name("invalid_id", "Invalid") is None
+
+
+def test_get_chat_groups_keeps_input_order(chat_groups):
+    """Test resolving several chat groups in one query, aligned with the requested IDs."""
+    first = chat_groups.create_chat_group("First")
+    second = chat_groups.create_chat_group("Second")
+    missing = str(ObjectId())
+
+    groups = chat_groups.get_chat_groups([second["_id"], missing, "not-an-id", first["_id"], second["_id"]])
+    assert [group["groupName"] if group else None for group in groups] == ["Second", None, None, "First", "Second"]
+    assert groups[0]["createdAt"] == second["createdAt"]
+
+
+def test_get_chat_groups_projection(chat_groups):
+    """Test that only the requested fields are fetched."""
+    group = chat_groups.create_chat_group("Projected")
+
+    [fetched] = chat_groups.get_chat_groups([group["_id"]], fields=("groupName",))
+    assert set(fetched) == {"_id", "groupName"}
+    assert chat_groups.get_chat_groups([]) == []
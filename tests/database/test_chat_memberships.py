@@ -0,0 +1,191 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+
+def test_add_members(chat_memberships):
+    """Test indexing members of a chat group."""
+    added = chat_memberships.add_members("chat1", ["user1", "user2"])
+    assert added == 2
+
+    # Re-adding existing members should not duplicate them
+    added_again = chat_memberships.add_members("chat1", ["user1", "user3"])
+    assert added_again == 1
+    assert chat_memberships.chat_memberships.count_documents({"chat_id": "chat1"}) == 3
+
+
+def test_remove_members(chat_memberships):
+    """Test removing members from a chat group's index."""
+    chat_memberships.add_members("chat1", ["user1", "user2", "user3"])
+
+    removed = chat_memberships.remove_members("chat1", ["user1", "user3"])
+    assert removed == 2
+
+    remaining = [m["user_id"] for m in chat_memberships.chat_memberships.find({"chat_id": "chat1"})]
+    assert remaining == ["user2"]
+
+
+def test_remove_chat(chat_memberships):
+    """Test that removing a chat drops all its memberships only."""
+    chat_memberships.add_members("chat1", ["user1", "user2"])
+    chat_memberships.add_members("chat2", ["user1"])
+
+    assert chat_memberships.remove_chat("chat1") == 2
+    assert chat_memberships.chat_memberships.count_documents({}) == 1
+
+
+def test_get_all_user_chat_ids(chat_memberships):
+    """Test fetching every chat of a user (no pagination)."""
+    for i in range(30):
+        chat_memberships.add_members(f"chat{i}", ["user1"])
+    chat_memberships.add_members("other", ["user2"])
+
+    chat_ids = chat_memberships.get_all_user_chat_ids("user1")
+    assert sorted(chat_ids) == sorted(f"chat{i}" for i in range(30))
+    assert chat_memberships.get_all_user_chat_ids("nobody") == []
+
+
+def test_replace_user_chats(chat_memberships):
+    """Test reconciling a user's memberships to an exact set of chats."""
+    chat_memberships.add_members("chat1", ["user1"])
+    chat_memberships.add_members("chat2", ["user1", "user2"])
+
+    result = chat_memberships.replace_user_chats("user1", ["chat2", "chat3"])
+
+    assert result == {"added": 1, "removed": 1}
+    user1_chats = {m["chat_id"] for m in chat_memberships.chat_memberships.find({"user_id": "user1"})}
+    assert user1_chats == {"chat2", "chat3"}
+    # Other users are untouched
+    assert chat_memberships.chat_memberships.count_documents({"user_id": "user2"}) == 1
+
+
+def _message(chat_id, sender_id, content, minute):
+    return {"_id": ObjectId(), "chat_id": chat_id, "sender_id": sender_id, "content": content, "sentAt": datetime(2025, 1, 1, 12, minute)}
+
+
+def test_chat_list_entries_track_last_message_and_unread(chat_memberships):
+    """Test that stored messages update the last message preview and unread counts."""
+    chat_memberships.add_members("chat1", ["user1", "user2", "user3"], group_name="Team")
+    first = _message("chat1", "user1", "hello", 0)
+    second = _message("chat1", "user2", "x" * 150, 1)
+    chat_memberships.record_messages("chat1", [first, second])
+
+    entries, total = chat_memberships.get_user_chat_list("user3", 0, 10)
+    assert total == 1
+    entry = entries[0]
+    assert entry["groupName"] == "Team"
+    assert entry["unreadCount"] == 2
+    assert entry["lastMessage"]["messageId"] == str(second["_id"])
+    assert len(entry["lastMessage"]["snippet"]) == 100
+    assert entry["lastActivityAt"] == second["sentAt"]
+
+    # Senders do not count their own messages
+    user1 = chat_memberships.get_user_chat_list("user1", 0, 10)[0][0]
+    assert user1["unreadCount"] == 1
+
+    # An older message arriving late does not move the preview backwards
+    chat_memberships.record_messages("chat1", [_message("chat1", "user1", "late", 0)])
+    entry = chat_memberships.get_user_chat_list("user3", 0, 10)[0][0]
+    assert entry["lastMessage"]["messageId"] == str(second["_id"])
+    assert entry["unreadCount"] == 3
+
+
+def test_get_user_chat_list_orders_by_activity(chat_memberships):
+    """Test that a user's chat list is sorted by last activity, newest first."""
+    for chat_id in ("chat1", "chat2", "chat3"):
+        chat_memberships.add_members(chat_id, ["user1", "user2"], group_name=chat_id)
+    chat_memberships.record_messages("chat1", [_message("chat1", "user2", "a", 5)])
+    chat_memberships.record_messages("chat3", [_message("chat3", "user2", "b", 1)])
+    # chat2 has no messages: its lastActivityAt is the join time, today
+    entries, _ = chat_memberships.get_user_chat_list("user1", 0, 10)
+    assert [entry["chat_id"] for entry in entries] == ["chat2", "chat1", "chat3"]
+
+    entries, total = chat_memberships.get_user_chat_list("user1", 1, 1)
+    assert [entry["chat_id"] for entry in entries] == ["chat1"]
+    assert total == 3
+
+
+def test_new_members_inherit_chat_fields_and_rename(chat_memberships):
+    """Test that joining members copy the chat's list fields and renames reach every entry."""
+    chat_memberships.add_members("chat1", ["user1"], group_name="Team")
+    message = _message("chat1", "user1", "hi", 0)
+    chat_memberships.record_messages("chat1", [message])
+
+    chat_memberships.add_members("chat1", ["user2"])
+    entry = chat_memberships.get_user_chat_list("user2", 0, 10)[0][0]
+    assert entry["groupName"] == "Team"
+    assert entry["lastMessage"]["messageId"] == str(message["_id"])
+    assert entry["unreadCount"] == 0
+
+    assert chat_memberships.set_group_name("chat1", "Renamed") == 2
+    assert {e["groupName"] for e in chat_memberships.chat_memberships.find({"chat_id": "chat1"})} == {"Renamed"}
+
+
+def test_mark_read_and_deleted_message(chat_memberships):
+    """Test resetting unread counts and removing a deleted message from chat list entries."""
+    chat_memberships.add_members("chat1", ["user1", "user2", "user3"], group_name="Team")
+    chat_memberships.chat_memberships.update_many({}, {"$set": {"joinedAt": datetime(2025, 1, 1)}})
+    first = _message("chat1", "user1", "first", 0)
+    second = _message("chat1", "user1", "second", 1)
+    chat_memberships.record_messages("chat1", [first, second])
+
+    assert chat_memberships.is_last_message("chat1", str(second["_id"])) is True
+    assert chat_memberships.is_last_message("chat1", str(first["_id"])) is False
+    assert chat_memberships.mark_read("chat1", "user2") is True
+    assert chat_memberships.mark_read("chat1", "nobody") is False
+
+    chat_memberships.record_deleted_message("chat1", second, first)
+    entries = {e["user_id"]: e for e in chat_memberships.chat_memberships.find({"chat_id": "chat1"})}
+    # user2 had already read the deleted message, user3 had not
+    assert entries["user2"]["unreadCount"] == 0
+    assert entries["user3"]["unreadCount"] == 1
+    assert entries["user1"]["unreadCount"] == 0
+    assert all(e["lastMessage"]["messageId"] == str(first["_id"]) for e in entries.values())
+
+    chat_memberships.record_deleted_message("chat1", first, None)
+    entries = {e["user_id"]: e for e in chat_memberships.chat_memberships.find({"chat_id": "chat1"})}
+    assert entries["user3"]["unreadCount"] == 0
+    assert all(e["lastMessage"] is None for e in entries.values())
+
+
+def test_deleted_message_spares_later_members(chat_memberships):
+    """Test that deleting a message only lowers the unread count of members who had joined before it was sent."""
+    chat_memberships.add_members("chat1", ["user1", "user2"], group_name="Team")
+    chat_memberships.chat_memberships.update_many({}, {"$set": {"joinedAt": datetime(2025, 1, 1)}})
+    message = _message("chat1", "user1", "before user3 joined", 0)
+    chat_memberships.add_members("chat1", ["user3"])
+    chat_memberships.chat_memberships.update_many({}, {"$set": {"unreadCount": 1}})
+
+    chat_memberships.record_deleted_message("chat1", message, None)
+    entries = {e["user_id"]: e for e in chat_memberships.chat_memberships.find({"chat_id": "chat1"})}
+    assert entries["user2"]["unreadCount"] == 0
+    assert entries["user3"]["unreadCount"] == 1
+
+
+def test_deleted_message_in_the_second_of_a_read_or_join(chat_memberships):
+    """Test that timestamps stored to the second settle same-second reads and joins consistently."""
+    message = _message("chat1", "user1", "same second", 0)
+    chat_memberships.add_members("chat1", ["user1", "user2", "user3"], group_name="Team")
+    chat_memberships.mark_read("chat1", "user2")
+    assert chat_memberships.chat_memberships.find_one({"user_id": "user2"})["lastReadAt"].microsecond == 0
+
+    earlier = datetime(2025, 1, 1)
+    chat_memberships.chat_memberships.update_many({}, {"$set": {"joinedAt": earlier, "unreadCount": 1}})
+    # user2 read in the second the message was sent, user3 joined in it
+    chat_memberships.chat_memberships.update_one({"user_id": "user2"}, {"$set": {"lastReadAt": message["sentAt"]}})
+    chat_memberships.chat_memberships.update_one({"user_id": "user3"}, {"$set": {"joinedAt": message["sentAt"]}})
+
+    chat_memberships.record_deleted_message("chat1", message, None)
+    entries = {e["user_id"]: e for e in chat_memberships.chat_memberships.find({"chat_id": "chat1"})}
+    assert entries["user2"]["unreadCount"] == 0
+    assert entries["user3"]["unreadCount"] == 1
+
+
+def test_get_chat_member_ids(chat_memberships):
+    """Test listing a chat's members from the index."""
+    chat_memberships.add_members("chat1", ["user1", "user2"])
+    chat_memberships.add_members("chat2", ["user3"])
+    chat_memberships.remove_members("chat1", ["user1"])
+
+    assert chat_memberships.get_chat_member_ids("chat1") == ["user2"]
+    assert chat_memberships.get_chat_member_ids("missing") == []
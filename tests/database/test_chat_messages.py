@@ -181,4 +181,250 @@ def test_delete_message(chat_messages):
     assert result == 1
 
     deleted_message = chat_messages.chat_messages.find_one({"_id": message_id})
-    assert deleted_message is None
\ No newline at end of file
+    assert deleted_message is None
+
+def _insert_history(chat_messages, chat_id, count):
+    """Insert `count` messages sharing the same sentAt second, oldest first."""
+    sent_at = datetime.now(UTC).replace(tzinfo=None, microsecond=0)
+    ids = []
+    for i in range(count):
+        message_id = ObjectId()
+        chat_messages.chat_messages.insert_one({"_id": message_id, "chat_id": chat_id, "sender_id": "user1", "content": f"Message {i}", "sentAt": sent_at})
+        ids.append(message_id)
+    return ids
+
+
+def test_fetch_messages_by_cursor_before(chat_messages):
+    """Test scrolling back through history with a before cursor."""
+    chat_id = str(ObjectId())
+    ids = _insert_history(chat_messages, chat_id, 5)
+
+    page1, has_more = chat_messages.fetch_messages_by_cursor(chat_id, limit=2)
+    assert [m["_id"] for m in page1] == [ids[4], ids[3]]
+    assert has_more is True
+
+    page2, has_more = chat_messages.fetch_messages_by_cursor(chat_id, limit=2, before=str(ids[3]))
+    assert [m["_id"] for m in page2] == [ids[2], ids[1]]
+    assert has_more is True
+
+    page3, has_more = chat_messages.fetch_messages_by_cursor(chat_id, limit=2, before=str(ids[1]))
+    assert [m["_id"] for m in page3] == [ids[0]]
+    assert has_more is False
+
+
+def test_fetch_messages_by_cursor_after(chat_messages):
+    """Test fetching newer messages with an after cursor (still newest first)."""
+    chat_id = str(ObjectId())
+    ids = _insert_history(chat_messages, chat_id, 5)
+
+    page, has_more = chat_messages.fetch_messages_by_cursor(chat_id, limit=2, after=str(ids[1]))
+    assert [m["_id"] for m in page] == [ids[3], ids[2]]
+    assert has_more is True
+
+
+def test_fetch_messages_by_cursor_invalid_cursor(chat_messages):
+    """Test that unknown or malformed cursors are rejected."""
+    chat_id = str(ObjectId())
+    _insert_history(chat_messages, chat_id, 1)
+
+    with pytest.raises(ValueError):
+        chat_messages.fetch_messages_by_cursor(chat_id, limit=2, before="invalid_id")
+    with pytest.raises(ValueError):
+        chat_messages.fetch_messages_by_cursor(chat_id, limit=2, before=str(ObjectId()))
+
+
+def test_count_messages(chat_messages):
+    """Test counting the messages of a chat."""
+    chat_id = str(ObjectId())
+    _insert_history(chat_messages, chat_id, 3)
+    _insert_history(chat_messages, str(ObjectId()), 2)
+    chat_messages.seed_message_counts()  # Stored directly, like messages from before the counters
+
+    assert chat_messages.count_messages(chat_id) == 3
+
+
+def test_xmpp_relay_state(chat_messages):
+    """Test the pending -> relayed / failed lifecycle of a message's XMPP relay state."""
+    chat_id = str(ObjectId())
+    relayed_id = chat_messages.insert_message(chat_id, "user1", "Relayed", xmpp_status="pending")["messageId"]
+    failed_id = chat_messages.insert_message(chat_id, "user1", "Failed", xmpp_status="pending")["messageId"]
+    chat_messages.insert_message(chat_id, "user1", "Sent synchronously")
+
+    claimed = [chat_messages.claim_pending_relay("pending", 0, "worker-a", 300) for _ in range(2)]
+    assert {str(m["_id"]) for m in claimed} == {relayed_id, failed_id}
+    # Claimed messages are leased: another process finds nothing to recover
+    assert chat_messages.claim_pending_relay("pending", 0, "worker-b", 300) is None
+
+    assert chat_messages.mark_relayed(relayed_id) is True
+    relayed = chat_messages.fetch_message(relayed_id)
+    assert "xmppStatus" not in relayed and "xmppLeaseUntil" not in relayed
+
+    assert chat_messages.mark_relay_failed(failed_id, 5, "timeout") is True
+    failed = chat_messages.fetch_message(failed_id)
+    assert failed["xmppStatus"] == "failed"
+    assert failed["xmppAttempts"] == 5
+    assert "xmppOwner" not in failed
+
+    # Dead letters are only recovered on request, and go back to pending
+    assert chat_messages.claim_pending_relay("pending", 0, "worker-b", 300) is None
+    reclaimed = chat_messages.claim_pending_relay("failed", 0, "worker-b", 300)
+    assert str(reclaimed["_id"]) == failed_id
+    assert reclaimed["xmppStatus"] == "pending"
+    assert reclaimed["xmppOwner"] == "worker-b"
+
+
+def test_expired_relay_lease_can_be_claimed_again(chat_messages):
+    """Test that a message claimed by a process that died is recovered once its lease expires."""
+    message_id = chat_messages.insert_message("chat1", "user1", "Stuck", xmpp_status="pending")["messageId"]
+    assert chat_messages.claim_pending_relay("pending", 0, "worker-a", 0) is not None
+
+    chat_messages.chat_messages.update_one(
+        {"_id": ObjectId(message_id)}, {"$set": {"xmppLeaseUntil": datetime(2000, 1, 1)}}
+    )
+    reclaimed = chat_messages.claim_pending_relay("pending", 0, "worker-b", 300)
+    assert reclaimed["xmppOwner"] == "worker-b"
+
+
+def test_insert_message_returns_document(chat_messages):
+    """Test that insert_message returns the stored document alongside its ID."""
+    chat_id = str(ObjectId())
+    result = chat_messages.insert_message(chat_id, "user1", "Hello")
+
+    assert result["message"]["_id"] == ObjectId(result["messageId"])
+    assert result["message"] == chat_messages.fetch_message(result["messageId"])
+
+
+def test_find_and_update_message(chat_messages):
+    """Test updating a message and getting the new document in one call."""
+    chat_id = str(ObjectId())
+    message_id = chat_messages.insert_message(chat_id, "user1", "Old Content")["messageId"]
+
+    updated = chat_messages.find_and_update_message(message_id, "New Content", chat_id=chat_id)
+    assert updated["content"] == "New Content"
+    assert isinstance(updated["editedAt"], datetime)
+
+    # Scoped to the chat: a message from another chat is not updated
+    assert chat_messages.find_and_update_message(message_id, "Other", chat_id=str(ObjectId())) is None
+    assert chat_messages.find_and_update_message("invalid_id", "Other") is None
+
+
+def test_insert_messages(chat_messages):
+    """Test storing a batch of messages with one insert_many and per-item IDs."""
+    chat_id = str(ObjectId())
+    batch = [{"chat_id": chat_id, "sender_id": "user1", "content": f"Message {i}"} for i in range(3)]
+
+    results = chat_messages.insert_messages(batch, xmpp_status="pending")
+
+    assert [r["message"]["content"] for r in results] == ["Message 0", "Message 1", "Message 2"]
+    assert all(r["message"]["xmppStatus"] == "pending" for r in results)
+    assert chat_messages.count_messages(chat_id) == 3
+    assert chat_messages.fetch_message(results[1]["messageId"])["content"] == "Message 1"
+    assert chat_messages.insert_messages([]) == []
+
+
+@pytest.mark.parametrize("ordered, stored", [(True, 1), (False, 2)])
+def test_insert_messages_reports_errors_per_item(chat_messages, ordered, stored):
+    """Test that a failed item is reported, and that an ordered batch stops at it."""
+    chat_id = str(ObjectId())
+    chat_messages.chat_messages.create_index("content", unique=True)
+    chat_messages.insert_message(chat_id, "user1", "Duplicate")
+    batch = [{"chat_id": chat_id, "sender_id": "user1", "content": content} for content in ("First", "Duplicate", "Last")]
+
+    results = chat_messages.insert_messages(batch, ordered=ordered)
+
+    assert "messageId" in results[0]
+    assert "error" in results[1]
+    assert ("error" in results[2]) is ordered
+    assert chat_messages.count_messages(chat_id) == 1 + stored
+
+
+def test_message_counts_are_maintained_incrementally(chat_messages):
+    """Test that inserts and deletes keep the per-chat counter in step without counting documents."""
+    chat_id = str(ObjectId())
+    assert chat_messages.count_messages(chat_id) == 0
+
+    first = chat_messages.insert_message(chat_id, "user1", "First")
+    chat_messages.insert_messages([{"chat_id": chat_id, "sender_id": "user1", "content": f"Batch {i}"} for i in range(3)])
+    assert chat_messages.delete_message(first["messageId"]) is True
+    assert chat_messages.delete_message(first["messageId"]) is False
+
+    assert chat_messages.message_counts.find_one({"_id": chat_id})["count"] == 3
+    assert chat_messages.count_messages(chat_id) == 3
+    assert chat_messages.fetch_messages(chat_id, 0, 1)[1] == 3
+
+
+def test_counters_are_seeded_from_messages_stored_before_them(chat_messages):
+    """Test that chats holding messages from before the counters are counted in full."""
+    chat_id = str(ObjectId())
+    assert chat_messages.seed_message_counts() is None  # Nothing stored yet
+    chat_messages.chat_messages.insert_many([
+        {"chat_id": chat_id, "sender_id": "user1", "content": f"Old {i}", "sentAt": datetime(2025, 1, 1, 12, i)} for i in range(3)
+    ])
+
+    assert chat_messages.seed_message_counts() == {"chats": 1, "fixed": 1}
+    chat_messages.insert_message(chat_id, "user1", "New")
+    assert chat_messages.count_messages(chat_id) == 4
+
+    # Counters exist from now on: later starts leave them alone
+    assert chat_messages.seed_message_counts() is None
+    chat_messages.insert_message(chat_id, "user1", "Newer")
+    assert chat_messages.count_messages(chat_id) == 5
+
+
+def test_recount_messages_repairs_drift(chat_messages):
+    """Test that recounting rebuilds drifted, missing and orphaned counters."""
+    drifted, missing, emptied = str(ObjectId()), str(ObjectId()), str(ObjectId())
+    for chat_id in (drifted, drifted, missing):
+        chat_messages.insert_message(chat_id, "user1", "Hello")
+    chat_messages.message_counts.update_one({"_id": drifted}, {"$set": {"count": 7}})
+    chat_messages.message_counts.delete_one({"_id": missing})
+    chat_messages.message_counts.insert_one({"_id": emptied, "count": 4})
+
+    assert chat_messages.recount_messages() == {"chats": 3, "fixed": 3}
+    assert chat_messages.count_messages(drifted) == 2
+    assert chat_messages.count_messages(missing) == 1
+    assert chat_messages.count_messages(emptied) == 0
+    assert chat_messages.recount_messages([drifted]) == {"chats": 1, "fixed": 0}
+
+
+def test_fetch_with_field_projection(chat_messages):
+    """Test that reads given `fields` return only those fields and _id."""
+    from app.database.chat_messages import HISTORY_FIELDS
+
+    chat_id = "chat_projection"
+    message_id = chat_messages.insert_message(chat_id, "user1", "Hello", xmpp_status="pending")["messageId"]
+    chat_messages.insert_message(chat_id, "user2", "Hi")
+    expected = {"_id", *HISTORY_FIELDS}
+
+    message = chat_messages.fetch_message(message_id, fields=HISTORY_FIELDS)
+    assert set(message) == expected
+    assert message["content"] == "Hello"
+    assert set(chat_messages.fetch_message(message_id, fields=())) == {"_id"}
+    assert "xmppStatus" in chat_messages.fetch_message(message_id)
+
+    messages, total = chat_messages.fetch_messages(chat_id, 0, 10, fields=HISTORY_FIELDS)
+    assert total == 2
+    assert all(set(m) == expected for m in messages)
+
+    messages, has_more = chat_messages.fetch_messages_by_cursor(chat_id, 1, fields=HISTORY_FIELDS)
+    assert has_more is True
+    assert [m["content"] for m in messages] == ["Hi"]
+    assert set(messages[0]) == expected
+
+
+def test_fetch_messages_pages_break_sentat_ties_by_id(chat_messages):
+    """Test that messages sharing a sentAt second are neither repeated nor skipped across pages."""
+    chat_id = "chat_ties"
+    sent_at = datetime(2025, 1, 1, 12, 0, 0)
+    chat_messages.chat_messages.insert_many([
+        {"_id": ObjectId(), "chat_id": chat_id, "sender_id": "user1", "content": f"Message {i}", "sentAt": sent_at}
+        for i in range(7)
+    ])
+
+    paged = []
+    for skip in range(0, 7, 2):
+        page, _ = chat_messages.fetch_messages(chat_id, skip, 2)
+        paged.extend(message["_id"] for message in page)
+
+    newest_first, _ = chat_messages.fetch_messages_by_cursor(chat_id, 7)
+    assert paged == [message["_id"] for message in newest_first]
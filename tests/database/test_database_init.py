@@ -0,0 +1,79 @@
+from app.database.database_init import ChatServiceDatabase
+
+
+def test_parse_index_spec_single_field():
+    """Test that a (field, order) pair keeps the <field>_index name."""
+    keys, name, options = ChatServiceDatabase._parse_index_spec(("sentAt", -1))
+    assert keys == [("sentAt", -1)]
+    assert name == "sentAt_index"
+    assert options == {}
+
+
+def test_parse_index_spec_compound():
+    """Test that a list of pairs becomes a compound index."""
+    keys, name, options = ChatServiceDatabase._parse_index_spec([("chat_id", 1), ("sentAt", -1)])
+    assert keys == [("chat_id", 1), ("sentAt", -1)]
+    assert name == "chat_id_sentAt_index"
+    assert options == {}
+
+
+def test_parse_index_spec_with_options():
+    """Test that dict specs pass partial and TTL options through to create_index."""
+    spec = {
+        "keys": [("createdAt", 1)],
+        "name": "createdAt_ttl",
+        "expireAfterSeconds": 3600,
+        "partialFilterExpression": {"status": "failed"},
+    }
+    keys, name, options = ChatServiceDatabase._parse_index_spec(spec)
+    assert keys == [("createdAt", 1)]
+    assert name == "createdAt_ttl"
+    assert options == {"expireAfterSeconds": 3600, "partialFilterExpression": {"status": "failed"}}
+    # The config entry itself must not be mutated
+    assert spec["name"] == "createdAt_ttl"
+
+
+def test_create_collections_and_indexes(mock_db):
+    """Test that configured indexes are created once with their names."""
+    mock_db._create_collections_and_indexes()
+    mock_db._create_collections_and_indexes()
+
+    message_indexes = {index["name"] for index in mock_db.db["chat_messages"].list_indexes()}
+    assert "chat_id_sentAt__id_index" in message_indexes
+    assert "editedAt_partial_index" in message_indexes
+
+    membership_indexes = {index["name"] for index in mock_db.db["chat_memberships"].list_indexes()}
+    assert {"user_id_chat_id_index", "user_id_lastActivityAt_index", "chat_id_index"} <= membership_indexes
+    assert "user_id_joinedAt_index" not in membership_indexes
+
+
+def test_superseded_indexes_are_dropped(mock_db):
+    """Test that indexes left by earlier versions are replaced by the configured ones."""
+    messages = mock_db.db["chat_messages"]
+    messages.create_index([("chat_id", 1)], name="chat_id_index")
+    messages.create_index([("sentAt", -1)], name="sentAt_index")
+    messages.create_index([("editedAt", -1)], name="editedAt_index")
+    memberships = mock_db.db["chat_memberships"]
+    memberships.create_index([("user_id", 1)], name="user_id_index")
+    memberships.create_index([("joinedAt", -1)], name="joinedAt_index")
+    memberships.create_index([("user_id", 1), ("joinedAt", -1)], name="user_id_joinedAt_index")
+
+    mock_db._create_collections_and_indexes()
+
+    message_indexes = {index["name"] for index in messages.list_indexes()}
+    assert not {"chat_id_index", "sentAt_index", "editedAt_index"} & message_indexes
+    assert {"chat_id_sentAt__id_index", "editedAt_partial_index"} <= message_indexes
+    membership_indexes = {index["name"] for index in memberships.list_indexes()}
+    assert not {"user_id_index", "joinedAt_index", "user_id_joinedAt_index"} & membership_indexes
+    assert {"user_id_chat_id_index", "user_id_lastActivityAt_index"} <= membership_indexes
+
+
+def test_has_collection_scan():
+    """Test detecting COLLSCAN stages anywhere in a winning plan."""
+    index_plan = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}
+    scan_plan = {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}
+    or_plan = {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}
+
+    assert ChatServiceDatabase._has_collection_scan(index_plan) is False
+    assert ChatServiceDatabase._has_collection_scan(scan_plan) is True
+    assert ChatServiceDatabase._has_collection_scan(or_plan) is True
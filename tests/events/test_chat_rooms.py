@@ -0,0 +1,93 @@
+import pytest
+from flask import Flask, request
+from flask_socketio import SocketIO, join_room
+
+from app.events.chat_rooms import (
+    add_users_to_chat_room, chat_room, close_chat_room, join_chat_rooms, remove_users_from_chat_room
+)
+from app.events.fanout import emit_to_rooms
+from app.utils.pubsub import RoomSyncManager
+
+
+@pytest.fixture
+def chat_app():
+    """
+    Socket.IO app whose clients join their personal room and the chat rooms
+    listed in the `chats` query parameter, like SocketIOConnectionEvents.
+    """
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode="threading", client_manager=RoomSyncManager())
+
+    @socketio.on("connect")
+    def handle_connect(auth=None):
+        join_room(request.args["userId"])
+        join_chat_rooms([chat_id for chat_id in request.args.get("chats", "").split(",") if chat_id])
+
+    @socketio.on("add")
+    def handle_add(data):
+        add_users_to_chat_room(data["chatId"], data["userIds"])
+
+    @socketio.on("remove")
+    def handle_remove(data):
+        remove_users_from_chat_room(data["chatId"], data["userIds"])
+
+    @socketio.on("delete")
+    def handle_delete(data):
+        close_chat_room(data["chatId"])
+
+    @socketio.on("send")
+    def handle_send(data):
+        emit_to_rooms("receiveMessage", data, [chat_room(data["chatId"])])
+
+    return app, socketio
+
+
+def _received(client):
+    return [message["args"][0] for message in client.get_received() if message["name"] == "receiveMessage"]
+
+
+def test_chat_room_name():
+    assert chat_room("abc") == "chat:abc"
+
+
+def test_members_joined_on_connect_receive_chat_broadcast(chat_app):
+    app, socketio = chat_app
+    alice = socketio.test_client(app, query_string="userId=alice&chats=c1,c2")
+    bob = socketio.test_client(app, query_string="userId=bob&chats=c1")
+    carol = socketio.test_client(app, query_string="userId=carol&chats=c2")
+
+    alice.emit("send", {"chatId": "c1", "content": "hi"})
+
+    assert _received(alice) == [{"chatId": "c1", "content": "hi"}]
+    assert _received(bob) == [{"chatId": "c1", "content": "hi"}]
+    assert _received(carol) == []
+
+
+def test_membership_changes_update_online_sessions(chat_app):
+    app, socketio = chat_app
+    alice = socketio.test_client(app, query_string="userId=alice&chats=c1")
+    bob_web = socketio.test_client(app, query_string="userId=bob")
+    bob_mobile = socketio.test_client(app, query_string="userId=bob")
+
+    alice.emit("add", {"chatId": "c1", "userIds": ["bob"]})
+    alice.emit("send", {"chatId": "c1", "content": "welcome"})
+    assert _received(bob_web) == [{"chatId": "c1", "content": "welcome"}]
+    assert _received(bob_mobile) == [{"chatId": "c1", "content": "welcome"}]
+
+    alice.emit("remove", {"chatId": "c1", "userIds": ["bob"]})
+    alice.emit("send", {"chatId": "c1", "content": "bye"})
+    assert _received(bob_web) == []
+    assert _received(bob_mobile) == []
+    assert len(_received(alice)) == 2
+
+
+def test_deleted_chat_room_is_closed(chat_app):
+    app, socketio = chat_app
+    alice = socketio.test_client(app, query_string="userId=alice&chats=c1")
+    bob = socketio.test_client(app, query_string="userId=bob&chats=c1")
+
+    alice.emit("delete", {"chatId": "c1"})
+    alice.emit("send", {"chatId": "c1", "content": "anyone?"})
+
+    assert _received(alice) == []
+    assert _received(bob) == []
@@ -0,0 +1,53 @@
+import pytest
+from flask import Flask, request
+from flask_socketio import SocketIO, join_room
+
+from app.events.fanout import SOCKETIO_FANOUT_ROOMS, emit_to_rooms
+
+
+@pytest.fixture
+def fanout_app():
+    """Socket.IO app whose clients join the rooms listed in the `rooms` query parameter."""
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode="threading")
+
+    @socketio.on("connect")
+    def handle_connect(auth=None):
+        for room in request.args.get("rooms", "").split(","):
+            join_room(room)
+
+    @socketio.on("fanout")
+    def handle_fanout(data):
+        emit_to_rooms("notify", data["payload"], data["rooms"])
+
+    SOCKETIO_FANOUT_ROOMS.reset()
+    return app, socketio
+
+
+def _received(client):
+    return [message["args"][0] for message in client.get_received() if message["name"] == "notify"]
+
+
+def test_emit_to_rooms_reaches_each_session_once(fanout_app):
+    app, socketio = fanout_app
+    alice = socketio.test_client(app, query_string="rooms=alice")
+    bob = socketio.test_client(app, query_string="rooms=bob,chat:1")
+    carol = socketio.test_client(app, query_string="rooms=carol")
+
+    alice.emit("fanout", {"payload": {"content": "hi"}, "rooms": ["alice", "bob", "chat:1", "alice"]})
+
+    assert _received(alice) == [{"content": "hi"}]
+    assert _received(bob) == [{"content": "hi"}]
+    assert _received(carol) == []
+    assert SOCKETIO_FANOUT_ROOMS.count(event="notify") == 1
+    assert 'socketio_fanout_rooms_sum{event="notify"} 3.0' in SOCKETIO_FANOUT_ROOMS.render()
+
+
+def test_emit_to_no_rooms_is_a_noop(fanout_app):
+    app, socketio = fanout_app
+    alice = socketio.test_client(app, query_string="rooms=alice")
+
+    alice.emit("fanout", {"payload": {"content": "hi"}, "rooms": []})
+
+    assert _received(alice) == []
+    assert SOCKETIO_FANOUT_ROOMS.count(event="notify") == 0
@@ -0,0 +1,69 @@
+import pytest
+from flask import Flask
+from flask_socketio import SocketIO, emit
+
+from app.events.instrumentation import SOCKETIO_EVENT_ERRORS, SOCKETIO_EVENT_SECONDS, instrument_events, record_event_error
+from app.events.static_routes_events import static_routes_bp
+
+
+@instrument_events
+def register_test_events(socketio):
+    def handle_ping(data):
+        emit("pong", data)
+
+    def handle_broken(data):
+        raise RuntimeError("boom")
+
+    def handle_rejected(data):
+        # Handlers catch their own exceptions and answer with an error event
+        record_event_error()
+        emit("error", {"type": "processing_error", "message": "rejected"})
+
+    socketio.on_event("test/ping", handle_ping)
+    socketio.on_event("test/broken", handle_broken)
+    socketio.on_event("test/rejected", handle_rejected)
+
+
+def test_registered_handlers_are_timed():
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode="threading")
+    register_test_events(socketio)
+    client = socketio.test_client(app)
+
+    client.emit("test/ping", {"n": 1})
+    client.emit("test/ping", {"n": 2})
+    with pytest.raises(RuntimeError):
+        client.emit("test/broken", {})
+
+    assert [message["args"][0] for message in client.get_received() if message["name"] == "pong"] == [{"n": 1}, {"n": 2}]
+    assert SOCKETIO_EVENT_SECONDS.count(event="test/ping") == 2
+    assert SOCKETIO_EVENT_SECONDS.count(event="test/broken") == 1
+    assert SOCKETIO_EVENT_ERRORS.get(event="test/broken") == 1
+    assert SOCKETIO_EVENT_ERRORS.get(event="test/ping") == 0
+
+
+def test_emitted_errors_are_counted_against_their_event():
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode="threading")
+    register_test_events(socketio)
+    client = socketio.test_client(app)
+
+    client.emit("test/rejected", {})
+    client.emit("test/rejected", {})
+
+    assert [message["name"] for message in client.get_received()] == ["error", "error"]
+    assert SOCKETIO_EVENT_ERRORS.get(event="test/rejected") == 2
+
+
+def test_metrics_endpoint_renders_prometheus_text():
+    app = Flask(__name__)
+    app.register_blueprint(static_routes_bp)
+
+    SOCKETIO_EVENT_SECONDS.observe(0.01, event="test/metrics")
+    response = app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert "# TYPE socketio_event_duration_seconds histogram" in body
+    assert 'socketio_event_duration_seconds_count{event="test/metrics"} 1' in body
@@ -0,0 +1,121 @@
+import mongomock
+import pytest
+
+from app.database.chat_groups import ChatGroups
+from app.database.chat_memberships import ChatMemberships
+from app.services.chat_groups_services import ChatGroupsService
+from app.utils.verify_policy import VerifyPolicy
+
+
+class MockDatabase:
+    def __init__(self):
+        self.db = mongomock.MongoClient()["test_db"]
+
+    def get_database(self):
+        return self.db
+
+
+class FakeUserManagement:
+    def ensure_users_register(self, user_ids):
+        return True
+
+
+class FakeChatGroupsXMPP:
+    """In-memory ejabberd rooms, counting affiliation queries."""
+
+    def __init__(self):
+        self.rooms = {}
+        self.affiliation_queries = 0
+
+    def create_chat_group(self, chat_id, users):
+        self.rooms[chat_id] = set(users)
+        return True
+
+    def delete_chat_group(self, chat_id):
+        return self.rooms.pop(chat_id, None) is not None
+
+    def set_room_affiliations(self, room, users, affiliation):
+        for user in users:
+            if affiliation == "none":
+                self.rooms[room].discard(user)
+            else:
+                self.rooms[room].add(user)
+        return {user: True for user in users}
+
+    def get_room_affiliated_usernames(self, chat_id):
+        self.affiliation_queries += 1
+        return [{"jid": f"{user}@localhost", "affiliation": "member"} for user in self.rooms[chat_id]]
+
+
+def _service(db=None):
+    db = db or MockDatabase()
+    service = ChatGroupsService(ChatGroups(db), ChatMemberships(db), FakeUserManagement(), verify_policy=VerifyPolicy("trusted"))
+    service.chat_groups_xmpp = FakeChatGroupsXMPP()
+    return service
+
+
+def test_members_are_answered_from_the_membership_index():
+    """Member lists and the rename/delete fan-out come from Mongo, not ejabberd affiliation queries."""
+    service = _service()
+    chat_id = service.create_chat_group("Team", ["user1", "user2", "user4"])["chatId"]
+    service.add_users_to_chat(chat_id, ["user3", "user5"])
+    service.remove_users_from_chat(chat_id, ["user1", "user4"])
+
+    assert sorted(service.get_chat_users(chat_id)) == ["user2", "user3", "user5"]
+    assert sorted(service.update_chat_group_name(chat_id, "Renamed")["users"]) == ["user2", "user3", "user5"]
+
+    deleted, affected_users = service.delete_chat_group(chat_id)
+    assert deleted is True
+    assert sorted(affected_users) == ["user2", "user3", "user5"]
+    assert service.chat_groups_xmpp.affiliation_queries == 0
+    assert service.chat_memberships_dal.get_chat_member_ids(chat_id) == []
+
+
+def test_unindexed_chat_is_backfilled_from_ejabberd():
+    """A chat missing from the index is resolved through ejabberd once, then served locally."""
+    service = _service()
+    chat_id = service.chat_groups_dal.create_chat_group("Legacy")["_id"]
+    service.chat_groups_xmpp.create_chat_group(chat_id, ["user1", "user2"])
+
+    assert sorted(service.get_chat_users(chat_id)) == ["user1", "user2"]
+    assert service.chat_groups_xmpp.affiliation_queries == 1
+
+    assert sorted(service.get_chat_users(chat_id)) == ["user1", "user2"]
+    assert service.chat_groups_xmpp.affiliation_queries == 1
+
+
+def test_deleting_unindexed_chat_notifies_its_members():
+    """Deleting a chat missing from the index still reports its ejabberd members for notification."""
+    service = _service()
+    chat_id = service.chat_groups_dal.create_chat_group("Legacy")["_id"]
+    service.chat_groups_xmpp.create_chat_group(chat_id, ["user1", "user2"])
+
+    deleted, affected_users = service.delete_chat_group(chat_id)
+    assert deleted is True
+    assert sorted(affected_users) == ["user1", "user2"]
+    assert service.chat_memberships_dal.get_chat_member_ids(chat_id) == []
+
+
+def test_failed_group_delete_keeps_memberships():
+    """Memberships are only dropped once the chat group document is actually deleted."""
+    service = _service()
+    chat_id = service.create_chat_group("Team", ["user1", "user2"])["chatId"]
+    service.chat_groups_dal.delete_chat_group = lambda chat_id: 0
+
+    with pytest.raises(ValueError):
+        service.delete_chat_group(chat_id)
+    assert sorted(service.chat_memberships_dal.get_chat_member_ids(chat_id)) == ["user1", "user2"]
+
+
+def test_replicas_share_member_changes():
+    """Without a shared cache, a membership change on one replica shows in the other's member list."""
+    db = MockDatabase()
+    replica_a, replica_b = _service(db), _service(db)
+    replica_b.chat_groups_xmpp = replica_a.chat_groups_xmpp
+    chat_id = replica_a.create_chat_group("Team", ["user1", "user2"])["chatId"]
+    assert replica_a.occupants_cache is None
+    assert sorted(replica_a.get_chat_users(chat_id)) == ["user1", "user2"]
+
+    replica_b.add_users_to_chat(chat_id, ["user3", "user4"])
+    replica_b.remove_users_from_chat(chat_id, ["user1"])
+    assert sorted(replica_a.get_chat_users(chat_id)) == ["user2", "user3", "user4"]
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import mongomock
+
+from app.database.chat_memberships import ChatMemberships
+from app.database.chat_messages import ChatMessages
+from app.services.chat_messages_services import ChatMessagesService
+from app.utils.verify_policy import VerifyPolicy
+
+
+class MockDatabase:
+    def __init__(self):
+        self.db = mongomock.MongoClient()["test_db"]
+
+    def get_database(self):
+        return self.db
+
+
+class FakeMessagesXMPP:
+    def send_message(self, user_id, to_id, message_type, subject, body):
+        return True
+
+    def send_messages(self, messages, message_type="groupchat", preserve_order=True):
+        return [True] * len(messages)
+
+
+def _service():
+    db = MockDatabase()
+    memberships = ChatMemberships(db)
+    service = ChatMessagesService(
+        ChatMessages(db), relay_mode="sync", verify_policy=VerifyPolicy("trusted"), chat_memberships_dal=memberships
+    )
+    service.chat_messages_xmpp = FakeMessagesXMPP()
+    memberships.add_members("chat1", ["user1", "user2"], group_name="Team")
+    # Joined before the messages below, rather than in the same second
+    memberships.chat_memberships.update_many({}, {"$set": {"joinedAt": datetime(2025, 1, 1)}})
+    return service, memberships
+
+
+def _entry(memberships, user_id):
+    return memberships.get_user_chat_list(user_id, 0, 10)[0][0]
+
+
+def test_sent_edited_and_deleted_messages_reach_chat_list():
+    """Sending, editing and deleting keep the members' chat list entries in step with the chat."""
+    service, memberships = _service()
+    first = service.send_message("chat1", "user1", "Hello")
+    second = service.send_message("chat1", "user1", "How are you?")
+
+    entry = _entry(memberships, "user2")
+    assert entry["unreadCount"] == 2
+    assert entry["lastMessage"]["snippet"] == "How are you?"
+    assert _entry(memberships, "user1")["unreadCount"] == 0
+
+    service.edit_message("chat1", str(second["_id"]), "How are you all?")
+    assert _entry(memberships, "user2")["lastMessage"]["snippet"] == "How are you all?"
+
+    assert service.delete_message("chat1", str(second["_id"])) is True
+    entry = _entry(memberships, "user2")
+    assert entry["unreadCount"] == 1
+    assert entry["lastMessage"]["messageId"] == str(first["_id"])
+
+
+def test_batch_send_reaches_chat_list():
+    """A message batch raises unread counts once per stored message."""
+    service, memberships = _service()
+    service.send_messages([
+        {"chat_id": "chat1", "sender_id": "user1", "content": f"Message {i}"} for i in range(3)
+    ])
+
+    entry = _entry(memberships, "user2")
+    assert entry["unreadCount"] == 3
+    assert entry["lastMessage"]["snippet"] == "Message 2"
+
+
+def test_deleting_older_message_keeps_preview_without_history_lookup():
+    """Deleting a message other than the last one leaves the preview alone and skips the newest-message read."""
+    service, memberships = _service()
+    first = service.send_message("chat1", "user1", "Hello")
+    second = service.send_message("chat1", "user1", "How are you?")
+
+    lookups = []
+    get_recent_messages = service._get_recent_messages
+    service._get_recent_messages = lambda *args: lookups.append(args) or get_recent_messages(*args)
+
+    assert service.delete_message("chat1", str(first["_id"])) is True
+    assert lookups == []
+    entry = _entry(memberships, "user2")
+    assert entry["unreadCount"] == 1
+    assert entry["lastMessage"]["messageId"] == str(second["_id"])
@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import mongomock
+import pytest
+
+from app.database.chat_messages import ChatMessages
+from app.services.chat_messages_services import ChatMessagesService
+from app.utils.verify_policy import VerifyPolicy
+
+
+class MockDatabase:
+    def __init__(self):
+        self.db = mongomock.MongoClient()["test_db"]
+
+    def get_database(self):
+        return self.db
+
+
+class FakeMessagesXMPP:
+    def __init__(self, failing_contents=()):
+        self.failing_contents = set(failing_contents)
+        self.sent = []
+
+    def send_messages(self, messages, message_type="groupchat", preserve_order=True):
+        self.sent.extend(messages)
+        return [message["content"] not in self.failing_contents for message in messages]
+
+
+def _service(xmpp):
+    service = ChatMessagesService(ChatMessages(MockDatabase()), relay_mode="sync", verify_policy=VerifyPolicy("trusted"))
+    service.chat_messages_xmpp = xmpp
+    return service
+
+
+def test_send_messages_reports_results_per_item():
+    """Invalid items and failed XMPP sends are reported; the rest is stored in one batch."""
+    xmpp = FakeMessagesXMPP(failing_contents={"xmpp down"})
+    service = _service(xmpp)
+    batch = [
+        {"chat_id": "chat1", "sender_id": "user1", "content": "Hello"},
+        {"chat_id": "chat1", "sender_id": "user1", "content": ""},
+        {"chat_id": "chat2", "sender_id": "user2", "content": "xmpp down"},
+        {"chat_id": "chat2", "sender_id": "user2", "content": "World"},
+    ]
+
+    results = service.send_messages(batch)
+
+    assert results[0]["message"]["content"] == "Hello"
+    assert results[1] == {"error": "Missing content field"}
+    assert results[2] == {"error": "Failed to send message via XMPP"}
+    assert results[3]["message"]["chat_id"] == "chat2"
+    # Invalid items are never relayed, and only relayed items are stored
+    assert len(xmpp.sent) == 3
+    assert service.chat_messages_dal.count_messages("chat1") == 1
+    assert service.chat_messages_dal.count_messages("chat2") == 1
+
+
+def test_send_messages_rejects_oversized_batches():
+    service = _service(FakeMessagesXMPP())
+    batch = [{"chat_id": "chat1", "sender_id": "user1", "content": "Hi"}] * 1001
+
+    with pytest.raises(ValueError, match="1000"):
+        service.send_messages(batch)
+
+
+def test_send_message_with_write_coalescing():
+    """Coalesced sends are stored in batches and still return their own message."""
+    xmpp = FakeMessagesXMPP(failing_contents={"xmpp down"})
+    service = ChatMessagesService(ChatMessages(MockDatabase()), relay_mode="sync", verify_policy=VerifyPolicy("strict"), coalescing=True)
+    service.chat_messages_xmpp = xmpp
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        messages = list(pool.map(lambda i: service.send_message("chat1", f"user{i}", f"Message {i}"), range(8)))
+
+    assert [m["content"] for m in messages] == [f"Message {i}" for i in range(8)]
+    assert len({m["_id"] for m in messages}) == 8
+    assert service.chat_messages_dal.count_messages("chat1") == 8
+
+    with pytest.raises(RuntimeError, match="Failed to send message via XMPP"):
+        service.send_message("chat1", "user1", "xmpp down")
+
+    service.write_coalescer.stop()
+    assert service.get_coalescing_stats()["messages"] == 9
@@ -0,0 +1,149 @@
+import mongomock
+import pytest
+
+from config.cache_config import CacheConfig
+from app.database.chat_messages import ChatMessages
+from app.services.chat_messages_services import ChatMessagesService
+from app.utils.verify_policy import VerifyPolicy
+
+
+class MockDatabase:
+    def __init__(self):
+        self.db = mongomock.MongoClient()["test_db"]
+
+    def get_database(self):
+        return self.db
+
+
+class FakeMessagesXMPP:
+    def send_message(self, user_id, to_id, message_type, subject, body):
+        return True
+
+
+class CountingMessagesDAL(ChatMessages):
+    """ChatMessages DAL counting the reads that reach Mongo."""
+
+    def __init__(self, db):
+        super().__init__(db)
+        self.reads = 0
+
+    def fetch_messages(self, *args, **kwargs):
+        self.reads += 1
+        return super().fetch_messages(*args, **kwargs)
+
+    def fetch_messages_by_cursor(self, *args, **kwargs):
+        self.reads += 1
+        return super().fetch_messages_by_cursor(*args, **kwargs)
+
+    def count_messages(self, *args, **kwargs):
+        self.reads += 1
+        return super().count_messages(*args, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def in_process_cache(monkeypatch):
+    monkeypatch.setattr(CacheConfig, "CACHE_REDIS_URL", "")
+    monkeypatch.setattr(CacheConfig, "CACHE_IN_PROCESS", True)
+
+
+def _service(db=None):
+    dal = CountingMessagesDAL(db or MockDatabase())
+    service = ChatMessagesService(dal, relay_mode="sync", verify_policy=VerifyPolicy("trusted"))
+    service.chat_messages_xmpp = FakeMessagesXMPP()
+    return service, dal
+
+
+def test_first_pages_are_served_from_the_ring_buffer():
+    """Reopening a chat serves its newest page without touching Mongo, including new messages."""
+    service, dal = _service()
+    for i in range(5):
+        service.send_message("chat1", "user1", f"Message {i}")
+
+    messages, total = service.get_messages("chat1", page=1, limit=3)
+    assert [m["content"] for m in messages] == ["Message 4", "Message 3", "Message 2"]
+    assert total == 5
+    reads = dal.reads
+
+    sent = service.send_message("chat1", "user2", "Message 5")
+    service.edit_message("chat1", str(messages[0]["_id"]), "Edited")
+    messages, total = service.get_messages("chat1", page=1, limit=3)
+    assert [m["content"] for m in messages] == ["Message 5", "Edited", "Message 3"]
+    assert total == 6
+
+    messages, next_cursor, total = service.get_messages_by_cursor("chat1", limit=2, include_total=True)
+    assert [m["content"] for m in messages] == ["Message 5", "Edited"]
+    assert next_cursor == str(messages[-1]["_id"])
+    assert total == 6
+
+    service.delete_message("chat1", str(sent["_id"]))
+    messages, total = service.get_messages("chat1", page=1, limit=2)
+    assert [m["content"] for m in messages] == ["Edited", "Message 3"]
+    assert total == 5
+
+    assert dal.reads == reads
+    assert service.get_recent_messages_cache_stats()["hits"] == 3
+
+
+def test_later_pages_and_older_cursors_still_read_mongo():
+    service, dal = _service()
+    for i in range(5):
+        service.send_message("chat1", "user1", f"Message {i}")
+    messages, next_cursor, _ = service.get_messages_by_cursor("chat1", limit=2)
+    reads = dal.reads
+
+    older, _, _ = service.get_messages_by_cursor("chat1", limit=2, before=next_cursor)
+    page_two, _ = service.get_messages("chat1", page=2, limit=2)
+
+    assert [m["content"] for m in older] == ["Message 2", "Message 1"]
+    assert len(page_two) == 2
+    assert dal.reads > reads
+
+
+def test_history_pages_carry_only_client_fields():
+    """Messages read from Mongo for history pages are projected to the fields sent to clients."""
+    service, _ = _service()
+    for i in range(5):
+        service.send_message("chat1", "user1", f"Message {i}")
+    service.recent_messages.clear()  # Refill from Mongo
+
+    expected = {"_id", "sender_id", "content", "sentAt"}
+    for messages in (
+        service.get_messages("chat1", page=1, limit=2)[0],
+        service.get_messages("chat1", page=2, limit=2)[0],
+        service.get_messages_by_cursor("chat1", 2, before=str(service.get_messages("chat1", page=1, limit=2)[0][-1]["_id"]))[0],
+    ):
+        assert messages
+        assert all(set(message) == expected for message in messages)
+
+
+def test_cached_messages_have_one_shape():
+    """First pages look the same whether the cache was filled from Mongo or by sends and edits."""
+    service, _ = _service()
+    sent = service.send_message("chat1", "user1", "Message 0")
+    service.edit_message("chat1", str(sent["_id"]), "Edited")
+    service.send_message("chat1", "user1", "Message 1")
+
+    from_writes, _ = service.get_messages("chat1", page=1, limit=2)
+    service.recent_messages.clear()
+    from_mongo, _ = service.get_messages("chat1", page=1, limit=2)
+
+    assert from_writes == from_mongo
+    assert all(set(message) == {"_id", "sender_id", "content", "sentAt"} for message in from_writes)
+
+
+def test_replicas_without_a_shared_cache_read_mongo(monkeypatch):
+    """Without CACHE_REDIS_URL or CACHE_IN_PROCESS there is no cache, so a write on one replica is seen by the others."""
+    monkeypatch.setattr(CacheConfig, "CACHE_IN_PROCESS", False)
+    db = MockDatabase()
+    replica_a, _ = _service(db)
+    replica_b, _ = _service(db)
+    assert replica_a.recent_messages is None
+    assert replica_a.get_recent_messages_cache_stats() is None
+
+    replica_a.send_message("chat1", "user1", "first")
+    assert [m["content"] for m in replica_a.get_messages("chat1", page=1, limit=10)[0]] == ["first"]
+
+    replica_b.send_message("chat1", "user2", "second")
+    messages, total = replica_a.get_messages("chat1", page=1, limit=10)
+    assert [m["content"] for m in messages] == ["second", "first"]
+    assert total == 2
@@ -0,0 +1,49 @@
+import mongomock
+
+from app.database.chat_groups import ChatGroups
+from app.database.chat_memberships import ChatMemberships
+from app.services.user_service import UserService
+
+
+class MockDatabase:
+    def __init__(self):
+        self.db = mongomock.MongoClient()["test_db"]
+
+    def get_database(self):
+        return self.db
+
+
+class CountingGroupsDAL(ChatGroups):
+    """ChatGroups DAL counting the group lookups that reach Mongo."""
+
+    def __init__(self, db):
+        super().__init__(db)
+        self.lookups = 0
+
+    def get_chat_group(self, *args, **kwargs):
+        self.lookups += 1
+        return super().get_chat_group(*args, **kwargs)
+
+    def get_chat_groups(self, *args, **kwargs):
+        self.lookups += 1
+        return super().get_chat_groups(*args, **kwargs)
+
+
+def test_chat_list_resolves_missing_group_names_in_one_query():
+    """Entries indexed without a group name are filled in with a single batched lookup, then stored."""
+    db = MockDatabase()
+    groups = CountingGroupsDAL(db)
+    memberships = ChatMemberships(db)
+    service = UserService(groups, memberships)
+
+    chat_ids = [groups.create_chat_group(f"Group {i}")["_id"] for i in range(5)]
+    for chat_id in chat_ids:
+        memberships.add_members(chat_id, ["user1"])  # Legacy entries: no group name
+
+    result = service.get_chat_list("user1", page=1, limit=10)
+    assert groups.lookups == 1
+    assert sorted(chat["groupName"] for chat in result["chats"]) == [f"Group {i}" for i in range(5)]
+
+    # Names were written back, so the next page load needs no group lookup
+    service.get_chat_list("user1", page=1, limit=10)
+    assert groups.lookups == 1
@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.write_coalescer import WriteCoalescer
+
+
+class RecordingFlush:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def __call__(self, items):
+        with self.lock:
+            self.batches.append(list(items))
+        if self.fail:
+            raise RuntimeError("insert_many failed")
+        return [{"message": {"content": item["content"].upper()}} for item in items]
+
+
+def test_concurrent_sends_share_one_batch():
+    """Test that sends within the window are flushed together and each sender gets its own result."""
+    flush = RecordingFlush()
+    coalescer = WriteCoalescer(flush, window_ms=200, max_batch=100, timeout=5)
+    coalescer.start()
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda i: coalescer.submit({"content": f"message {i}"}), range(10)))
+    coalescer.stop()
+
+    assert results == [{"message": {"content": f"MESSAGE {i}"}} for i in range(10)]
+    assert sum(len(batch) for batch in flush.batches) == 10
+    assert len(flush.batches) < 10
+    stats = coalescer.stats()
+    assert stats["messages"] == 10
+    assert stats["batches"] == len(flush.batches)
+
+
+def test_max_batch_flushes_before_the_window_ends():
+    flush = RecordingFlush()
+    coalescer = WriteCoalescer(flush, window_ms=60000, max_batch=3, timeout=5)
+    coalescer.start()
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        list(pool.map(lambda i: coalescer.submit({"content": str(i)}), range(6)))
+    coalescer.stop()
+
+    assert [len(batch) for batch in flush.batches] == [3, 3]
+    assert coalescer.stats()["maxBatchSize"] == 3
+
+
+def test_failed_flush_raises_for_every_sender():
+    flush = RecordingFlush(fail=True)
+    coalescer = WriteCoalescer(flush, window_ms=1, max_batch=10, timeout=5)
+    coalescer.start()
+
+    with pytest.raises(RuntimeError, match="insert_many failed"):
+        coalescer.submit({"content": "lost"})
+    coalescer.stop()
+
+    assert coalescer.stats()["failedBatches"] == 1
+
+
+def test_timed_out_message_is_withdrawn_before_its_flush():
+    """A sender that times out before its batch is flushed gets an error and the message is never written."""
+    flush = RecordingFlush()
+    coalescer = WriteCoalescer(flush, window_ms=300, max_batch=100, timeout=0.05)
+    coalescer.start()
+
+    with pytest.raises(TimeoutError):
+        coalescer.submit({"content": "late"})
+    coalescer.stop()
+
+    assert flush.batches == []
+    assert coalescer.stats()["abandoned"] == 1
+
+
+def test_timeout_during_flush_waits_for_the_result():
+    """A sender whose message is already being written gets its result instead of a timeout."""
+    release = threading.Event()
+
+    def slow_flush(items):
+        release.wait(5)
+        return [{"message": {"content": item["content"]}} for item in items]
+
+    coalescer = WriteCoalescer(slow_flush, window_ms=0, max_batch=100, timeout=0.05)
+    coalescer.start()
+    threading.Timer(0.2, release.set).start()
+
+    assert coalescer.submit({"content": "slow"}) == {"message": {"content": "slow"}}
+    coalescer.stop()
+    assert coalescer.stats()["abandoned"] == 0
@@ -0,0 +1,122 @@
+import time
+
+from app.services.xmpp_relay import XMPPRelay
+
+
+class FakeMessagesDAL:
+    def __init__(self):
+        self.relayed = []
+        self.failed = []
+        self.pending = []
+
+    def mark_relayed(self, message_id):
+        self.relayed.append(message_id)
+        return True
+
+    def mark_relay_failed(self, message_id, attempts, error):
+        self.failed.append((message_id, attempts, error))
+        return True
+
+    def claim_pending_relay(self, status, older_than_seconds, owner, lease_seconds):
+        return self.pending.pop(0) if status == "pending" and self.pending else None
+
+
+class FakeMessagesXMPP:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    def send_message(self, user_id, to_id, message_type, subject, body):
+        if self.failures > 0:
+            self.failures -= 1
+            return False
+        self.sent.append((user_id, to_id, body))
+        return True
+
+
+def _message(i):
+    return {"_id": f"msg{i}", "chat_id": "chat1", "sender_id": "user1", "content": f"Message {i}"}
+
+
+def test_relays_queued_messages():
+    """Test that queued messages are relayed in the background and marked as relayed."""
+    dal, xmpp = FakeMessagesDAL(), FakeMessagesXMPP()
+    relay = XMPPRelay(dal, xmpp, queue_size=10, workers=2, max_attempts=3, retry_backoff=0)
+    relay.start()
+
+    for i in range(5):
+        relay.submit(_message(i))
+    relay.stop()
+
+    assert sorted(dal.relayed) == [f"msg{i}" for i in range(5)]
+    assert len(xmpp.sent) == 5
+    stats = relay.stats()
+    assert stats["enqueued"] == 5
+    assert stats["relayed"] == 5
+    assert stats["queueDepth"] == 0
+
+
+def test_retries_then_dead_letters():
+    """Test that failed sends are retried and dead-lettered after the last attempt."""
+    dal = FakeMessagesDAL()
+    relay = XMPPRelay(dal, FakeMessagesXMPP(failures=2), queue_size=10, workers=1, max_attempts=3, retry_backoff=0)
+    relay.start()
+    relay.submit(_message(1))
+    relay.stop()
+
+    assert dal.relayed == ["msg1"]
+    assert relay.stats()["retries"] == 2
+
+    dal = FakeMessagesDAL()
+    relay = XMPPRelay(dal, FakeMessagesXMPP(failures=10), queue_size=10, workers=1, max_attempts=2, retry_backoff=0)
+    relay.start()
+    relay.submit(_message(2))
+    relay.stop()
+
+    assert dal.relayed == []
+    assert dal.failed[0][:2] == ("msg2", 2)
+    assert relay.stats()["deadLettered"] == 1
+
+
+def test_full_queue_relays_inline():
+    """Test backpressure: with no room in the queue the caller relays the message itself."""
+    dal, xmpp = FakeMessagesDAL(), FakeMessagesXMPP()
+    relay = XMPPRelay(dal, xmpp, queue_size=1, workers=1, max_attempts=1, retry_backoff=0)
+
+    # Workers not started: the first message fills the queue, the second is relayed inline
+    relay.submit(_message(1))
+    relay.submit(_message(2))
+
+    assert dal.relayed == ["msg2"]
+    assert relay.stats()["inlineRelays"] == 1
+    assert relay.stats()["queueDepth"] == 1
+
+
+def test_recover_pending():
+    """Test that pending messages from a previous run are re-queued."""
+    dal, xmpp = FakeMessagesDAL(), FakeMessagesXMPP()
+    dal.pending = [_message(1), _message(2)]
+    relay = XMPPRelay(dal, xmpp, queue_size=10, workers=1, max_attempts=1, retry_backoff=0)
+    relay.start()
+
+    assert relay.recover_pending() == 2
+    relay.stop()
+    assert sorted(dal.relayed) == ["msg1", "msg2"]
+
+
+def test_recovers_expired_leases_while_running():
+    """Test that pending messages showing up after startup are recovered on the timer."""
+    dal, xmpp = FakeMessagesDAL(), FakeMessagesXMPP()
+    relay = XMPPRelay(dal, xmpp, queue_size=10, workers=1, max_attempts=1, retry_backoff=0, recovery_interval=0.01)
+    relay.start()
+
+    # Left pending by a process whose lease ran out after this one started
+    dal.pending.append(_message(0))
+    for _ in range(100):
+        if dal.relayed:
+            break
+        time.sleep(0.01)
+    relay.stop()
+
+    assert dal.relayed == ["msg0"]
+    assert relay._recovery_thread is None
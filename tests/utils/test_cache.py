@@ -0,0 +1,113 @@
+import time
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.utils.cache import RecentMessagesCache, TTLCache
+
+
+def test_get_and_set():
+    """Test that cached values are returned and counted as hits."""
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get("chat1") is None
+
+    cache.set("chat1", ["user1", "user2"])
+    assert cache.get("chat1") == ["user1", "user2"]
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hitRate"] == 0.5
+    assert stats["size"] == 1
+
+
+def test_entries_expire():
+    """Test that entries older than the TTL are treated as misses."""
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("chat1", ["user1"])
+    time.sleep(0.02)
+
+    assert cache.get("chat1") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_is_evicted():
+    """Test that the cache keeps at most maxsize entries, evicting the LRU one."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("chat1", ["user1"])
+    cache.set("chat2", ["user2"])
+    cache.get("chat1")  # chat2 is now the least recently used
+    cache.set("chat3", ["user3"])
+
+    assert cache.get("chat2") is None
+    assert cache.get("chat1") == ["user1"]
+    assert cache.get("chat3") == ["user3"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_delete_invalidates():
+    """Test explicit invalidation."""
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("chat1", ["user1"])
+    cache.delete("chat1")
+
+    assert cache.get("chat1") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def _message(i, chat_id="chat1"):
+    return {"_id": ObjectId(), "chat_id": chat_id, "content": f"Message {i}", "sentAt": datetime(2024, 1, 1, 0, 0, i)}
+
+
+def test_recent_messages_serves_first_pages():
+    """Test that a filled buffer serves pages up to its size and is kept current by writes."""
+    cache = RecentMessagesCache(size=3, max_messages=100, ttl=60)
+    assert cache.get("chat1", 2) is None
+
+    older, newer = _message(1), _message(2)
+    cache.begin_fill("chat1")
+    cache.fill("chat1", [newer, older], 2)
+    assert cache.get("chat1", 20) == ([newer, older], 2)  # complete: every message is cached
+
+    newest = _message(3)
+    cache.add("chat1", newest)
+    cache.add("chat1", _message(4))
+    messages, total = cache.get("chat1", 3)
+    assert [m["content"] for m in messages] == ["Message 4", "Message 3", "Message 2"]
+    assert total == 4
+    assert cache.get("chat1", 4) is None  # the oldest message fell out of the ring
+
+    cache.update("chat1", dict(newest, content="Edited"))
+    cache.remove("chat1", str(newer["_id"]))
+    messages, total = cache.get("chat1", 2)
+    assert [m["content"] for m in messages] == ["Message 4", "Edited"]
+    assert total == 3
+
+    stats = cache.stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 2
+    assert stats["messages"] == 2
+
+
+def test_recent_messages_drops_fills_racing_with_writes():
+    """Test that a page read before a concurrent send does not replace the buffer."""
+    cache = RecentMessagesCache(size=10, max_messages=100, ttl=60)
+    cache.begin_fill("chat1")
+    cache.add("chat1", _message(2))  # stored while the fill was reading Mongo
+    cache.fill("chat1", [_message(1)], 1)
+
+    assert cache.get("chat1", 1) is None
+
+
+def test_recent_messages_evicts_least_recently_used_chats():
+    """Test that the total number of cached messages is capped by evicting whole chats."""
+    cache = RecentMessagesCache(size=2, max_messages=4, ttl=60)
+    for chat_id in ("chat1", "chat2"):
+        cache.fill(chat_id, [_message(2, chat_id), _message(1, chat_id)], 2)
+    cache.get("chat1", 1)  # chat2 is now the least recently used
+    cache.fill("chat3", [_message(1, "chat3")], 1)
+
+    assert cache.get("chat2", 1) is None
+    assert cache.get("chat1", 1) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["messages"] == 3
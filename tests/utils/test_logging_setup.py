@@ -0,0 +1,119 @@
+import logging
+import queue
+import uuid
+
+from app.utils import logging_setup
+from app.utils.logging_setup import NonBlockingQueueHandler, Payload, SampledLogger, create_logger, logging_stats
+from config.logging_config import LoggingConfig
+
+
+def _logger_name():
+    return f"test_logger_{uuid.uuid4().hex[:8]}"
+
+
+def test_create_logger_writes_through_background_listener(tmp_path):
+    name = _logger_name()
+    log_file = tmp_path / "test.log"
+    logger = create_logger(name, str(log_file), "INFO")
+
+    logger.info("Sent message %s to %s", "m1", "chat1")
+    logger.debug("Not written at INFO")
+    logging_setup._listeners.pop(name).stop()  # flushes the queue
+
+    content = log_file.read_text()
+    assert "Sent message m1 to chat1" in content
+    assert "Not written" not in content
+    assert f"Module {name} - INFO" in content
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    name = _logger_name()
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    for i in range(3):
+        logger.warning("record %s", i)
+
+    assert handler.queue.qsize() == 1
+    assert logging_setup._dropped[name] == 2
+
+
+def test_logging_stats_reports_queue_depth(tmp_path):
+    name = _logger_name()
+    create_logger(name, str(tmp_path / "stats.log"), "INFO")
+
+    stats = logging_stats()
+    assert stats[name] == {"queueDepth": 0, "dropped": 0}
+    logging_setup._listeners.pop(name).stop()
+
+
+def test_sampled_logger():
+    records = []
+
+    class ListHandler(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    logger = logging.getLogger(_logger_name())
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(ListHandler())
+
+    SampledLogger(logger, sample_rate=0).info("never %s", 1)
+    SampledLogger(logger, sample_rate=100).info("always %s", 2)
+    SampledLogger(logger, sample_rate=100).debug("below level %s", 3)
+
+    assert records == ["always 2"]
+
+
+def test_payload_is_omitted_unless_enabled(monkeypatch):
+    monkeypatch.setattr(LoggingConfig, "LOG_PAYLOADS", False)
+    assert str(Payload("secret message")) == "<14 chars omitted>"
+    assert str(Payload([{"content": "a"}, {"content": "b"}])) == "<2 items omitted>"
+    assert str(Payload(42)) == "<payload omitted>"
+
+    monkeypatch.setattr(LoggingConfig, "LOG_PAYLOADS", True)
+    assert str(Payload("secret message")) == "secret message"
+
+
+def test_exception_traceback_is_rendered_before_queueing(tmp_path):
+    name = _logger_name()
+    log_file = tmp_path / "test.log"
+    logger = create_logger(name, str(log_file), "INFO")
+
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logger.exception("Request failed")
+    logging_setup._listeners.pop(name).stop()
+
+    content = log_file.read_text()
+    assert "Request failed" in content
+    assert "RuntimeError: boom" in content
+
+
+def test_mutable_arguments_are_rendered_before_queueing():
+    log_queue = queue.Queue()
+    handler = NonBlockingQueueHandler(log_queue)
+    logger = logging.getLogger(_logger_name())
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    members = ["user1"]
+    logger.warning("Members: %s of %s", members, "chat1")
+    members.append("user2")
+    logger.warning("Sent %s to %s", Payload("hello"), "chat1")
+
+    snapshot, lazy = log_queue.get_nowait(), log_queue.get_nowait()
+    assert snapshot.getMessage() == "Members: ['user1'] of chat1"
+    assert snapshot.args is None
+    assert lazy.args[1] == "chat1"  # Immutable arguments stay lazy
+
+
+def test_create_logger_propagates_by_default(tmp_path):
+    name = _logger_name()
+    logger = create_logger(name, str(tmp_path / "test.log"), "INFO")
+    assert logger.propagate is True
+    logging_setup._listeners.pop(name).stop()
@@ -0,0 +1,65 @@
+import pytest
+
+from app.utils.metrics import MONGO_OPERATION_ERRORS, MONGO_OPERATION_SECONDS, MetricsRegistry, instrument_dal
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_histogram_renders_cumulative_buckets(registry):
+    histogram = registry.histogram("request_seconds", "Request duration", ["event"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, event="chat/message")
+    histogram.observe(0.5, event="chat/message")
+    histogram.observe(5, event="chat/message")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE request_seconds histogram" in lines
+    assert 'request_seconds_bucket{event="chat/message",le="0.1"} 1' in lines
+    assert 'request_seconds_bucket{event="chat/message",le="1.0"} 2' in lines
+    assert 'request_seconds_bucket{event="chat/message",le="+Inf"} 3' in lines
+    assert 'request_seconds_sum{event="chat/message"} 5.55' in lines
+    assert 'request_seconds_count{event="chat/message"} 3' in lines
+    assert histogram.count(event="chat/message") == 3
+
+
+def test_counter_and_label_escaping(registry):
+    counter = registry.counter("errors_total", "Errors", ["endpoint"])
+    counter.inc(endpoint='send"message')
+    counter.inc(2, endpoint='send"message')
+
+    assert 'errors_total{endpoint="send\\"message"} 3' in registry.render()
+    assert counter.get(endpoint='send"message') == 3
+
+
+def test_gauge_callback_is_read_at_render_time(registry):
+    connections = {"count": 1}
+    registry.gauge("connected", "Connected sockets", ["node"], callback=lambda: {("node-1",): connections["count"]})
+
+    assert 'connected{node="node-1"} 1' in registry.render()
+    connections["count"] = 7
+    assert 'connected{node="node-1"} 7' in registry.render()
+
+
+def test_instrument_dal_times_public_methods():
+    @instrument_dal
+    class FakeDal:
+        def find(self, value):
+            return value * 2
+
+        def fail(self):
+            raise ValueError("boom")
+
+        def _private(self):
+            return "untouched"
+
+    dal = FakeDal()
+    assert dal.find(2) == 4
+    with pytest.raises(ValueError):
+        dal.fail()
+
+    assert MONGO_OPERATION_SECONDS.count(dal="FakeDal", method="find") == 1
+    assert MONGO_OPERATION_SECONDS.count(dal="FakeDal", method="fail") == 1
+    assert MONGO_OPERATION_ERRORS.get(dal="FakeDal", method="fail") == 1
+    assert MONGO_OPERATION_SECONDS.count(dal="FakeDal", method="_private") == 0
@@ -0,0 +1,89 @@
+import time
+import uuid
+
+import socketio
+
+from app.utils.pubsub import LocalPubSubManager, RoomSyncManager, _queue_manager_class, message_queue_options
+
+
+def _create_node(channel):
+    """A Socket.IO server on the in-process queue that records the packets it sends."""
+    server = socketio.Server(async_mode="threading", client_manager=LocalPubSubManager(channel=channel))
+    server.manager.initialize()
+    server.manager_initialized = True
+
+    sent = []
+    server._send_eio_packet = lambda eio_sid, eio_pkt: sent.append((eio_sid, eio_pkt.data))
+    return server, sent
+
+
+def _wait_for(sent, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not sent:
+        time.sleep(0.01)
+    return sent
+
+
+def test_message_queue_options():
+    assert isinstance(message_queue_options("", "chat")["client_manager"], RoomSyncManager)
+    assert isinstance(message_queue_options("memory://", "chat")["client_manager"], LocalPubSubManager)
+    assert issubclass(_queue_manager_class("redis://redis:6379/0"), socketio.RedisManager)
+    assert issubclass(_queue_manager_class("amqp://rabbitmq:5672//"), socketio.KombuManager)
+
+
+def test_room_emit_reaches_client_on_another_node():
+    channel = f"test-{uuid.uuid4().hex[:8]}"
+    node_a, sent_a = _create_node(channel)
+    node_b, sent_b = _create_node(channel)
+
+    # alice is connected to node B only
+    sid = node_b.manager.connect("eio-alice", "/")
+    node_b.enter_room(sid, "alice")
+
+    node_a.emit("receiveMessage", {"content": "hi"}, to="alice")
+
+    assert _wait_for(sent_b) == [("eio-alice", '2["receiveMessage",{"content":"hi"}]')]
+    assert sent_a == []
+
+
+def test_other_channels_are_isolated():
+    node_a, _ = _create_node(f"test-{uuid.uuid4().hex[:8]}")
+    node_b, sent_b = _create_node(f"test-{uuid.uuid4().hex[:8]}")
+
+    sid = node_b.manager.connect("eio-alice", "/")
+    node_b.enter_room(sid, "alice")
+
+    node_a.emit("receiveMessage", {"content": "hi"}, to="alice")
+
+    assert _wait_for(sent_b, timeout=0.2) == []
+
+
+def test_enter_room_of_moves_sessions_on_every_node():
+    channel = f"test-{uuid.uuid4().hex[:8]}"
+    node_a, sent_a = _create_node(channel)
+    node_b, sent_b = _create_node(channel)
+
+    # alice has one session on each node, bob one on node B
+    sid_a = node_a.manager.connect("eio-alice-a", "/")
+    node_a.enter_room(sid_a, "alice")
+    sid_b = node_b.manager.connect("eio-alice-b", "/")
+    node_b.enter_room(sid_b, "alice")
+    sid_bob = node_b.manager.connect("eio-bob", "/")
+    node_b.enter_room(sid_bob, "bob")
+
+    node_a.manager.enter_room_of("alice", "chat:1")
+    deadline = time.monotonic() + 2.0
+    while time.monotonic() < deadline and "chat:1" not in node_b.rooms(sid_b):
+        time.sleep(0.01)
+
+    assert "chat:1" in node_a.rooms(sid_a)
+    assert "chat:1" in node_b.rooms(sid_b)
+    assert "chat:1" not in node_b.rooms(sid_bob)
+
+    node_b.manager.leave_room_of("alice", "chat:1")
+    deadline = time.monotonic() + 2.0
+    while time.monotonic() < deadline and "chat:1" in node_a.rooms(sid_a):
+        time.sleep(0.01)
+
+    assert "chat:1" not in node_a.rooms(sid_a)
+    assert "chat:1" not in node_b.rooms(sid_b)
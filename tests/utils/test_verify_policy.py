@@ -0,0 +1,23 @@
+import pytest
+
+from app.utils.verify_policy import VerifyPolicy
+
+
+def test_strict_and_trusted_modes():
+    assert all(VerifyPolicy("strict").should_verify() for _ in range(100))
+    assert not any(VerifyPolicy("trusted").should_verify() for _ in range(100))
+
+
+def test_sampled_mode():
+    assert not any(VerifyPolicy("sampled", sample_rate=0).should_verify() for _ in range(100))
+    assert all(VerifyPolicy("sampled", sample_rate=100).should_verify() for _ in range(100))
+
+    verified = sum(VerifyPolicy("sampled", sample_rate=50).should_verify() for _ in range(2000))
+    assert 800 < verified < 1200
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        VerifyPolicy("sometimes")
+    with pytest.raises(ValueError):
+        VerifyPolicy("sampled", sample_rate=150)
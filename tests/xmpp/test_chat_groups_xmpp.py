@@ -2,10 +2,10 @@ import pytest
 import uuid
 import logging
 import json
-import requests
 from requests.exceptions import HTTPError
 
 from app.xmpp.chat_groups_xmpp import ChatGroupsXMPP
+from app.xmpp.ejabberd_client import ejabberd_client
 from app.xmpp.user_management_xmpp import UserManagementXMPP
 from config.xmpp_config import XMPPConfig
 
@@ -54,12 +54,12 @@ def test_create_chat_group_success(random_room, test_users, monkeypatch):
     We simulate the /create_room_with_opts endpoint to return a JSON result of 0.
     """
     # Fake response for create_room_with_opts endpoint
-    def fake_post(url, json, auth, verify):
+    def fake_post(url, json, timeout):
         # Expecting POST to the /create_room_with_opts endpoint.
         if url.endswith("/create_room_with_opts"):
             return FakeResponse(200, json_data=0)
         pytest.fail("Unexpected URL in create_chat_group")
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
 
     # Ensure that our static function returns True
     result = ChatGroupsXMPP.create_chat_group(random_room, test_users)
@@ -69,13 +69,13 @@ def test_create_chat_group_failure(random_room, test_users, monkeypatch):
     """
     Test that create_chat_group raises an HTTPError when the room creation returns a non-zero result.
     """
-    def fake_post(url, json, auth, verify):
+    def fake_post(url, json, timeout):
         if url.endswith("/create_room_with_opts"):
             # Simulate a failure: Return a JSON value that is not 0.
             return FakeResponse(200, json_data=1, text="Room creation error")
         pytest.fail("Unexpected URL in create_chat_group_failure")
 
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
 
     with pytest.raises(HTTPError):
         ChatGroupsXMPP.create_room_with_opts(random_room, options=[])
@@ -84,11 +84,11 @@ def test_delete_chat_group_success(random_room, monkeypatch):
     """
     Test that delete_chat_group returns True on successful deletion.
     """
-    def fake_post(url, json, auth, verify):
+    def fake_post(url, json, timeout):
         if url.endswith("/destroy_room"):
             return FakeResponse(200)
         pytest.fail("Unexpected URL in delete_chat_group")
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
 
     result = ChatGroupsXMPP.delete_chat_group(random_room)
     assert result is True
@@ -97,11 +97,11 @@ def test_delete_chat_group_failure(random_room, monkeypatch):
     """
     Test that delete_chat_group raises an HTTPError when deletion fails.
     """
-    def fake_post(url, json, auth, verify):
+    def fake_post(url, json, timeout):
         if url.endswith("/destroy_room"):
             return FakeResponse(400, text="Bad Request")
         pytest.fail("Unexpected URL in test_delete_chat_group_failure")
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
 
     with pytest.raises(HTTPError):
         ChatGroupsXMPP.delete_chat_group(random_room)
@@ -112,11 +112,11 @@ def test_get_user_rooms_success(monkeypatch):
     """
     fake_rooms = ["room1@conference.example.com", "room2@conference.example.com"]
     
-    def fake_post(url, json, auth, verify):
+    def fake_post(url, json, timeout):
         if url.endswith("/get_user_rooms"):
             return FakeResponse(200, json_data=fake_rooms)
         pytest.fail("Unexpected URL in get_user_rooms")
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
 
     rooms = ChatGroupsXMPP.get_user_rooms("alice")
     assert rooms == fake_rooms
@@ -130,11 +130,11 @@ def test_get_room_occupants_success(monkeypatch):
         {"jid": "user2@example.com/psi", "nick": "User2", "role": "member"}
     ]
     
-    def fake_post(url, json, auth, verify):
+    def fake_post(url, json, timeout):
         if url.endswith("/get_room_occupants"):
             return FakeResponse(200, json_data=fake_occupants)
         pytest.fail("Unexpected URL in get_room_occupants")
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
 
     occupants = ChatGroupsXMPP.get_room_occupants("room1")
     assert occupants == fake_occupants
@@ -143,13 +143,13 @@ def test_set_room_affiliation_failure(monkeypatch):
     """
     Test that set_room_affiliation raises an HTTPError on failure.
     """
-    def fake_post(url, json, auth, verify):
+    def fake_post(url, json, timeout):
         if url.endswith("/set_room_affiliation"):
             # Simulate success HTTP code but non-zero JSON result
             return FakeResponse(200, json_data=1, text="Affiliation error")
         pytest.fail("Unexpected URL in set_room_affiliation_failure")
 
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
 
     with pytest.raises(HTTPError):
         ChatGroupsXMPP.set_room_affiliation("room123", "user456", "member")
@@ -158,12 +158,12 @@ def test_set_room_affiliation_failure(monkeypatch):
     """
     Test that set_room_affiliation raises an HTTPError on failure.
     """
-    def fake_post(url, json, auth, verify):
+    def fake_post(url, json, timeout):
         if url.endswith("/set_room_affiliation"):
             # Simulate success HTTP code but nonzero JSON result
             return FakeResponse(200, json_data=1, text="Affiliation error")
         pytest.fail("Unexpected URL in set_room_affiliation_failure")
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
 
     with pytest.raises(HTTPError):
         ChatGroupsXMPP.set_room_affiliation("room1", "bob", "member")
@@ -186,3 +186,21 @@ def test_add_and_remove_users(monkeypatch):
     assert remove_result is True
 
 # Optional cleanup if desired: Could also use UserManagementXMPP.unregister_user for real integration.
+
+def test_set_room_affiliations_reports_partial_failures(monkeypatch):
+    """
+    Test that bulk affiliation changes run for every user and report failures per user.
+    """
+    calls = []
+
+    def fake_set_room_affiliation(room, user, affiliation):
+        calls.append((room, user, affiliation))
+        return user != "bob"
+    monkeypatch.setattr(ChatGroupsXMPP, "set_room_affiliation", staticmethod(fake_set_room_affiliation))
+
+    users = ["alice", "bob", "carol", "dave"]
+    results = ChatGroupsXMPP.set_room_affiliations("room1", users, "member")
+
+    assert results == {"alice": True, "bob": False, "carol": True, "dave": True}
+    assert sorted(calls) == sorted(("room1", user, "member") for user in users)
+    assert ChatGroupsXMPP.add_users_to_room("room1", users) is False
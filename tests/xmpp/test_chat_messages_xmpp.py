@@ -1,10 +1,9 @@
 import pytest
 import uuid
-import requests
-from requests.auth import HTTPBasicAuth
 from requests.exceptions import HTTPError
 
 from app.xmpp.chat_messages_xmpp import ChatMessagesXMPP
+from app.xmpp.ejabberd_client import ejabberd_client
 from config.xmpp_config import XMPPConfig
 
 class FakeResponse:
@@ -35,7 +34,7 @@ def test_send_groupchat_message_success(monkeypatch, random_room, test_users):
     sender = test_users[0]
     group_jid = f"{random_room}@{XMPPConfig.MUC_SERVICE}"
 
-    def fake_post(url, json, auth, verify):
+    def fake_post(url, json, timeout):
         if url.endswith("/send_message"):
             assert json["type"] == "groupchat"
             assert json["from"] == f"{sender}@{XMPPConfig.VHOST}"
@@ -44,7 +43,7 @@ def test_send_groupchat_message_success(monkeypatch, random_room, test_users):
             return FakeResponse(200, json_data=0)
         pytest.fail("Unexpected URL in send_groupchat_message")
 
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
 
     result = ChatMessagesXMPP.send_message(
         sender,
@@ -56,12 +55,37 @@ def test_send_groupchat_message_success(monkeypatch, random_room, test_users):
     assert result is True
 
 def test_send_message_failure(monkeypatch):
-    def fake_post(url, json, auth, verify):
+    def fake_post(url, json, timeout):
         if url.endswith("/send_message"):
             return FakeResponse(200, json_data=1, text="Message failed")
         pytest.fail("Unexpected URL in send_message_failure")
 
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
 
     with pytest.raises(HTTPError):
         ChatMessagesXMPP.send_message("user1", "user2", "chat", "", "Hello")
+
+
+def test_send_messages_keeps_order_per_room(monkeypatch):
+    """Rooms are sent concurrently, but each room's messages arrive in order."""
+    received = []
+
+    def fake_post(url, json, timeout):
+        received.append((json["to"], json["body"]))
+        return FakeResponse(200, json_data=0 if json["body"] != "fail" else 1)
+
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
+
+    messages = [
+        {"sender_id": "user1", "chat_id": f"room{i % 3}", "content": f"{i}"}
+        for i in range(30)
+    ]
+    messages[4]["content"] = "fail"
+
+    outcomes = ChatMessagesXMPP.send_messages(messages)
+
+    assert outcomes == [i != 4 for i in range(30)]
+    for room in range(3):
+        room_jid = f"room{room}@{XMPPConfig.MUC_SERVICE}"
+        bodies = [body for to, body in received if to == room_jid]
+        assert bodies == [m["content"] for m in messages if m["chat_id"] == f"room{room}"]
@@ -0,0 +1,70 @@
+import pytest
+from requests.exceptions import HTTPError
+
+from app.xmpp.ejabberd_client import EjabberdClient
+from config.xmpp_config import XMPPConfig
+
+
+class FakeResponse:
+    def __init__(self, status_code, json_data=None, text=""):
+        self.status_code = status_code
+        self._json = json_data
+        self.text = text
+
+    def json(self):
+        return self._json
+
+    def raise_for_status(self):
+        if not (200 <= self.status_code < 300):
+            raise HTTPError(f"HTTP {self.status_code} Error: {self.text}")
+
+
+@pytest.fixture
+def client():
+    client = EjabberdClient(pool_size=4, connect_timeout=1, read_timeout=2)
+    yield client
+    client.close()
+
+
+def test_session_is_reused_and_configured(client):
+    """The client should keep one session with auth and a bounded pool."""
+    adapter = client.session.get_adapter(XMPPConfig.EJABBERD_API_URL)
+    assert adapter._pool_maxsize == 4
+    assert client.session.auth.username == XMPPConfig.ADMIN_USER
+    assert client.timeout == (1, 2)
+
+
+def test_post_records_latency_per_endpoint(client, monkeypatch):
+    calls = []
+
+    def fake_post(url, json, timeout):
+        calls.append((url, json, timeout))
+        return FakeResponse(200, json_data=0)
+    monkeypatch.setattr(client.session, "post", fake_post)
+
+    client.post(f"{XMPPConfig.EJABBERD_API_URL}/send_message", {"body": "hi"})
+    client.post(f"{XMPPConfig.EJABBERD_API_URL}/send_message", {"body": "hi again"})
+
+    assert len(calls) == 2
+    assert calls[0][2] == (1, 2)
+
+    stats = client.get_stats()
+    assert stats["send_message"]["count"] == 2
+    assert stats["send_message"]["errors"] == 0
+    assert stats["send_message"]["avgSeconds"] >= 0
+
+
+def test_post_records_errors(client, monkeypatch):
+    def fake_post(url, json, timeout):
+        return FakeResponse(500, text="boom")
+    monkeypatch.setattr(client.session, "post", fake_post)
+
+    with pytest.raises(HTTPError):
+        client.post(f"{XMPPConfig.EJABBERD_API_URL}/destroy_room", {})
+
+    stats = client.get_stats()
+    assert stats["destroy_room"]["count"] == 1
+    assert stats["destroy_room"]["errors"] == 1
+
+    client.reset_stats()
+    assert client.get_stats() == {}
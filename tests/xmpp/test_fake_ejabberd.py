@@ -0,0 +1,104 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from requests.exceptions import ConnectionError
+
+from app.xmpp.chat_groups_xmpp import ChatGroupsXMPP
+from app.xmpp.chat_messages_xmpp import ChatMessagesXMPP
+from app.xmpp.ejabberd_client import EjabberdClient
+from app.xmpp.user_management_xmpp import UserManagementXMPP
+from benchmarks.fake_ejabberd import FakeEjabberdServer, FaultInjection
+from config.xmpp_config import XMPPConfig
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """Fake ejabberd admin API the XMPP layer talks to over real HTTP."""
+    with FakeEjabberdServer() as server:
+        monkeypatch.setattr(XMPPConfig, "EJABBERD_API_URL", server.url)
+        yield server
+
+
+@pytest.fixture
+def random_room():
+    return f"room_{uuid.uuid4().hex[:8]}"
+
+
+def test_room_lifecycle_end_to_end(fake_server, random_room):
+    assert ChatGroupsXMPP.create_chat_group(random_room, ["alice", "bob"])
+    assert ChatGroupsXMPP.get_user_affiliation_in_room(random_room, "alice") == "owner"
+    assert ChatGroupsXMPP.get_user_rooms("bob") == [f"{random_room}@conference.localhost"]
+
+    assert ChatGroupsXMPP.set_room_affiliations(random_room, ["carol", "dave"], "member") == {"carol": True, "dave": True}
+    assert ChatGroupsXMPP.remove_users_from_room(random_room, ["bob"])
+    affiliations = ChatGroupsXMPP().get_room_affiliated_usernames(random_room)
+    assert sorted(entry["username"] for entry in affiliations) == ["alice", "carol", "dave"]
+
+    assert ChatMessagesXMPP.send_message("alice", random_room, "groupchat", "", "hello")
+    assert fake_server.state.messages == 1
+
+    assert ChatGroupsXMPP.delete_chat_group(random_room)
+    assert not ChatMessagesXMPP.send_message("alice", random_room, "groupchat", "", "gone")
+
+
+def test_registration_end_to_end(fake_server):
+    username = f"user_{uuid.uuid4().hex[:8]}"
+
+    assert UserManagementXMPP.register_user(username, "password")
+    assert not UserManagementXMPP.register_user(username, "password")
+    assert username in fake_server.state.users
+
+    stats = fake_server.stats()
+    assert stats["requests"]["register"] == 2
+    assert stats["totalRequests"] == 2
+
+
+def test_injected_failures_per_command(fake_server, random_room):
+    fake_server.faults.commands["send_message"] = {"failure_rate": 1.0, "failure_status": 503}
+    assert ChatGroupsXMPP.create_chat_group(random_room, ["alice"])
+
+    assert not ChatMessagesXMPP.send_message("alice", random_room, "groupchat", "", "hello")
+    assert fake_server.stats()["failures"] == {"send_message": 1}
+    assert fake_server.state.messages == 0
+
+
+def test_dropped_connection_raises(fake_server):
+    fake_server.faults.failure_rate = 1.0
+    fake_server.faults.failure_status = 0
+    client = EjabberdClient(pool_size=1, connect_timeout=1, read_timeout=2)
+
+    with pytest.raises(ConnectionError):
+        client.post(f"{fake_server.url}/registered_users", {"host": "localhost"})
+    assert client.get_stats()["registered_users"]["errors"] == 1
+    client.close()
+
+
+def test_injected_latency_and_connection_reuse():
+    faults = FaultInjection(latency=0.05)
+    client = EjabberdClient(pool_size=4, connect_timeout=1, read_timeout=2)
+
+    with FakeEjabberdServer(faults=faults) as server:
+        endpoint = f"{server.url}/registered_users"
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: client.post(endpoint, {"host": "localhost"}), range(16)))
+        elapsed = time.perf_counter() - start
+        stats = server.stats()
+
+    client.close()
+    # 16 calls of 50 ms over a pool of 4 connections: 4 rounds, never more than 4 in flight
+    assert elapsed >= 0.2
+    assert stats["totalRequests"] == 16
+    assert stats["connections"] <= 4
+    assert stats["maxInFlight"] <= 4
+
+
+def test_fault_injection_is_reproducible_with_a_seed():
+    first = FaultInjection(failure_rate=0.5, seed=42)
+    second = FaultInjection(failure_rate=0.5, seed=42)
+
+    assert [first.failure("register") for _ in range(20)] == [second.failure("register") for _ in range(20)]
+    assert FaultInjection().failure("register") is None
+    assert FaultInjection(latency=0.1, commands={"register": {"latency": 0.3}}).delay("register") == 0.3
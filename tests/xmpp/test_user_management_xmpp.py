@@ -1,11 +1,26 @@
 import pytest
+import time
 import uuid
-import requests
 from requests.exceptions import HTTPError
 
+from app.xmpp.ejabberd_client import ejabberd_client
 from app.xmpp.user_management_xmpp import UserManagementXMPP
 
 
+class FakeResponse:
+    def __init__(self, status_code, json_data=None, text=""):
+        self.status_code = status_code
+        self._json = json_data
+        self.text = text
+
+    def json(self):
+        return self._json
+
+    def raise_for_status(self):
+        if not (200 <= self.status_code < 300):
+            raise HTTPError(f"HTTP {self.status_code} Error: {self.text}")
+
+
 @pytest.fixture
 def random_username():
     return f"testuser_{uuid.uuid4().hex[:8]}"
@@ -100,3 +115,83 @@ def test_ensure_users_register(default_password):
     finally:
         for user in base_users:
             UserManagementXMPP.unregister_user(user)
+
+
+# --------------------------------------
+# Registered users cache (no ejabberd needed)
+# --------------------------------------
+
+@pytest.fixture
+def fake_ejabberd(monkeypatch):
+    """Fake registered_users/register endpoints and a fresh registered-users cache."""
+    calls = {"registered_users": 0, "register": []}
+    registered = {"alice", "bob"}
+
+    def fake_post(url, json, timeout):
+        if url.endswith("/registered_users"):
+            calls["registered_users"] += 1
+            return FakeResponse(200, json_data=sorted(registered))
+        if url.endswith("/register"):
+            calls["register"].append(json["user"])
+            if json["user"] == "broken":
+                return FakeResponse(500, text="Registration error")
+            registered.add(json["user"])
+            return FakeResponse(200, json_data="ok")
+        pytest.fail(f"Unexpected URL {url}")
+
+    monkeypatch.setattr(ejabberd_client.session, "post", fake_post)
+    monkeypatch.setattr(UserManagementXMPP, "_registered_users", set())
+    monkeypatch.setattr(UserManagementXMPP, "_registered_users_loaded_at", None)
+    monkeypatch.setattr(UserManagementXMPP, "_registered_users_refreshing", False)
+    monkeypatch.setattr(UserManagementXMPP, "_registered_users_journals", [])
+    return calls
+
+
+def test_ensure_users_register_uses_cached_set(fake_ejabberd):
+    UserManagementXMPP.ensure_users_register(["alice", "carol", "dave"])
+    assert fake_ejabberd["registered_users"] == 1
+    assert sorted(fake_ejabberd["register"]) == ["carol", "dave"]
+
+    # Newly registered users are cached, so nothing is downloaded or registered again
+    UserManagementXMPP.ensure_users_register(["alice", "bob", "carol", "dave"])
+    assert fake_ejabberd["registered_users"] == 1
+    assert sorted(fake_ejabberd["register"]) == ["carol", "dave"]
+
+
+def test_ensure_users_register_retries_failed_registrations(fake_ejabberd):
+    UserManagementXMPP.ensure_users_register(["broken"])
+    UserManagementXMPP.ensure_users_register(["broken"])
+    assert fake_ejabberd["register"] == ["broken", "broken"]
+
+
+def test_stale_registered_users_cache_is_refreshed(fake_ejabberd, monkeypatch):
+    UserManagementXMPP.ensure_users_register(["alice"])
+    monkeypatch.setattr(UserManagementXMPP, "_registered_users_loaded_at", -1e9)
+
+    refreshed = []
+    monkeypatch.setattr(UserManagementXMPP, "refresh_registered_users", staticmethod(lambda: refreshed.append(True)))
+    UserManagementXMPP.ensure_users_register(["alice"])
+
+    for _ in range(50):
+        if refreshed:
+            break
+        time.sleep(0.01)
+    assert refreshed == [True]
+
+
+def test_registration_during_refresh_is_kept(fake_ejabberd, monkeypatch):
+    UserManagementXMPP.ensure_users_register(["alice"])
+    fetch = ejabberd_client.session.post
+
+    def post_racing_registration(url, json, timeout):
+        response = fetch(url, json=json, timeout=timeout)
+        if url.endswith("/registered_users"):
+            # carol registers after ejabberd built the list, before the refresh swaps it in
+            UserManagementXMPP.register_user("carol", "password")
+        return response
+
+    monkeypatch.setattr(ejabberd_client.session, "post", post_racing_registration)
+    assert UserManagementXMPP.refresh_registered_users() is True
+
+    UserManagementXMPP.ensure_users_register(["carol"])
+    assert fake_ejabberd["register"] == ["carol"]